@@ -0,0 +1,53 @@
+import sys
+sys.path.insert(0, 'src/py')
+sys.setrecursionlimit(100000)
+
+import ast
+import gc
+import time
+from ast_utils.utils import get_line_offsets_for_str
+from ast_utils.preprocess import preprocess_syntaxtree
+from ast_utils.cfg import get_cfg_representation
+
+# Generated model with n_blocks blocks of if statements and for loops nested depth times,
+# each level assigns to and samples from a few variables.
+def generate_model(n_blocks: int, depth: int) -> str:
+    lines = ["import pyro", "def model(data):", "    x = 0."]
+    for b in range(n_blocks):
+        indent = "    "
+        for d in range(depth):
+            lines.append(f"{indent}y_{b}_{d} = pyro.sample('y_{b}_{d}', dist.Normal(x, 1.))")
+            lines.append(f"{indent}x = x + y_{b}_{d}")
+            if d % 2 == 0:
+                lines.append(f"{indent}if x > {d}:")
+            else:
+                lines.append(f"{indent}for i_{b}_{d} in range(3):")
+            indent += "    "
+        lines.append(f"{indent}x = x + 1")
+    lines.append("    return x")
+    return "\n".join(lines)
+
+def benchmark(n_blocks: int, depth: int, repetitions: int = 3):
+    source_code = generate_model(n_blocks, depth)
+    syntax_tree = preprocess_syntaxtree(ast.parse(source_code), source_code, get_line_offsets_for_str(source_code), 0)
+    n_ast_nodes = sum(1 for _ in ast.walk(syntax_tree.root_node))
+    timings = []
+    for _ in range(repetitions):
+        # like timeit, garbage collection is disabled during timing
+        gc.collect()
+        gc.disable()
+        t0 = time.perf_counter()
+        get_cfg_representation(syntax_tree.root_node, syntax_tree.node_to_id)
+        timings.append(time.perf_counter() - t0)
+        gc.enable()
+    t = min(timings)
+    print(f"{n_blocks:6d} blocks {depth:4d} depth {n_ast_nodes:8d} AST nodes {t*1000:10.1f} ms {t/n_ast_nodes*1e6:8.2f} us/node")
+
+if __name__ == "__main__":
+    # python3 experiments/benchmark_cfg.py
+    print("Program size:")
+    for n_blocks in (200, 400, 800, 1600, 3200):
+        benchmark(n_blocks, 4)
+    print("Nesting depth:")
+    for depth in (10, 20, 40, 80):
+        benchmark(6400 // depth, depth)
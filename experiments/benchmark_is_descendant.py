@@ -0,0 +1,77 @@
+import sys
+sys.path.insert(0, 'src/py')
+sys.setrecursionlimit(100000)
+
+import ast
+import gc
+import glob
+import random
+import time
+from ast_utils.utils import get_line_offsets_for_str, is_descendant, _is_descendant_by_parent, number_nodes
+from ast_utils.preprocess import preprocess_syntaxtree
+from benchmark_cfg import generate_model
+
+def get_syntax_tree(source_code: str):
+    syntax_tree = preprocess_syntaxtree(ast.parse(source_code), source_code, get_line_offsets_for_str(source_code), 0)
+    number_nodes(syntax_tree.root_node)
+    return syntax_tree
+
+def get_syntax_trees(folders: list[str]):
+    for folder in folders:
+        for filename in sorted(glob.glob(folder + "/**/*.py", recursive=True)):
+            with open(filename, encoding="utf-8") as f:
+                source_code = f.read()
+            try:
+                yield get_syntax_tree(source_code)
+            except Exception:
+                continue
+
+# Pairs of a random node and each of its ancestors (true queries), and of two random nodes (mostly false queries).
+def get_queries(syntax_tree, n_nodes: int) -> list[tuple[ast.AST, ast.AST]]:
+    nodes = [node for node in ast.walk(syntax_tree.root_node) if hasattr(node, "dfs_interval")]
+    queries = []
+    for node in random.sample(nodes, min(n_nodes, len(nodes))):
+        ancestor = node
+        while ancestor is not None:
+            queries.append((ancestor, node))
+            ancestor = ancestor.parent
+        queries.append((random.choice(nodes), node))
+    return queries
+
+def time_queries(f, queries, repetitions: int = 5) -> float:
+    timings = []
+    for _ in range(repetitions):
+        # like timeit, garbage collection is disabled during timing
+        gc.collect()
+        gc.disable()
+        t0 = time.perf_counter()
+        for parent, node in queries:
+            f(parent, node)
+        timings.append(time.perf_counter() - t0)
+        gc.enable()
+    return min(timings)
+
+def benchmark(name: str, syntax_trees, n_nodes: int = 200):
+    random.seed(0)
+    queries = []
+    for syntax_tree in syntax_trees:
+        queries += get_queries(syntax_tree, n_nodes)
+    depths = []
+    for _, node in queries:
+        depth = 0
+        while node.parent is not None:
+            node, depth = node.parent, depth + 1
+        depths.append(depth)
+
+    assert all(is_descendant(parent, node) == _is_descendant_by_parent(parent, node) for parent, node in queries)
+    t_parent = time_queries(_is_descendant_by_parent, queries)
+    t_interval = time_queries(is_descendant, queries)
+    print(f"{name}: {len(queries)} queries, mean depth {sum(depths)/len(depths):.1f}, max depth {max(depths)}")
+    print(f"    parent walk: {t_parent/len(queries)*1e9:8.1f} ns/query")
+    print(f"    interval:    {t_interval/len(queries)*1e9:8.1f} ns/query")
+
+if __name__ == "__main__":
+    # python3 experiments/benchmark_is_descendant.py
+    benchmark("evaluation corpus", get_syntax_trees(["evaluation/pyro", "evaluation/pymc"]))
+    for depth in (10, 40):
+        benchmark(f"generated model (depth {depth})", [get_syntax_tree(generate_model(800 // depth, depth))], 2000)
@@ -0,0 +1,74 @@
+import sys
+sys.path.insert(0, 'src/py')
+sys.setrecursionlimit(100000)
+
+import ast
+import gc
+import time
+from ast_utils.utils import get_line_offsets_for_str
+from ast_utils.preprocess import preprocess_syntaxtree
+from ast_utils.scoped_tree import get_scoped_tree, add_syntaxnodes_of_cfg
+from ast_utils.cfg import get_cfg_representation
+from analysis.data_control_flow import dependency_closure
+from benchmark_cfg import generate_model
+
+# Small model followed by n_functions functions that the model does not call (like plotting and data loading code of a notebook).
+def generate_file(n_functions: int) -> str:
+    lines = [generate_model(4, 4)]
+    for k in range(n_functions):
+        helper = generate_model(4, 4).split("\n")[1:]
+        lines.append(helper[0].replace("def model(", f"def helper_{k}("))
+        lines += helper[1:]
+    return "\n".join(lines)
+
+def time_min(f, repetitions: int = 5) -> float:
+    timings = []
+    for _ in range(repetitions):
+        # like timeit, garbage collection is disabled during timing
+        gc.collect()
+        gc.disable()
+        t0 = time.perf_counter()
+        f()
+        timings.append(time.perf_counter() - t0)
+        gc.enable()
+    return min(timings)
+
+# CFGs of all functions and the CFG node of every syntax node,
+# as computed by get_scoped_tree before CFGs were built on first query
+def get_all_cfgs(syntax_tree):
+    cfgs = get_cfg_representation(syntax_tree.root_node, syntax_tree.node_to_id)
+    syntaxnode_to_cfgnode = dict()
+    for cfg in cfgs.values():
+        add_syntaxnodes_of_cfg(syntaxnode_to_cfgnode, cfg)
+    for node in ast.walk(syntax_tree.root_node):
+        chain = []
+        current = node
+        while current is not None and current not in syntaxnode_to_cfgnode:
+            chain.append(current)
+            current = getattr(current, "parent", None)
+        cfgnode = syntaxnode_to_cfgnode[current] if current is not None else None
+        for chain_node in chain:
+            syntaxnode_to_cfgnode[chain_node] = cfgnode
+    return cfgs, syntaxnode_to_cfgnode
+
+# closure of the return value of the model, which builds the CFGs it needs
+def query(scoped_tree):
+    model = scoped_tree.root_node.body[1]
+    dependency_closure(scoped_tree, [model.body[-1].value], {})
+
+def benchmark(n_functions: int):
+    source_code = generate_file(n_functions)
+    syntax_tree = preprocess_syntaxtree(ast.parse(source_code), source_code, get_line_offsets_for_str(source_code), 0)
+    t_scoped_tree = time_min(lambda: get_scoped_tree(syntax_tree))
+    t_all_cfgs = time_min(lambda: get_all_cfgs(syntax_tree))
+    scoped_trees = [get_scoped_tree(syntax_tree) for _ in range(5)]
+    t_query = time_min(lambda: query(scoped_trees.pop()))
+    scoped_tree = get_scoped_tree(syntax_tree)
+    query(scoped_tree)
+    print(f"{n_functions:5d} functions: get_scoped_tree {t_scoped_tree*1000:8.1f} ms, all CFGs and node map {t_all_cfgs*1000:8.1f} ms, "
+          f"first query {t_query*1000:6.1f} ms ({len(scoped_tree.cfgs)} CFGs built)")
+
+if __name__ == "__main__":
+    # python3 experiments/benchmark_lazy_cfg.py
+    for n_functions in (0, 10, 100, 300):
+        benchmark(n_functions)
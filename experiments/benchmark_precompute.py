@@ -0,0 +1,47 @@
+import sys
+sys.path.insert(0, 'src/py')
+sys.setrecursionlimit(100000)
+
+import contextlib
+import glob
+import io
+import time
+import server
+from jsonrpc_server import _SESSION
+
+# Latency of the first queries of a client (random variables and model graph) after build_ast,
+# if the client is idle for idle seconds in between (e.g. editor integration that renders the file first).
+def time_first_queries(filenames: list[str], ppl: str, precompute: bool, idle: float) -> tuple[float, float, int]:
+    server.LOGGING = False
+    server.PRECOMPUTE = precompute
+    t_build, t_queries, n_files = 0., 0., 0
+    for filename in filenames:
+        _SESSION.clear()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                tree_id = server.build_ast(filename, ppl, 0)
+                t1 = time.perf_counter()
+                time.sleep(idle)
+                t2 = time.perf_counter()
+                server.get_random_variables(tree_id)
+                server.get_model_graph(tree_id)
+                t3 = time.perf_counter()
+                # precomputation of this tree is finished before the next file
+                server.start_precomputation(tree_id).result()
+        except Exception:
+            continue
+        t_build += t1 - t0
+        t_queries += t3 - t2
+        n_files += 1
+    return t_build, t_queries, n_files
+
+if __name__ == "__main__":
+    # python3 experiments/benchmark_precompute.py
+    for folder, ppl in (("evaluation/pyro", "pyro"), ("evaluation/pymc", "pymc")):
+        filenames = sorted(glob.glob(folder + "/**/*.py", recursive=True))
+        for idle in (0., 0.05):
+            for precompute in (False, True):
+                t_build, t_queries, n_files = time_first_queries(filenames, ppl, precompute, idle)
+                print(f"{folder} idle={idle*1000:.0f} ms precompute={precompute}: {n_files} files, "
+                      f"build_ast {t_build*1000:8.1f} ms, first queries {t_queries*1000:8.1f} ms")
@@ -0,0 +1,50 @@
+import sys
+sys.path.insert(0, 'src/py')
+sys.setrecursionlimit(100000)
+
+import ast
+import contextlib
+import gc
+import glob
+import io
+import time
+from ast_utils.utils import get_line_offsets_for_str
+from ast_utils.preprocess import preprocess_syntaxtree
+
+def get_source_codes(folders: list[str]) -> list[str]:
+    source_codes = []
+    for folder in folders:
+        for filename in sorted(glob.glob(folder + "/**/*.py", recursive=True)):
+            with open(filename, encoding="utf-8") as f:
+                source_codes.append(f.read())
+    return source_codes
+
+# Time of preprocess_syntaxtree for all source codes (parsing is not timed, as for every file a new tree is needed).
+def time_preprocess(source_codes: list[str], n_unroll_loops: int, uniquify_calls: bool, repetitions: int = 5) -> tuple[float, int]:
+    line_offsets = [get_line_offsets_for_str(source_code) for source_code in source_codes]
+    timings = []
+    for _ in range(repetitions):
+        trees = [ast.parse(source_code) for source_code in source_codes]
+        n_files = 0
+        # like timeit, garbage collection is disabled during timing
+        gc.collect()
+        gc.disable()
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for tree, source_code, offsets in zip(trees, source_codes, line_offsets):
+                try:
+                    preprocess_syntaxtree(tree, source_code, offsets, n_unroll_loops, uniquify_calls)
+                    n_files += 1
+                except Exception:
+                    continue
+        timings.append(time.perf_counter() - t0)
+        gc.enable()
+    return min(timings), n_files
+
+if __name__ == "__main__":
+    # python3 experiments/benchmark_preprocess.py
+    source_codes = get_source_codes(["evaluation/pyro", "evaluation/pymc"])
+    for n_unroll_loops in (0, 3):
+        for uniquify_calls in (True, False):
+            t, n_files = time_preprocess(source_codes, n_unroll_loops, uniquify_calls)
+            print(f"n_unroll_loops={n_unroll_loops} uniquify_calls={uniquify_calls}: {n_files} files, {t*1000:.1f} ms")
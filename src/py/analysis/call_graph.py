@@ -14,7 +14,14 @@ class CallFinder(ast.NodeVisitor):
         # don't visit nested functions
         pass
 
-def get_called_functions(functions, scope_info, node: ast.AST):
+# user-defined functions by name, in the order of functions
+def get_functions_by_name(functions: list[ast.FunctionDef]) -> dict[str, list[ast.FunctionDef]]:
+    functions_by_name = dict()
+    for function in functions:
+        functions_by_name.setdefault(function.name, []).append(function)
+    return functions_by_name
+
+def get_called_functions(functions_by_name: dict[str, list[ast.FunctionDef]], scope_info, node: ast.AST):
     call_finder = CallFinder()
     if isinstance(node, ast.FunctionDef):
         call_finder.visit(node.body)
@@ -26,32 +33,32 @@ def get_called_functions(functions, scope_info, node: ast.AST):
     called_functions = []
     for call in call_finder.calls:
         call_name = get_call_name(call)
-        for function in functions:
+        for function in functions_by_name.get(call_name, ()):
             # same name and scope
-            if call_name == function.name and scope_info[call.func] == scope_info[function]:
+            if scope_info[call.func] == scope_info[function]:
                 called_functions.append(function)
                 break
 
     return called_functions
 
 class CallGraphAnalyzer(ast.NodeVisitor):
-    def __init__(self, functions, scope_info):
-        self.functions = functions
+    def __init__(self, functions_by_name, scope_info):
+        self.functions_by_name = functions_by_name
         self.scope_info = scope_info
         self.call_graph = {}
 
     def visit_FunctionDef(self, node: ast.FunctionDef):
         
-        self.call_graph[node] = get_called_functions(self.functions, self.scope_info, node)
+        self.call_graph[node] = get_called_functions(self.functions_by_name, self.scope_info, node)
         
         self.generic_visit(node)
 
         
     
 def compute_call_graph(syntax_tree: ast.AST, scope_info, node: ast.AST):
-    functions = get_user_defined_functions(syntax_tree)
+    functions_by_name = get_functions_by_name(get_user_defined_functions(syntax_tree))
     
-    cga = CallGraphAnalyzer(functions, scope_info)
+    cga = CallGraphAnalyzer(functions_by_name, scope_info)
     cga.visit(syntax_tree) # for the entire syntax_tree (file)
 
 
@@ -59,7 +66,7 @@ def compute_call_graph(syntax_tree: ast.AST, scope_info, node: ast.AST):
         # get subset called by node
         call_subgraph = {}
 
-        called_functions = get_called_functions(functions, scope_info, node)
+        called_functions = get_called_functions(functions_by_name, scope_info, node)
         call_subgraph[node] = called_functions.copy()
         
         # traverse complete call graph starting from node to get only functions that are reachable from node
@@ -0,0 +1,75 @@
+import ast
+from collections import deque
+from typing import Optional
+from ast_utils.cfg import *
+from ast_utils.scoped_tree import ScopedTree
+from analysis.dominators import get_immediate_post_dominators
+
+# Control dependence graph of one CFG (Ferrante, Ottenstein and Warren), computed from its post-dominator tree.
+# A node N is control dependent on A if A has a child S such that N post-dominates S, but N does not strictly post-dominate A.
+# The edges are found by walking up the post-dominator tree from S to the immediate post-dominator of A for each edge A -> S.
+#
+# The control parents of a node are the branch nodes that it is transitively control dependent on,
+# they are computed once per node and afterwards looked up.
+class ControlDependence:
+    def __init__(self, cfg: CFG) -> None:
+        self.compact = get_compact_cfg(cfg)
+        n_nodes = len(self.compact)
+        self.ipdom = get_immediate_post_dominators(self.compact)
+        # node index -> indices of nodes that it is directly control dependent on
+        self.dependencies: list[set[int]] = [set() for _ in range(n_nodes)]
+        for i in range(n_nodes):
+            for child in self.compact.get_successors(i):
+                runner = child
+                while runner != -1 and runner != self.ipdom[i]:
+                    self.dependencies[runner].add(i)
+                    runner = self.ipdom[runner]
+        self.control_parents: list[Optional[set[BranchNode]]] = [None] * n_nodes
+
+    # A join node is control dependent on the same branch nodes as its branch node,
+    # which includes the branch node itself for loops (the loop test is control dependent on itself).
+    # The function join node is control dependent on the control parents of all return statements,
+    # e.g. the return value depends on if statements with early return.
+    # If the function ends with a loop, the function join node also depends on the loop itself.
+    def get_control_parents(self, cfgnode: CFGNode) -> set[BranchNode]:
+        if isinstance(cfgnode, JoinNode):
+            return self.get_control_parents(cfgnode.branch_node)
+        i = cfgnode.index
+        if self.control_parents[i] is None:
+            nodes = self.compact.nodes
+            if isinstance(cfgnode, FuncJoinNode):
+                control_parents = set()
+                for parent in self.compact.get_predecessors(i):
+                    if isinstance(nodes[parent], BranchNode):
+                        control_parents.add(nodes[parent])
+                    elif isinstance(nodes[parent], ReturnNode) and nodes[parent].syntaxnode is EMPTY_RETURN_NODE:
+                        # implicit return at the exit of a loop that ends the function (the loop join node is removed)
+                        control_parents.update(nodes[node] for node in self.compact.get_predecessors(parent) if is_loop_branch_node(nodes[node]))
+                    control_parents |= self.get_control_parents(nodes[parent])
+            else:
+                visited = bytearray(len(nodes))
+                queue = deque(self.dependencies[i])
+                control_parents = set()
+                while queue:
+                    dependency = queue.popleft()
+                    if visited[dependency]:
+                        continue
+                    visited[dependency] = 1
+                    if isinstance(nodes[dependency], BranchNode):
+                        control_parents.add(nodes[dependency])
+                    queue.extend(self.dependencies[dependency])
+            self.control_parents[i] = control_parents
+        return self.control_parents[i]
+
+def is_loop_branch_node(cfgnode: CFGNode) -> bool:
+    return isinstance(cfgnode, BranchNode) and isinstance(cfgnode.syntaxnode.parent, (ast.For, ast.While))
+
+def get_control_dependence(scoped_tree: ScopedTree, cfgnode: CFGNode) -> ControlDependence:
+    cfg = scoped_tree.get_cfg_for_cfgnode(cfgnode)
+    control_dependence = scoped_tree.control_dependence.get(cfg)
+    if control_dependence is not None:
+        return control_dependence
+    with scoped_tree.analysis_lock:
+        if cfg not in scoped_tree.control_dependence:
+            scoped_tree.control_dependence[cfg] = ControlDependence(cfg)
+        return scoped_tree.control_dependence[cfg]
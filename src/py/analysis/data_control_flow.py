@@ -4,104 +4,13 @@ from ast_utils.node_finder import NodeFinder
 from ast_utils.utils import get_assignment_name, get_name, get_call_name
 from ast_utils.scoped_tree import ScopedTree, FunctionDefinition, NameFinder, is_referenced_identifier
 from ast_utils.cfg import *
-from copy import copy
 from typing import Tuple, Optional
-
-def get_cfgnode_target(cfgnode: CFGNode):
-    if isinstance(cfgnode, AssignNode):
-        return get_assignment_name(cfgnode.syntaxnode)
-    elif isinstance(cfgnode, FuncArgNode):
-        return cfgnode.syntaxnode
-    elif isinstance(cfgnode, LoopIterNode):
-        target = cfgnode.syntaxnode # is target expr of For(...)
-        assert isinstance(target, ast.Name), f"Cannot get_cfgnode_target for LoopIterNode {cfgnode}"
-        return target
-    else:
-        raise Exception(f"Cannot get_cfgnode_target for {cfgnode}")
-
-def peval_ints(node: ast.AST):
-    if isinstance(node, ast.Constant) and isinstance(node.value, int):
-        return node.value
-    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
-        return peval_ints(node.left) + peval_ints(node.right)
-    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Sub):
-        return peval_ints(node.left) - peval_ints(node.right)
-    return math.nan
-
-def get_static_index_of_ref_identifier(identifier: ast.Name):
-    ref_node = identifier.parent
-    match ref_node:
-        case ast.Subscript(slice=ast.Tuple(elts=_elts)):
-            return [peval_ints(el) for el in _elts]
-        case ast.Subscript(slice=_slice):
-            return [peval_ints(_slice)]
-    return math.nan
-
-# only applicable for container variables
-def point_to_same_element(identifier1: ast.Name, identifier2: ast.Name):
-    if not (is_referenced_identifier(identifier1) and is_referenced_identifier(identifier2)):
-        return False
-    return get_static_index_of_ref_identifier(identifier1) == get_static_index_of_ref_identifier(identifier2)
-
-def _get_RDs(scoped_tree: ScopedTree, cfgnode: CFGNode, identifier: ast.Name, path: list[CFGNode], rds: set[CFGNode], memo: dict[BranchNode, set[CFGNode]]):
-    for parent in cfgnode.parents:
-        if isinstance(parent, AssignNode):
-            target = get_cfgnode_target(parent)
-            if scoped_tree.identifieres_are_the_same(identifier, target):
-                rds.add(parent)
-                if not is_referenced_identifier(target):
-                    continue
-                if point_to_same_element(identifier, target):
-                    continue
-        elif isinstance(parent, (FuncArgNode, LoopIterNode)):
-            target = get_cfgnode_target(parent)
-            if scoped_tree.identifieres_are_the_same(identifier, target):
-                rds.add(parent)
-                continue
-        
-        is_cycle = any(p == parent for p in path)
-        if not is_cycle:
-            new_path = copy(path) if len(cfgnode.parents) > 1 else path
-            new_path.append(parent)
-            # we memoise at branch nodes to avoid path explosion
-            if isinstance(parent, BranchNode):
-                if parent in memo:
-                    branch_rds = memo[parent]
-                else:
-                    branch_rds = _get_RDs(scoped_tree, parent, identifier, new_path, set(), memo)
-                    memo[parent] = branch_rds
-                rds.update(branch_rds)
-            else:
-                _get_RDs(scoped_tree, parent, identifier, new_path, rds, memo)
-    return rds
+from collections import deque
+from analysis.control_dependence import get_control_dependence
+from analysis.ssa import get_ssa, get_cfgnode_target, peval_ints, get_static_index_of_ref_identifier, point_to_same_element
 
 def get_RDs(scoped_tree: ScopedTree, cfgnode: CFGNode, identifier: ast.Name):
-    return _get_RDs(scoped_tree, cfgnode, identifier, [], set(), dict())
-
-def _get_BPs(scoped_tree: ScopedTree, cfgnode: CFGNode, path: list[CFGNode], bps: set[CFGNode]):
-    if isinstance(cfgnode, JoinNode):
-        # j2 = cfgnode, b2 = cfgnode.branch_node
-        # if there is a bp b1 on this path, then b1 -> ... b2 -> ... j2 -> ... node -> ... j1
-        # since branch-join pairs cannot be interleaved (b1 cannot be on path between b2 and j2 - this is asserted in verify_cfg)
-        # that is we can skip to b2 which greatly avoids path explosion
-        return _get_BPs(scoped_tree, cfgnode.branch_node, path, bps)
-    
-    for parent in cfgnode.parents:
-        if isinstance(parent, BranchNode):
-            is_closed = any(p.branch_node == parent for p in path if isinstance(p, JoinNode))
-            if not is_closed:
-                # B -> ... -> node -> ... -> J
-                bps.add(parent)
-        
-        is_cycle = any(p == parent for p in path)
-        if not is_cycle:
-            new_path = copy(path) if len(cfgnode.parents) > 1 else path
-            new_path.append(parent)
-            _get_BPs(scoped_tree, parent, new_path, bps)
-    return bps
-
-def get_BPs(scoped_tree: ScopedTree, cfgnode: CFGNode):
-    return _get_BPs(scoped_tree, cfgnode, [], set())
+    return get_ssa(scoped_tree, cfgnode).get(cfgnode, identifier)
 
 def get_identifiers_read_in_syntaxnode(scoped_tree: ScopedTree, node: ast.AST):
     identifiers = None
@@ -128,14 +37,14 @@ def get_identifiers_read_in_syntaxnode(scoped_tree: ScopedTree, node: ast.AST):
     
     return set(i for i in identifiers if i.id in scoped_tree.all_user_symbols)
 
+# calls f(...) of function with the same symbol as func_syntaxnode, found with the call index by name
 def find_call_sites_for_function(scoped_tree: ScopedTree, func_syntaxnode: ast.AST):
     assert isinstance(func_syntaxnode, ast.FunctionDef)
-    call_finder = NodeFinder(
-        lambda node: isinstance(node, ast.Call) and scoped_tree.identifieres_are_the_same(node.func, func_syntaxnode),
-        lambda node: node
+    symbol_id = scoped_tree.get_symbol_id(func_syntaxnode)
+    return scoped_tree.syntax_tree.get_call_index().find_calls(
+        func_syntaxnode.name,
+        lambda node: isinstance(node.func, ast.Name) and scoped_tree.symbol_ids.get(node.func) == symbol_id
     )
-    call_finder.visit(scoped_tree.root_node)
-    return call_finder.result
 
 def get_function_for_parameter(param_node: ast.arg):
      assert isinstance(param_node, ast.arg)
@@ -160,12 +69,29 @@ def get_matching_call_arg(param_node: ast.arg, call_site: ast.Call, func: ast.Fu
     else:
         return None # has to have default argument
 
-def get_all_exprs_passed_to_function_at_param(scoped_tree: ScopedTree, param_node: ast.arg):
+# Results shared by many dependency queries on the same scoped tree,
+# e.g. all nodes of one bulk request or all requests of one tree in the server session.
+# Only valid as long as the scoped tree is not modified.
+# Entries are deterministic, so concurrent queries may fill the cache without lock.
+class DependencyCache:
+    def __init__(self):
+        self.call_sites: dict[ast.FunctionDef, list[ast.Call]] = dict()
+        self.data_deps: dict[Tuple[CFGNode, ast.AST], set[ast.AST]] = dict()
+        self.control_parents: dict[CFGNode, set[ast.AST]] = dict()
+
+def _find_call_sites_for_function(scoped_tree: ScopedTree, func_syntaxnode: ast.AST, cache: Optional[DependencyCache]):
+    if cache is None:
+        return find_call_sites_for_function(scoped_tree, func_syntaxnode)
+    if func_syntaxnode not in cache.call_sites:
+        cache.call_sites[func_syntaxnode] = find_call_sites_for_function(scoped_tree, func_syntaxnode)
+    return cache.call_sites[func_syntaxnode]
+
+def get_all_exprs_passed_to_function_at_param(scoped_tree: ScopedTree, param_node: ast.arg, cache: Optional[DependencyCache]=None):
     exprs = []
     func_syntaxnode = get_function_for_parameter(param_node)
     # in a pre-processing step we could duplicate the function for each of its calls
     # to make the following more precise, i.e. only <=1 call site per function
-    call_sites = find_call_sites_for_function(scoped_tree, func_syntaxnode)
+    call_sites = _find_call_sites_for_function(scoped_tree, func_syntaxnode, cache)
     for call_site in call_sites:
         matching_call_arg = get_matching_call_arg(param_node, call_site, func_syntaxnode)
         if matching_call_arg is not None:
@@ -173,53 +99,72 @@ def get_all_exprs_passed_to_function_at_param(scoped_tree: ScopedTree, param_nod
     return exprs
 
 
-def get_all_exprs_passed_to_function(scoped_tree: ScopedTree, func_syntaxnode: ast.AST):
+def get_all_exprs_passed_to_function(scoped_tree: ScopedTree, func_syntaxnode: ast.AST, cache: Optional[DependencyCache]=None):
     exprs =[]
-    call_sites = find_call_sites_for_function(scoped_tree, func_syntaxnode)
+    call_sites = _find_call_sites_for_function(scoped_tree, func_syntaxnode, cache)
     for call_site in call_sites:
         for call_arg in call_site.args + call_site.keywords:
             exprs.append(call_arg)
     return exprs
 
-def data_deps_for_node(scoped_tree: ScopedTree, syntaxnode: ast.AST):
+def get_all_exprs_passed_to_function_at_call_site(scoped_tree: ScopedTree, param_node: ast.AST, call_site: ast.Call):
+    if isinstance(param_node, ast.arguments):
+        return call_site.args + call_site.keywords
+    matching_call_arg = get_matching_call_arg(param_node, call_site, get_function_for_parameter(param_node))
+    return [matching_call_arg] if matching_call_arg is not None else []
+
+# expressions (with their cfg node) whose read identifiers are the data dependencies of syntaxnode,
+# for parameters the expressions passed to the parameter at call_site or at all call sites if call_site is None
+def get_dependency_exprs(scoped_tree: ScopedTree, syntaxnode: ast.AST, cache: Optional[DependencyCache]=None, call_site: Optional[ast.Call]=None) -> list[Tuple[CFGNode, ast.AST]]:
     if isinstance(syntaxnode, ast.FunctionDef):
-        # union over data dependencies of all return statements
+        # return statements
         cfg = scoped_tree.get_cfg_for_function_syntaxnode(syntaxnode)
+        return [(cfgnode, get_return_expr(cfgnode)) for cfgnode in cfg.nodes if isinstance(cfgnode, ReturnNode)]
+
+    elif isinstance(syntaxnode, (ast.arg, ast.arguments)):
+        if call_site is not None:
+            exprs = get_all_exprs_passed_to_function_at_call_site(scoped_tree, syntaxnode, call_site)
+        elif isinstance(syntaxnode, ast.arg):
+            # expression corresponding to parameter in all calls
+            exprs = get_all_exprs_passed_to_function_at_param(scoped_tree, syntaxnode, cache)
+        else:
+            # expression corresponding to ALL parameters in all calls
+            exprs = get_all_exprs_passed_to_function(scoped_tree, syntaxnode.parent, cache)
+        return [(scoped_tree.get_cfgnode_for_syntaxnode(expr)[1], expr) for expr in exprs]
+
+    else:
+        _, cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(syntaxnode)
+        return [(cfgnode, syntaxnode)]
+
+def data_deps_for_node(scoped_tree: ScopedTree, syntaxnode: ast.AST, cache: Optional[DependencyCache]=None, call_site: Optional[ast.Call]=None):
+    if isinstance(syntaxnode, (ast.FunctionDef, ast.arg, ast.arguments)):
+        # union over data dependencies of all return statements (function) or of all passed expressions (parameter)
         data_deps = set()
-        for cfgnode in cfg.nodes:
-            if isinstance(cfgnode, ReturnNode):
-                data_deps = data_deps | _data_deps_for_node(scoped_tree, cfgnode, get_return_expr(cfgnode))
-        return data_deps
-    
-    elif isinstance(syntaxnode, ast.arg):
-        # union of expression corresponding to parameter in all calls
-        data_deps = set()
-        # return data_deps
-        for expr in get_all_exprs_passed_to_function_at_param(scoped_tree, syntaxnode):
-            _, cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(expr)
-            data_deps = data_deps | _data_deps_for_node(scoped_tree, cfgnode, expr)
-        return data_deps
-    
-    elif isinstance(syntaxnode, ast.arguments):
-        # union of expression corresponding to ALL parameters in all calls
-        data_deps = set()
-        # return data_deps
-        func_syntaxnode = syntaxnode.parent
-        for expr in get_all_exprs_passed_to_function(scoped_tree, func_syntaxnode):
-            _, cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(expr)
-            data_deps = data_deps | _data_deps_for_node(scoped_tree, cfgnode, expr)
+        for cfgnode, expr in get_dependency_exprs(scoped_tree, syntaxnode, cache, call_site):
+            data_deps = data_deps | _cached_data_deps_for_node(scoped_tree, cfgnode, expr, cache)
         return data_deps
-
     else:
         _, cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(syntaxnode)
-        return _data_deps_for_node(scoped_tree, cfgnode, syntaxnode)
+        return _cached_data_deps_for_node(scoped_tree, cfgnode, syntaxnode, cache)
 
 def maybe_get_user_function(scoped_tree: ScopedTree, identifier) -> Tuple[bool, Optional[FunctionDefinition]]:
-    for function in scoped_tree.all_functions:
+    symbol_id = scoped_tree.symbol_ids.get(identifier)
+    if symbol_id is not None:
+        function = scoped_tree.function_for_symbol.get(symbol_id)
+        return function is not None, function
+    for function in scoped_tree.all_functions: # attributes or identifiers without scope
         if scoped_tree.identifieres_are_the_same(identifier, function.node):
             return True, function
     return False, None
 
+def _cached_data_deps_for_node(scoped_tree: ScopedTree, cfgnode: CFGNode, syntaxnode: ast.AST, cache: Optional[DependencyCache]):
+    if cache is None:
+        return _data_deps_for_node(scoped_tree, cfgnode, syntaxnode)
+    key = (cfgnode, syntaxnode)
+    if key not in cache.data_deps:
+        cache.data_deps[key] = _data_deps_for_node(scoped_tree, cfgnode, syntaxnode)
+    return cache.data_deps[key]
+
 def _data_deps_for_node(scoped_tree: ScopedTree, cfgnode: CFGNode, syntaxnode: ast.AST):
     identifiers = get_identifiers_read_in_syntaxnode(scoped_tree, syntaxnode)
 
@@ -235,40 +180,248 @@ def _data_deps_for_node(scoped_tree: ScopedTree, cfgnode: CFGNode, syntaxnode: a
 
     return data_deps
 
-def control_parents_for_node(scoped_tree: ScopedTree, syntaxnode: ast.AST):
-    if isinstance(syntaxnode, ast.FunctionDef):
+def control_parents_for_node(scoped_tree: ScopedTree, syntaxnode: ast.AST, cache: Optional[DependencyCache]=None, call_site: Optional[ast.Call]=None):
+    if call_site is not None and isinstance(syntaxnode, (ast.arg, ast.arguments)):
+        return control_parents_for_node(scoped_tree, call_site, cache)
+
+    elif isinstance(syntaxnode, ast.FunctionDef):
         cfg = scoped_tree.get_cfg_for_function_syntaxnode(syntaxnode)
         cfgnode = list(cfg.endnode.parents)[0] # function join node
-        return _control_parents_for_node(scoped_tree, cfg, cfgnode)
+        return _cached_control_parents_for_node(scoped_tree, cfg, cfgnode, cache)
     
     elif isinstance(syntaxnode, ast.arg) or isinstance(syntaxnode, ast.arguments):
         control_parents = set()
         # return set()
         func_syntaxnode = syntaxnode.parent if isinstance(syntaxnode, ast.arguments) else get_function_for_parameter(syntaxnode)
-        call_sites = find_call_sites_for_function(scoped_tree, func_syntaxnode)
+        call_sites = _find_call_sites_for_function(scoped_tree, func_syntaxnode, cache)
         for call_site in call_sites:
-            control_parents = control_parents | control_parents_for_node(scoped_tree, call_site)
+            control_parents = control_parents | control_parents_for_node(scoped_tree, call_site, cache)
         return control_parents
 
     else:
         cfg, cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(syntaxnode)
+        return _cached_control_parents_for_node(scoped_tree, cfg, cfgnode, cache)
+
+def _cached_control_parents_for_node(scoped_tree: ScopedTree, cfg: CFG, cfgnode: CFGNode, cache: Optional[DependencyCache]):
+    if cache is None:
         return _control_parents_for_node(scoped_tree, cfg, cfgnode)
+    if cfgnode not in cache.control_parents:
+        cache.control_parents[cfgnode] = _control_parents_for_node(scoped_tree, cfg, cfgnode)
+    return cache.control_parents[cfgnode]
 
 def _control_parents_for_node(scoped_tree: ScopedTree, cfg: CFG, cfgnode: CFGNode):
     assert cfgnode in cfg.nodes
-    bps = get_BPs(scoped_tree, cfgnode)
+    bps = get_control_dependence(scoped_tree, cfgnode).get_control_parents(cfgnode)
+    return {bp.syntaxnode.parent for bp in bps}
+
+
+# syntax node whose data dependencies decide if the body of control parent is executed
+def get_control_subnode(control_parent: ast.AST):
+    if isinstance(control_parent, (ast.If, ast.While)):
+        return control_parent.test
+    elif isinstance(control_parent, ast.For):
+        return control_parent.iter
+    raise Exception(f"Unsupported control parent {control_parent}")
+
+# Transitive closure of data (and control) dependencies starting from nodes, breadth first.
+# Reaching a node in stop_nodes does not continue the traversal at the stop node itself but at its
+# mapped node (e.g. the address node of a random variable), or not at all if it is mapped to None.
+# Each node is visited with a flag that is set once the traversal followed a control dependency
+# (or from the start if is_control = True).
+# If summarize_calls = True, the calls of user functions are followed context-sensitively with function summaries
+# (see FunctionSummary), which is intended for trees that were preprocessed without uniquify_calls.
+# Returns
+#  - the reached stop nodes in the order of discovery
+#  - the stop nodes that were reached with the control flag set
+#  - all nodes that were traversed
+def dependency_closure(scoped_tree: ScopedTree, nodes: list[ast.AST], stop_nodes: dict[ast.AST, Optional[ast.AST]],
+                       follow_control: bool = True, is_control: bool = False, cache: Optional[DependencyCache]=None,
+                       summarize_calls: bool = False):
+    if cache is None:
+        cache = DependencyCache()
 
-    if isinstance(cfg.startnode, FuncStartNode):
-        for branch_node in cfg.nodes:
-            if not isinstance(branch_node, BranchNode):
+    closure = DependencyClosure(scoped_tree, stop_nodes, follow_control, cache, dict() if summarize_calls else None)
+    for node in nodes:
+        closure.queue.append((node, is_control, None))
+    closure.run()
+
+    return list(closure.reached), closure.control_reached, list(closure.traversed)
+
+# State of the breadth first traversal of dependency_closure.
+# Queue entries are (node, is_control, call_site), the call site is only given for parameters that
+# are followed to the expressions passed at this call site (instead of at all call sites).
+class DependencyClosure:
+    def __init__(self, scoped_tree: ScopedTree, stop_nodes: dict[ast.AST, Optional[ast.AST]], follow_control: bool,
+                 cache: DependencyCache, summaries: Optional[dict]) -> None:
+        self.scoped_tree = scoped_tree
+        self.stop_nodes = stop_nodes
+        self.follow_control = follow_control
+        self.cache = cache
+        # (function, is_control) -> FunctionSummary, shared with the closures of all summaries, None if calls are not summarized
+        self.summaries = summaries
+        self.reached = dict() # insertion ordered set
+        self.control_reached = []
+        self.traversed = dict() # insertion ordered set
+        self.marked = set()
+        self.queue = deque()
+        self.pending: set[FunctionSummary] = set() # summaries that were still computed when they were reached
+
+    def run(self):
+        while len(self.queue) > 0:
+            node, is_control, call_site = self.queue.popleft()
+            if node not in self.traversed:
+                self.traversed[node] = None
+            if call_site is None and self.is_summary_parameter(node):
+                self.add_parameter(node, is_control)
                 continue
-            if is_on_path_between_nodes(cfgnode, branch_node, cfg.endnode):
-                cfgnode.block()
-                branch_node.join_node.block()
-                if is_reachable(branch_node, cfg.endnode):
-                    bps.add(branch_node)
-                branch_node.join_node.unblock()
-                cfgnode.unblock()
 
-    return {bp.syntaxnode.parent for bp in bps}
+            data_deps = data_deps_for_node(self.scoped_tree, node, self.cache, call_site)
+            calls = self.get_summarized_calls(node, call_site, data_deps)
+            for dep in data_deps:
+                if dep in calls:
+                    for call in calls[dep]:
+                        self.add_call(dep, call, is_control)
+                elif self.summaries is not None and isinstance(dep, ast.FunctionDef) and dep not in self.stop_nodes:
+                    # function is not called but e.g. passed as argument, its parameters are followed to all call sites
+                    self.add_call(dep, None, is_control)
+                else:
+                    self.add_dependency(dep, is_control)
+
+            if self.follow_control:
+                for control_parent in control_parents_for_node(self.scoped_tree, node, self.cache, call_site):
+                    control_node = get_control_subnode(control_parent)
+                    if (control_node, is_control) not in self.marked:
+                        self.queue.append((control_node, True, None))
+                        self.marked.add((control_node, True))
+
+    def add_dependency(self, dep: ast.AST, is_control: bool):
+        if (dep, is_control) not in self.marked:
+            self.marked.add((dep, is_control))
+            if dep in self.stop_nodes:
+                if dep not in self.reached:
+                    self.reached[dep] = None
+                if is_control:
+                    self.control_reached.append(dep)
+                resume_node = self.stop_nodes[dep]
+                if resume_node is not None:
+                    self.queue.append((resume_node, is_control, None))
+                    self.marked.add((resume_node, is_control))
+            else:
+                self.queue.append((dep, is_control, None))
+
+    def add_parameter_at_call(self, param: ast.AST, is_control: bool, call_site: ast.Call):
+        if (param, is_control, call_site) not in self.marked:
+            self.marked.add((param, is_control, call_site))
+            self.queue.append((param, is_control, call_site))
+
+    # calls of user functions in the expressions read by node: function -> calls,
+    # only for functions that are dependencies of node and no stop nodes (if calls are summarized)
+    def get_summarized_calls(self, node: ast.AST, call_site: Optional[ast.Call], data_deps: set[ast.AST]) -> dict[ast.FunctionDef, list[ast.Call]]:
+        calls = dict()
+        if self.summaries is None or not any(isinstance(dep, ast.FunctionDef) for dep in data_deps):
+            return calls
+        for _, expr in get_dependency_exprs(self.scoped_tree, node, self.cache, call_site):
+            for identifier in get_identifiers_read_in_syntaxnode(self.scoped_tree, expr):
+                call = getattr(identifier, "parent", None)
+                if isinstance(call, ast.Call) and call.func is identifier:
+                    is_function, function = maybe_get_user_function(self.scoped_tree, identifier)
+                    if is_function and function.node in data_deps and function.node not in self.stop_nodes:
+                        calls.setdefault(function.node, []).append(call)
+        return calls
+
+    # dependency on the return values of function at call (at all call sites if call is None),
+    # the summary of function is instantiated at call
+    def add_call(self, function: ast.FunctionDef, call: Optional[ast.Call], is_control: bool):
+        if (function, is_control, call) in self.marked:
+            return
+        self.marked.add((function, is_control, call))
+
+        summary = self.summaries.get((function, is_control))
+        if summary is None:
+            summary = FunctionSummary(self, function, is_control)
+            self.summaries[(function, is_control)] = summary
+            summary.compute()
+            if len(summary.pending) > 0:
+                # summary misses the calls that are instantiated in the pending summaries,
+                # it has to be recomputed for calls outside of them
+                del self.summaries[(function, is_control)]
+                self.pending |= summary.pending
+        elif not summary.done:
+            # recursive call, the summary is computed by a closure that is suspended on the stack
+            summary.add_recursive_call(call)
+            if self is not summary:
+                self.pending.add(summary)
+            return
+
+        for dep in summary.control_reached:
+            if (dep, True) not in self.marked:
+                self.control_reached.append(dep)
+        for dep in summary.reached:
+            if dep not in self.reached:
+                self.reached[dep] = None
+        for node in summary.traversed:
+            if node not in self.traversed:
+                self.traversed[node] = None
+        self.marked |= summary.marked - summary.parameters.keys()
+        for param, param_is_control in summary.parameters:
+            if call is None:
+                self.add_dependency(param, param_is_control)
+            else:
+                self.add_parameter_at_call(param, param_is_control, call)
+
+    def is_summary_parameter(self, node: ast.AST) -> bool:
+        return False
+
+    def add_parameter(self, param: ast.AST, is_control: bool):
+        pass
+
+# Summary of a user function for the context-sensitive dependency closure:
+# the closure starting at the function node (i.e. at its return values), in which the parameters of the function
+# are not followed to the expressions passed at all call sites but are recorded.
+# The summary is computed once per function (and flag) and instantiated at each call of the function
+# that is reached, where the recorded parameters are followed to the expressions passed at this call.
+# This gives the same dependencies as copying the function for each of its calls (see CallUniquifier)
+# without copying the function and without traversing it once per call.
+# Recursive calls of the function are instantiated in the summary itself, calls of functions whose summary
+# is computed at the same time (mutual recursion) are instantiated in the summary of the caller of that function.
+# Parameters reached without call site (e.g. from a start node or of other functions) are followed to all call sites.
+class FunctionSummary(DependencyClosure):
+    def __init__(self, caller: DependencyClosure, function: ast.FunctionDef, is_control: bool) -> None:
+        super().__init__(caller.scoped_tree, caller.stop_nodes, caller.follow_control, caller.cache, caller.summaries)
+        self.function = function
+        self.is_control = is_control
+        self.parameters = dict() # (parameter, is_control) -> None, insertion ordered set
+        self.recursive_calls = []
+        self.all_call_sites = False # function is also reached without call, parameters are followed to all call sites
+        self.done = False
+
+    def compute(self):
+        self.marked.add((self.function, self.is_control))
+        self.queue.append((self.function, self.is_control, None))
+        self.run()
+        self.pending.discard(self)
+        self.done = True
+
+    def is_summary_parameter(self, node: ast.AST) -> bool:
+        if self.all_call_sites:
+            return False
+        if isinstance(node, ast.arg):
+            return get_function_for_parameter(node) is self.function
+        return isinstance(node, ast.arguments) and node.parent is self.function
+
+    def add_parameter(self, param: ast.AST, is_control: bool):
+        if (param, is_control) not in self.parameters:
+            self.parameters[(param, is_control)] = None
+            for call in self.recursive_calls:
+                self.add_parameter_at_call(param, is_control, call)
 
+    def add_recursive_call(self, call: Optional[ast.Call]):
+        if call is None:
+            if not self.all_call_sites:
+                self.all_call_sites = True
+                for param, is_control in self.parameters:
+                    self.queue.append((param, is_control, None))
+            return
+        self.recursive_calls.append(call)
+        for param, is_control in self.parameters:
+            self.add_parameter_at_call(param, is_control, call)
@@ -0,0 +1,98 @@
+from typing import Callable, Iterable
+from ast_utils.cfg import *
+
+# The algorithms work on node indices of the CompactCFG, successors and predecessors are given as functions from index to indices.
+# Dominator trees are lists of the immediate dominator index per node, -1 for the root and nodes that are not reachable.
+
+# Adds an edge from root to every node that is not reachable from root,
+# such that all nodes have a (post-)dominator (e.g. nodes after infinite loops cannot reach the end node).
+# Returns the successor and predecessor functions of the extended graph.
+def add_virtual_edges(root: int, n_nodes: int, get_successors: Callable[[int], Iterable[int]], get_predecessors: Callable[[int], Iterable[int]]):
+    reachable = _get_reachable(root, n_nodes, get_successors)
+    unreachable = [i for i in range(n_nodes) if not reachable[i]]
+    if len(unreachable) == 0:
+        return get_successors, get_predecessors
+
+    def successors(i):
+        return (*get_successors(i), *unreachable) if i == root else get_successors(i)
+    def predecessors(i):
+        return (*get_predecessors(i), root) if not reachable[i] else get_predecessors(i)
+    return successors, predecessors
+
+# Immediate dominators of all nodes reachable from root,
+# with the iterative algorithm of Cooper, Harvey and Kennedy.
+def get_immediate_dominators(root: int, n_nodes: int, get_successors: Callable[[int], Iterable[int]], get_predecessors: Callable[[int], Iterable[int]]) -> list[int]:
+    # postorder of depth first search from root
+    postorder = []
+    visited = bytearray(n_nodes)
+    visited[root] = 1
+    stack = [(root, iter(get_successors(root)))]
+    while stack:
+        i, successors = stack[-1]
+        successor = next(successors, None)
+        if successor is None:
+            stack.pop()
+            postorder.append(i)
+        elif not visited[successor]:
+            visited[successor] = 1
+            stack.append((successor, iter(get_successors(successor))))
+    order = [-1] * n_nodes
+    for k, i in enumerate(postorder):
+        order[i] = k
+
+    def intersect(a, b):
+        while a != b:
+            while order[a] < order[b]:
+                a = idom[a]
+            while order[b] < order[a]:
+                b = idom[b]
+        return a
+
+    idom = [-1] * n_nodes
+    idom[root] = root
+    changed = True
+    while changed:
+        changed = False
+        for i in reversed(postorder):
+            if i == root:
+                continue
+            new_idom = -1
+            for predecessor in get_predecessors(i):
+                if idom[predecessor] != -1:
+                    new_idom = predecessor if new_idom == -1 else intersect(predecessor, new_idom)
+            if idom[i] != new_idom:
+                idom[i] = new_idom
+                changed = True
+    idom[root] = -1
+    return idom
+
+# Immediate post-dominators of all nodes of the CFG (-1 for the end node), dominators of the reversed CFG.
+def get_immediate_post_dominators(compact: CompactCFG) -> list[int]:
+    get_children, get_parents = add_virtual_edges(compact.end, len(compact), compact.get_predecessors, compact.get_successors)
+    return get_immediate_dominators(compact.end, len(compact), get_children, get_parents)
+
+# Dominance frontier of every node: the nodes where its dominance ends, i.e. where control flow from other paths joins.
+# Computed by walking up the dominator tree from the predecessors of each join (Cooper, Harvey and Kennedy).
+def get_dominance_frontiers(idom: list[int], get_predecessors: Callable[[int], Iterable[int]]) -> list[set[int]]:
+    frontiers = [set() for _ in idom]
+    for i in range(len(idom)):
+        predecessors = get_predecessors(i)
+        if len(predecessors) < 2:
+            continue
+        for predecessor in predecessors:
+            runner = predecessor
+            while runner != -1 and runner != idom[i]:
+                frontiers[runner].add(i)
+                runner = idom[runner]
+    return frontiers
+
+def _get_reachable(root: int, n_nodes: int, get_next: Callable[[int], Iterable[int]]) -> bytearray:
+    reachable = bytearray(n_nodes)
+    reachable[root] = 1
+    stack = [root]
+    while stack:
+        for next_node in get_next(stack.pop()):
+            if not reachable[next_node]:
+                reachable[next_node] = 1
+                stack.append(next_node)
+    return reachable
@@ -0,0 +1,370 @@
+import ast
+import math
+from bisect import bisect_right
+from typing import Optional
+from ast_utils.cfg import *
+from ast_utils.scoped_tree import ScopedTree, NameFinder, is_referenced_identifier
+from ast_utils.utils import get_assignment_name
+from analysis.dominators import add_virtual_edges, get_immediate_dominators, get_dominance_frontiers
+
+def get_cfgnode_target(cfgnode: CFGNode):
+    if isinstance(cfgnode, AssignNode):
+        return get_assignment_name(cfgnode.syntaxnode)
+    elif isinstance(cfgnode, FuncArgNode):
+        return cfgnode.syntaxnode
+    elif isinstance(cfgnode, LoopIterNode):
+        target = cfgnode.syntaxnode # is target expr of For(...)
+        assert isinstance(target, ast.Name), f"Cannot get_cfgnode_target for LoopIterNode {cfgnode}"
+        return target
+    else:
+        raise Exception(f"Cannot get_cfgnode_target for {cfgnode}")
+
+def peval_ints(node: ast.AST):
+    if isinstance(node, ast.Constant) and isinstance(node.value, int):
+        return node.value
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        return peval_ints(node.left) + peval_ints(node.right)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Sub):
+        return peval_ints(node.left) - peval_ints(node.right)
+    return math.nan
+
+def get_static_index_of_ref_identifier(identifier: ast.Name):
+    ref_node = identifier.parent
+    match ref_node:
+        case ast.Subscript(slice=ast.Tuple(elts=_elts)):
+            return [peval_ints(el) for el in _elts]
+        case ast.Subscript(slice=_slice):
+            return [peval_ints(_slice)]
+    return math.nan
+
+# only applicable for container variables
+def point_to_same_element(identifier1: ast.Name, identifier2: ast.Name):
+    if not (is_referenced_identifier(identifier1) and is_referenced_identifier(identifier2)):
+        return False
+    return get_static_index_of_ref_identifier(identifier1) == get_static_index_of_ref_identifier(identifier2)
+
+# The definitions of one CFG: AssignNode, FuncArgNode and LoopIterNode, numbered by their index in self.definitions.
+# Nodes are referred to by their index in the CompactCFG of the CFG.
+# Definitions of the same symbol (symbol id of scoped tree) kill each other, except for assignments to container elements x[...] = ...
+# which only kill definitions for reads of the same static element (see point_to_same_element).
+# Definitions whose target is not supported (e.g. attribute assignments x.a = ...) are reaching for every symbol
+# and raise their error if they reach a query, like a path search through the CFG would.
+class DefinitionTable:
+    def __init__(self, scoped_tree: ScopedTree, cfg: CFG) -> None:
+        self.scoped_tree = scoped_tree
+        self.compact = get_compact_cfg(cfg)
+        self.order = _get_nodes_in_reverse_postorder(self.compact) # node indices
+
+        self.definitions: list[CFGNode] = []
+        self.definition_nodes: list[int] = []           # node index of definition
+        self.definition_index = [-1] * len(self.compact) # node index -> index of definition (-1 if no definition)
+        self.symbols: list[Optional[int]] = []     # symbol of definition
+        self.is_strong: list[bool] = []                 # definition kills all definitions of symbol
+        self.elements: list[Optional[tuple]] = []       # static element index of container assignment (None if unknown)
+        self.symbol_definitions: dict[int, int] = dict() # symbol -> set of its definitions
+        self.unsupported = 0                                  # set of definitions with unsupported target
+        self.errors: dict[int, Exception] = dict()
+
+        for node in self.order:
+            cfgnode = self.compact.nodes[node]
+            if not isinstance(cfgnode, (AssignNode, FuncArgNode, LoopIterNode)):
+                continue
+            i = len(self.definitions)
+            self.definitions.append(cfgnode)
+            self.definition_nodes.append(node)
+            self.definition_index[node] = i
+            try:
+                target = get_cfgnode_target(cfgnode)
+                symbol = self.get_symbol(target)
+            except Exception as e:
+                self.symbols.append(None)
+                self.is_strong.append(False)
+                self.elements.append(None)
+                self.unsupported |= 1 << i
+                self.errors[i] = e
+                continue
+            self.symbols.append(symbol)
+            self.symbol_definitions[symbol] = self.symbol_definitions.get(symbol, 0) | (1 << i)
+            if isinstance(cfgnode, AssignNode) and is_referenced_identifier(target):
+                self.is_strong.append(False)
+                self.elements.append(get_static_element(target))
+            else:
+                self.is_strong.append(True)
+                self.elements.append(None)
+
+    def get_symbol(self, identifier: ast.AST) -> int:
+        return self.scoped_tree.get_symbol_id(identifier)
+
+    # static element of read identifier, definitions with the same element kill each other
+    def get_read_element(self, identifier: ast.AST) -> Optional[tuple]:
+        return get_static_element(identifier) if is_referenced_identifier(identifier) else None
+
+# Static index of container element x[i,j] as tuple, None if it cannot be compared to other indices.
+# Indices that cannot be evaluated to an int are all considered equal (like comparing lists with the math.nan object).
+def get_static_element(identifier: ast.Name) -> Optional[tuple]:
+    index = get_static_index_of_ref_identifier(identifier)
+    if not isinstance(index, list):
+        return None
+    element = []
+    for i in index:
+        if i is math.nan:
+            element.append(None)
+        elif i != i:
+            return None # nan from arithmetic, is not equal to any index
+        else:
+            element.append(i)
+    return tuple(element)
+
+def _iter_bits(bits: int):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+# indices of all nodes of the CompactCFG, nodes reachable from start node in reverse postorder first
+def _get_nodes_in_reverse_postorder(compact: CompactCFG) -> list[int]:
+    postorder = []
+    visited = bytearray(len(compact))
+    visited[compact.start] = 1
+    stack = [(compact.start, iter(compact.get_successors(compact.start)))]
+    while stack:
+        node, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            postorder.append(node)
+        elif not visited[child]:
+            visited[child] = 1
+            stack.append((child, iter(compact.get_successors(child))))
+    nodes = postorder[::-1]
+    # nodes that are not reachable from start node
+    nodes.extend(node for node in range(len(compact)) if not visited[node])
+    return nodes
+
+
+# A version of a symbol in SSA form: a definition (AssignNode, FuncArgNode, LoopIterNode) or a phi node.
+# Assignments to container elements x[...] = ... and definitions with unsupported target are weak,
+# the previous version of the symbol is still reachable through them (see DefinitionTable).
+class SSAValue:
+    def __init__(self, symbol: int, cfgnode: CFGNode, is_phi: bool=False, previous: Optional["SSAValue"]=None,
+                 is_strong: bool=True, element: Optional[tuple]=None, error: Optional[Exception]=None) -> None:
+        self.symbol = symbol
+        self.cfgnode = cfgnode
+        self.is_phi = is_phi
+        self.operands: list[SSAValue] = [] # of phi, one per predecessor in which the symbol is defined
+        self.previous = previous
+        self.is_strong = is_strong
+        self.element = element
+        self.error = error
+        self.uses: set[CFGNode] = set()              # def-use edges: nodes that read this version of the symbol
+        self.successors: list[SSAValue] = []         # phis and weak definitions that this version flows into
+
+    def __repr__(self) -> str:
+        kind = "phi" if self.is_phi else "def"
+        return f"SSAValue({kind}, symbol {self.symbol}, {self.cfgnode})"
+
+# Versions of one symbol at its sites (definitions and phi nodes), sites are node indices sorted by preorder of the dominator tree.
+class SymbolVersions:
+    def __init__(self, sites: list[int], pre: list[int], last: list[int]) -> None:
+        self.sites = sites
+        self.pre = pre
+        self.last = last
+        self.site_pres = [pre[node] for node in sites]
+        # index in sites of closest site that strictly dominates site (-1 if none)
+        self.up = [-1] * len(sites)
+        stack = []
+        for k, node in enumerate(sites):
+            while stack and last[sites[stack[-1]]] < pre[node]:
+                stack.pop()
+            self.up[k] = stack[-1] if stack else -1
+            stack.append(k)
+        self.phis: dict[int, SSAValue] = dict()
+        self.definitions: dict[int, SSAValue] = dict()
+
+    # version at entry of node (None if undefined)
+    def get_entry(self, node: int) -> Optional[SSAValue]:
+        if node in self.phis:
+            return self.phis[node]
+        pre = self.pre[node]
+        k = bisect_right(self.site_pres, pre) - 1
+        if k != -1 and self.sites[k] == node:
+            k = self.up[k]
+        # closest site before node in preorder is dominated by the closest site that dominates node
+        while k != -1 and not (self.site_pres[k] < pre <= self.last[self.sites[k]]):
+            k = self.up[k]
+        if k == -1:
+            return None
+        return self.get_exit(self.sites[k])
+
+    # version at exit of node (None if undefined)
+    def get_exit(self, node: int) -> Optional[SSAValue]:
+        if node in self.definitions:
+            return self.definitions[node]
+        return self.get_entry(node)
+
+# SSA form of one CFG (Cytron et al.), built once per CFG and shared by all analyses of the scoped tree.
+# Phi nodes are placed at the iterated dominance frontier of the definitions of a symbol,
+# these are the join nodes of if statements, but also loop headers (branch node of for and while loops) and the function join node.
+# The SSA form of a symbol is constructed on the first query of the symbol by renaming along the dominator tree.
+#
+# The reaching definitions of a read are found by following phi operands and weak definitions,
+# weak definitions of the same static container element as the read stop the search like strong definitions.
+class SSA(DefinitionTable):
+    def __init__(self, scoped_tree: ScopedTree, cfg: CFG) -> None:
+        super().__init__(scoped_tree, cfg)
+        n_nodes = len(self.compact)
+        self.get_children, self.get_parents = add_virtual_edges(
+            self.compact.start, n_nodes, self.compact.get_successors, self.compact.get_predecessors)
+        self.idom = get_immediate_dominators(self.compact.start, n_nodes, self.get_children, self.get_parents)
+        self.frontiers = get_dominance_frontiers(self.idom, self.get_parents)
+
+        dominated = [[] for _ in range(n_nodes)]
+        for node, idom in enumerate(self.idom):
+            if idom != -1:
+                dominated[idom].append(node)
+        # preorder number of node in dominator tree, and largest preorder number in its subtree,
+        # a dominates b iff pre[a] <= pre[b] <= last[a]
+        self.pre = [-1] * n_nodes
+        preorder = []
+        stack = [self.compact.start]
+        while stack:
+            node = stack.pop()
+            self.pre[node] = len(preorder)
+            preorder.append(node)
+            stack.extend(dominated[node])
+        self.last = list(self.pre)
+        for node in reversed(preorder):
+            idom = self.idom[node]
+            if idom != -1 and self.last[node] > self.last[idom]:
+                self.last[idom] = self.last[node]
+
+        # symbol -> indices of nodes that read symbol
+        self.reads: dict[int, set[int]] = dict()
+        for node, cfgnode in enumerate(self.compact.nodes):
+            if isinstance(cfgnode, (AssignNode, BranchNode, ReturnNode, ExprNode)):
+                for identifier in NameFinder().visit(cfgnode.syntaxnode):
+                    if identifier in self.scoped_tree.symbol_ids:
+                        self.reads.setdefault(self.get_symbol(identifier), set()).add(node)
+
+        # symbol -> its definitions and phi nodes
+        self.versions: dict[int, SymbolVersions] = dict()
+        # def-use chains: (cfgnode, symbol, element) -> reaching definitions
+        self.chains: dict[tuple, set[CFGNode]] = dict()
+
+    # Renaming only stores the versions at definitions and phi nodes (the sites of the symbol).
+    # The version at entry of any other node is the version at the closest site that strictly dominates it,
+    # which is found by binary search over the sites sorted by preorder number of the dominator tree.
+    # Thus, the SSA form of a symbol has size proportional to its number of sites, not to the size of the CFG.
+    def _construct(self, symbol: int) -> "SymbolVersions":
+        if symbol in self.versions:
+            return self.versions[symbol]
+
+        nodes = self.compact.nodes
+        definitions = self.symbol_definitions.get(symbol, 0) | self.unsupported
+        def_sites = [self.definition_nodes[i] for i in _iter_bits(definitions)]
+
+        # place phi nodes at iterated dominance frontier
+        phis: dict[int, SSAValue] = dict()
+        worklist = list(def_sites)
+        visited = set(def_sites)
+        while worklist:
+            for frontier in self.frontiers[worklist.pop()]:
+                if frontier not in phis:
+                    phis[frontier] = SSAValue(symbol, nodes[frontier], is_phi=True)
+                    if frontier not in visited:
+                        visited.add(frontier)
+                        worklist.append(frontier)
+
+        versions = SymbolVersions(sorted(visited, key=lambda node: self.pre[node]), self.pre, self.last)
+        versions.phis = phis
+
+        # renaming, the sites that dominate a definition come before it in preorder
+        for node in versions.sites:
+            i = self.definition_index[node]
+            if i != -1 and (definitions >> i) & 1:
+                previous = None if self.is_strong[i] else versions.get_entry(node)
+                value = SSAValue(symbol, nodes[node], previous=previous,
+                                 is_strong=self.is_strong[i], element=self.elements[i], error=self.errors.get(i))
+                if previous is not None:
+                    previous.successors.append(value)
+                versions.definitions[node] = value
+
+        for node, phi in phis.items():
+            for parent in self.get_parents(node):
+                value = versions.get_exit(parent)
+                if value is not None:
+                    phi.operands.append(value)
+                    value.successors.append(phi)
+
+        for node in self.reads.get(symbol, ()):
+            value = versions.get_entry(node)
+            if value is not None:
+                value.uses.add(nodes[node])
+
+        self.versions[symbol] = versions
+        return versions
+
+    # Returns the version of identifier at entry of cfgnode (cfgnode has to be in this CFG).
+    def get_value(self, cfgnode: CFGNode, identifier: ast.AST) -> Optional[SSAValue]:
+        return self._construct(self.get_symbol(identifier)).get_entry(cfgnode.index)
+
+    # Returns the definitions of identifier that reach the entry of cfgnode (cfgnode has to be in this CFG).
+    def get(self, cfgnode: CFGNode, identifier: ast.AST) -> set[CFGNode]:
+        if isinstance(identifier, ast.Attribute):
+            return set() # not a user-defined symbol
+        symbol = self.get_symbol(identifier)
+        element = self.get_read_element(identifier)
+        key = (cfgnode, symbol, element)
+        if key not in self.chains:
+            self.chains[key] = self.resolve(self._construct(symbol).get_entry(cfgnode.index), element)
+        return self.chains[key]
+
+    # Definitions that value may stand for when reading element,
+    # raises the error of a definition with unsupported target if it is reached.
+    def resolve(self, value: Optional[SSAValue], element: Optional[tuple]) -> set[CFGNode]:
+        definitions = set()
+        visited = set()
+        stack = [value] if value is not None else []
+        while stack:
+            value = stack.pop()
+            if value in visited:
+                continue
+            visited.add(value)
+            if value.is_phi:
+                stack.extend(value.operands)
+                continue
+            if value.error is not None:
+                raise value.error
+            definitions.add(value.cfgnode)
+            killed = value.is_strong or (element is not None and value.element == element)
+            if not killed and value.previous is not None:
+                stack.append(value.previous)
+        return definitions
+
+    # Def-use edges of definition cfgnode: nodes that read the symbol defined at cfgnode
+    # directly or through phi nodes and weak definitions.
+    def get_uses(self, cfgnode: CFGNode) -> set[CFGNode]:
+        symbol = self.symbols[self.definition_index[cfgnode.index]]
+        if symbol is None:
+            return set()
+        uses = set()
+        visited = set()
+        stack = [self._construct(symbol).definitions[cfgnode.index]]
+        while stack:
+            value = stack.pop()
+            if value in visited:
+                continue
+            visited.add(value)
+            uses |= value.uses
+            stack.extend(value.successors)
+        return uses
+
+def get_ssa(scoped_tree: ScopedTree, cfgnode: CFGNode) -> SSA:
+    cfg = scoped_tree.get_cfg_for_cfgnode(cfgnode)
+    ssa = scoped_tree.ssa.get(cfg)
+    if ssa is not None:
+        return ssa
+    with scoped_tree.analysis_lock:
+        if cfg not in scoped_tree.ssa:
+            scoped_tree.ssa[cfg] = SSA(scoped_tree, cfg)
+        return scoped_tree.ssa[cfg]
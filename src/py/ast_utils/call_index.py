@@ -0,0 +1,56 @@
+import ast
+from typing import Callable, Optional
+from ast_utils.utils import get_call_name
+
+# Index from callee name (see get_call_name, None for calls like f()(x)) to the call nodes of a tree, built with one traversal.
+# Calls are listed in the order of the traversal (preorder), which is the order in which a NodeFinder finds them.
+# The index is not updated if the tree is changed.
+class CallIndex(ast.NodeVisitor):
+    def __init__(self, root_node: ast.AST) -> None:
+        self.calls: list[ast.Call] = []
+        self.calls_by_name: dict[Optional[str], list[ast.Call]] = dict()
+        self.order: dict[ast.Call, int] = dict()                       # call -> position in self.calls
+        self.enclosing: dict[ast.Call, Optional[ast.Call]] = dict()    # call -> closest enclosing call with the same callee name
+        self.assignments: dict[ast.Call, ast.Assign] = dict()          # call -> assignment x = call
+        self._open_calls: dict[Optional[str], list[ast.Call]] = dict()
+        self.visit(root_node)
+
+    def visit_Call(self, node: ast.Call):
+        name = get_call_name(node)
+        open_calls = self._open_calls.setdefault(name, [])
+        self.enclosing[node] = open_calls[-1] if len(open_calls) > 0 else None
+        self.order[node] = len(self.calls)
+        self.calls.append(node)
+        self.calls_by_name.setdefault(name, []).append(node)
+        open_calls.append(node)
+        self.generic_visit(node)
+        open_calls.pop()
+
+    def visit_Assign(self, node: ast.Assign):
+        if isinstance(node.value, ast.Call):
+            self.assignments[node.value] = node
+        self.generic_visit(node)
+
+    def get_calls(self, name: Optional[str]) -> list[ast.Call]:
+        return self.calls_by_name.get(name, [])
+
+    # Calls with callee name that satisfy predicate, in the same order and with the same result as
+    # NodeFinder(lambda node: isinstance(node, ast.Call) and get_call_name(node) == name and predicate(node), ...),
+    # i.e. calls inside of found calls are skipped.
+    def find_calls(self, name: Optional[str], predicate: Callable[[ast.Call], bool]) -> list[ast.Call]:
+        result = []
+        found = set()
+        for call in self.get_calls(name):
+            enclosing = self.enclosing[call]
+            while enclosing is not None and enclosing not in found:
+                enclosing = self.enclosing[enclosing]
+            if enclosing is None and predicate(call):
+                result.append(call)
+                found.add(call)
+        return result
+
+    # Assignments x = f(...) with callee name f in names, in preorder.
+    def get_call_assignments(self, names) -> list[ast.Assign]:
+        calls = [call for name in names for call in self.get_calls(name) if call in self.assignments]
+        calls.sort(key=lambda call: self.order[call])
+        return [self.assignments[call] for call in calls]
@@ -1,7 +1,8 @@
 import ast
 import ast_scope
 from copy import deepcopy
-from ast_utils.node_finder import NodeFinder
+from ast_utils.call_index import CallIndex
+from ast_utils.utils import Block, get_call_name
 
 # def foo(x):
 #     return x
@@ -21,21 +22,23 @@ from ast_utils.node_finder import NodeFinder
 # TODO:
 # check if we need to do this recursively (calls of user-def functions in body of user-def functions)
 
-def CallFinder(func_syntaxnode: ast.FunctionDef, call_unquifier):
+# Calls of func_syntaxnode (same name and scope) in the current tree, found with the call index of call_unquifier.
+def find_calls(func_syntaxnode: ast.FunctionDef, call_unquifier):
     assert isinstance(func_syntaxnode, ast.FunctionDef)
     if func_syntaxnode not in call_unquifier.scope_info:
         # if we deepcopy a function foo which defines a nested function,
         # we have to find scope for the nested function (deepcopied foo)
         call_unquifier.scope_info = ast_scope.annotate(call_unquifier.root_node)
+    if call_unquifier.call_index is None or func_syntaxnode.name in call_unquifier.changed_names:
+        call_unquifier.call_index = CallIndex(call_unquifier.root_node)
+        call_unquifier.changed_names = set()
 
     scope_info = call_unquifier.scope_info
-    return NodeFinder(
-        lambda node: (isinstance(node, ast.Call) and
-                      isinstance(node.func, ast.Name) and
-                      node.func.id == func_syntaxnode.name and
+    return call_unquifier.call_index.find_calls(
+        func_syntaxnode.name,
+        lambda node: (isinstance(node.func, ast.Name) and
                       node.func in scope_info and
-                      scope_info[node.func] == scope_info[func_syntaxnode]),
-        lambda node: node
+                      scope_info[node.func] == scope_info[func_syntaxnode])
     )
 
 class CallUniquifier(ast.NodeVisitor):
@@ -43,23 +46,37 @@ class CallUniquifier(ast.NodeVisitor):
         self.root_node = root_node
         self.scope_info = scope_info
         # scope_info must be updated after transforming ast
+        # the call index is only rebuilt if calls with a changed callee name are searched,
+        # calls of other names are still the same and in the same order after renaming calls and copying functions
+        self.call_index = None
+        self.changed_names = set()
 
     def visit(self, node: ast.AST):
-        if hasattr(node, "body") and isinstance(node.body, list):
+        self.transform(node)
+        return self.generic_visit(node)
+
+    # rewrites node before its children are visited (see FusedNodeVisitor),
+    # bodies may already be wrapped in a Block
+    def transform(self, node: ast.AST):
+        if hasattr(node, "body") and isinstance(node.body, (list, Block)):
             new_body = []
             for stmt in node.body:
                 new_body.append(stmt)
                 match stmt:
                     case ast.FunctionDef(name=_name):
-                        call_finder = CallFinder(stmt, self)
-                        calls = call_finder.visit(self.root_node)
+                        calls = find_calls(stmt, self)
                         if len(calls) > 1:
+                            self.changed_names.add(_name)
+                            # copies add calls to all functions called in stmt
+                            self.changed_names.update(get_call_name(call) for call in ast.walk(stmt) if isinstance(call, ast.Call))
                             for i, call in enumerate(calls):
                                 new_name = f"{_name}_{i}"
+                                self.changed_names.add(new_name)
                                 call.func.id = new_name
                                 new_func = deepcopy(stmt)
                                 new_func.name = new_name
                                 new_body.append(new_func)
-            node.body = new_body
-
-        return self.generic_visit(node)
+            if isinstance(node.body, list):
+                node.body = new_body
+            elif len(new_body) != len(node.body):
+                node.body = Block(new_body)
@@ -1,39 +1,49 @@
 import ast
+from array import array
+from typing import AbstractSet
 from ast_utils.utils import Block
 
 class CFGNode:
+    __slots__ = ("id", "syntaxnode", "parents", "children", "index")
     def __init__(self, id: str, syntaxnode: ast.AST) -> None:
         self.id = id
         self.syntaxnode = syntaxnode
         self.parents = set()
         self.children = set()
-        self.is_blocked = False
-    def block(self):
-        self.is_blocked = True
-    def unblock(self):
-        self.is_blocked = False
+        self.index = -1 # in CompactCFG of its CFG
     def __repr__(self) -> str:
         return get_short_node_string(self)
-
-class StartNode(CFGNode): pass
-class EndNode(CFGNode): pass
-class AssignNode(CFGNode): pass
+    # edges are pickled by the CFG, see CFG.__getstate__
+    def __getstate__(self):
+        state = {slot: getattr(self, slot) for cls in type(self).__mro__ for slot in getattr(cls, "__slots__", ())}
+        state["parents"] = set()
+        state["children"] = set()
+        return state
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+class StartNode(CFGNode): __slots__ = ()
+class EndNode(CFGNode): __slots__ = ()
+class AssignNode(CFGNode): __slots__ = ()
 class BranchNode(CFGNode):
+    __slots__ = ("join_node",)
     def __init__(self, id: str, syntaxnode: ast.AST) -> None:
         super().__init__(id, syntaxnode)
         self.join_node: CFGNode = None # to be set later
 class JoinNode(CFGNode):
+    __slots__ = ("branch_node",)
     def __init__(self, id: str, syntaxnode: ast.AST) -> None:
         super().__init__(id, syntaxnode)
         self.branch_node: CFGNode = None  # to be set later
-class ReturnNode(CFGNode): pass
-class BreakNode(CFGNode): pass
-class ContinueNode(CFGNode): pass
-class FuncStartNode(CFGNode): pass
-class FuncArgNode(CFGNode): pass
-class FuncJoinNode(CFGNode): pass
-class ExprNode(CFGNode): pass
-class LoopIterNode(CFGNode): pass
+class ReturnNode(CFGNode): __slots__ = ()
+class BreakNode(CFGNode): __slots__ = ()
+class ContinueNode(CFGNode): __slots__ = ()
+class FuncStartNode(CFGNode): __slots__ = ()
+class FuncArgNode(CFGNode): __slots__ = ()
+class FuncJoinNode(CFGNode): __slots__ = ()
+class ExprNode(CFGNode): __slots__ = ()
+class LoopIterNode(CFGNode): __slots__ = ()
 
 def get_short_node_string(node: CFGNode):
     s = type(node).__name__
@@ -56,25 +66,23 @@ def delete_edge(from_node: CFGNode, to_node: CFGNode):
     to_node.parents.discard(from_node)
 
 
-# returns true if startnode is reachable from endnode
-def _is_reachable(startnode: CFGNode, endnode: CFGNode, path: list[CFGNode]):
-    if endnode.is_blocked:
+# returns true if endnode is reachable from startnode (by a path of at least one edge)
+# paths through nodes in blocked are not considered,
+# the CFG itself is never mutated, such that it can be shared between threads
+def is_reachable(startnode:CFGNode, endnode: CFGNode, blocked: AbstractSet[CFGNode] = frozenset()):
+    if endnode in blocked:
         return False
-    
-    for parent in endnode.parents:
-        if parent == startnode:
-            return True
-        is_cycle = any(p == parent for p in path)
-        if not is_cycle:
-            new_path = copy(path) if len(endnode.parents) > 1 else path
-            new_path.append(parent)
-            if _is_reachable(startnode, parent, new_path):
+    visited = {endnode}
+    stack = [endnode]
+    while stack:
+        for parent in stack.pop().parents:
+            if parent == startnode:
                 return True
+            if parent not in visited and parent not in blocked:
+                visited.add(parent)
+                stack.append(parent)
     return False
 
-def is_reachable(startnode:CFGNode, endnode: CFGNode):
-    return _is_reachable(startnode, endnode, [])
-
 def is_on_path_between_nodes(node: CFGNode, startnode: CFGNode, endnode: CFGNode):
     return is_reachable(startnode, node) and is_reachable(node, endnode)
 
@@ -88,6 +96,100 @@ class CFG:
         self.startnode = startnode
         self.nodes = nodes
         self.endnode = endnode
+        self.compact: Optional[CompactCFG] = None # built on first use, see get_compact_cfg
+
+    # Edges are pickled as pairs of node indices instead of through the parents / children sets of the nodes.
+    # Otherwise, pickle recurses once per node along a path of the CFG, which exceeds the recursion limit for large programs.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["compact"] = None
+        nodes = list(self.nodes)
+        # start and end node are not necessarily in self.nodes
+        all_nodes = nodes + [node for node in (self.startnode, self.endnode) if node not in self.nodes]
+        index = {node: i for i, node in enumerate(all_nodes)}
+        state["nodes"] = (all_nodes, len(nodes))
+        state["edges"] = [(index[node], index[child]) for node in all_nodes for child in node.children]
+        return state
+
+    def __setstate__(self, state):
+        all_nodes, n_nodes = state.pop("nodes")
+        for i, j in state.pop("edges"):
+            add_edge(all_nodes[i], all_nodes[j])
+        self.__dict__.update(state)
+        self.nodes = set(all_nodes[:n_nodes])
+
+# Array representation of a CFG for graph algorithms.
+# Every node connected to the CFG gets an integer index (stored in node.index), start node has index 0.
+# Successors and predecessors are stored in compressed sparse row format,
+# e.g. the successors of node i are successors[successor_offsets[i]:successor_offsets[i+1]].
+# Thus, algorithms can use lists and bytearrays indexed by node instead of sets and dicts of nodes.
+class CompactCFG:
+    def __init__(self, cfg: CFG) -> None:
+        nodes = [cfg.startnode]
+        visited = {cfg.startnode}
+        for node in [cfg.endnode, *cfg.nodes]:
+            if node not in visited:
+                visited.add(node)
+                nodes.append(node)
+        # nodes that are connected to the CFG, but not in cfg.nodes
+        i = 0
+        while i < len(nodes):
+            for node in (*nodes[i].children, *nodes[i].parents):
+                if node not in visited:
+                    visited.add(node)
+                    nodes.append(node)
+            i += 1
+        for i, node in enumerate(nodes):
+            node.index = i
+
+        self.nodes: list[CFGNode] = nodes
+        self.start = cfg.startnode.index
+        self.end = cfg.endnode.index
+        self.successor_offsets, self.successors = _to_csr(nodes, lambda node: node.children)
+        self.predecessor_offsets, self.predecessors = _to_csr(nodes, lambda node: node.parents)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def get_successors(self, i: int) -> array:
+        return self.successors[self.successor_offsets[i]:self.successor_offsets[i+1]]
+
+    def get_predecessors(self, i: int) -> array:
+        return self.predecessors[self.predecessor_offsets[i]:self.predecessor_offsets[i+1]]
+
+    # same as is_reachable for node indices
+    def is_reachable(self, start: int, end: int, blocked: AbstractSet[int] = frozenset()) -> bool:
+        if end in blocked:
+            return False
+        visited = bytearray(len(self.nodes))
+        for i in blocked:
+            visited[i] = 1
+        visited[end] = 1
+        stack = [end]
+        predecessor_offsets, predecessors = self.predecessor_offsets, self.predecessors
+        while stack:
+            i = stack.pop()
+            for k in range(predecessor_offsets[i], predecessor_offsets[i+1]):
+                parent = predecessors[k]
+                if parent == start:
+                    return True
+                if not visited[parent]:
+                    visited[parent] = 1
+                    stack.append(parent)
+        return False
+
+def _to_csr(nodes: list[CFGNode], get_neighbours):
+    offsets = array("i", [0])
+    targets = array("i")
+    for node in nodes:
+        targets.extend(neighbour.index for neighbour in get_neighbours(node))
+        offsets.append(len(targets))
+    return offsets, targets
+
+def get_compact_cfg(cfg: CFG) -> CompactCFG:
+    if cfg.compact is None:
+        cfg.compact = CompactCFG(cfg)
+    return cfg.compact
 
 def verify_cfg(cfg: CFG):
     if not isinstance(cfg.startnode, (StartNode, FuncStartNode)):
@@ -98,6 +200,7 @@ def verify_cfg(cfg: CFG):
         raise Exception(f"Startnode has wrong number of parents / children: {cfg.startnode.parents} / {cfg.startnode.children}")
     if len(cfg.endnode.parents) != 1 or len (cfg.endnode.children) != 0:
         raise Exception(f"Endnode has wrong number of parents / children: {cfg.endnode.parents} / {cfg.endnode.children}")
+    compact = get_compact_cfg(cfg)
     
     for node in cfg.nodes:
         for parent in node.parents:
@@ -125,25 +228,31 @@ def verify_cfg(cfg: CFG):
                 j1 = b1.join_node
                 j2 = b2.join_node
                 # all paths from b2 to j1 have to go through j2
-                b1.block() # B2 -> ... B1 -> ... J1 -> ... J2
-                j2.block()
-                assert not is_reachable(b2, j1), f"{b2} can reach {j1} without going through its {j2} or {b1}."
-                j2.unblock()
-                b1.unblock()
+                # B2 -> ... B1 -> ... J1 -> ... J2
+                assert not compact.is_reachable(b2.index, j1.index, {b1.index, j2.index}), f"{b2} can reach {j1} without going through its {j2} or {b1}."
 
     return True
 
+SUPPORTED_EXPRESSION_TYPES = (
+    ast.Expr, ast.Import, ast.ImportFrom, # stmt
+    ast.BoolOp, ast.NamedExpr, ast.BinOp, ast.UnaryOp, ast.Dict, ast.Set, ast.Compare, ast.Call, ast.JoinedStr, ast.FormattedValue,
+    ast.Constant, ast.Attribute, ast.Subscript, ast.Name, ast.List, ast.Tuple, ast.Slice, # expr
+    ast.expr_context, ast.boolop, ast.operator, ast.unaryop, ast.cmpop, ast.arguments, ast.arg, ast.keyword, ast.alias,
+    ast.Pass
+)
+
+# The result is stored in node.is_supported_expression for every visited node,
+# such that each subtree is classified once, also across the CFG builder and the data flow analysis.
 def is_supported_expression(node: ast.AST):
-    if not isinstance(node, (
-        ast.Expr, ast.Import, ast.ImportFrom, # stmt
-        ast.BoolOp, ast.NamedExpr, ast.BinOp, ast.UnaryOp, ast.Dict, ast.Set, ast.Compare, ast.Call, ast.JoinedStr, ast.FormattedValue,
-        ast.Constant, ast.Attribute, ast.Subscript, ast.Name, ast.List, ast.Tuple, ast.Slice, # expr
-        ast.expr_context, ast.boolop, ast.operator, ast.unaryop, ast.cmpop, ast.arguments, ast.arg, ast.keyword, ast.alias,
-        ast.Pass
-        )):
-        print("Is unsupported expression", node)
-        return False
-    return all(is_supported_expression(child) for child in ast.iter_child_nodes(node))
+    is_supported = getattr(node, "is_supported_expression", None)
+    if is_supported is None:
+        if not isinstance(node, SUPPORTED_EXPRESSION_TYPES):
+            print("Is unsupported expression", node)
+            is_supported = False
+        else:
+            is_supported = all([is_supported_expression(child) for child in ast.iter_child_nodes(node)])
+        node.is_supported_expression = is_supported
+    return is_supported
 
 EMPTY_RETURN_NODE = ast.Expr(value=ast.Constant(value=None))
 
@@ -158,10 +267,17 @@ def get_return_expr(cfgnode: ReturnNode):
         return cfgnode.syntaxnode # this comes from an EXPR_NODE which got transformed to RETURN_NODE
 
 from copy import copy
+# The nodes of all sub-CFGs of a function (or the module) are added to one shared set, the node arena self.nodes,
+# instead of taking the union of the node sets of the sub-CFGs at every nesting level.
+# Thus, building the CFGs is linear in the size of the syntax tree.
+# If build_functions is False, the CFGs of function definitions are not built with the CFG that contains them,
+# they can be built separately with get_function_cfg (see ScopedTree.get_cfg).
 class CFGBuilder():
-    def __init__(self, node_to_id: Dict[ast.AST,str]) -> None:
+    def __init__(self, node_to_id: Dict[ast.AST,str], build_functions: bool = True) -> None:
         self.node_to_id = node_to_id
+        self.build_functions = build_functions
         self.cfgs = dict() # toplevel -> CFG, functiondef -> CFG
+        self.nodes: Set[CFGNode] = set() # node arena of the function that is currently built
 
     def transform_expr_to_return_nodes(self, nodes, func_join_node, join_node):
         join_node_parents = copy(join_node.parents)
@@ -203,10 +319,14 @@ class CFGBuilder():
 
         # all returns go to join node
         join_cfgnode = FuncJoinNode(node_id, func_signature)
+        # function gets its own node arena
+        outer_nodes = self.nodes
+        nodes = set()
+        self.nodes = nodes
         # return stmts "break" to join_node, no continuenode
         body_cfg = self.get_cfg(func_body, join_cfgnode, None)
+        self.nodes = outer_nodes
 
-        nodes = copy(body_cfg.nodes)
         nodes.add(join_cfgnode)
 
         # FUNCSTART -> FUNCARG1 -> FUNCARG2 ...
@@ -256,14 +376,15 @@ class CFGBuilder():
     def get_cfg(self, node: ast.AST, breaknode:Optional[CFGNode], continuenode:Optional[CFGNode]) -> CFG:
         node_id = self.node_to_id[node]
 
-        startnode = StartNode(node_id, node)
-        nodes = set()
-        endnode = EndNode(node_id, node)
-
         if isinstance(node, ast.Module):
+            self.nodes = set()
             cfg = self.get_cfg(node.body, None, None)
             self.cfgs[node] = cfg
             return cfg
+
+        startnode = StartNode(node_id, node)
+        nodes = self.nodes
+        endnode = EndNode(node_id, node)
         
         if isinstance(node, ast.With):
             return self.get_cfg(node.body, None, None)
@@ -276,8 +397,9 @@ class CFGBuilder():
             for child in node.elts:
                 child_node_id = self.node_to_id[child]
                 if isinstance(child, ast.FunctionDef):
-                    function_cfg = self.get_function_cfg(child)
-                    self.cfgs[child] = function_cfg
+                    if self.build_functions:
+                        function_cfg = self.get_function_cfg(child)
+                        self.cfgs[child] = function_cfg
                 
                 elif isinstance(child, (ast.Return, ast.Break, ast.Continue)):
                     if isinstance(child, ast.Return):
@@ -300,7 +422,6 @@ class CFGBuilder():
 
                 else:
                     child_cfg = self.get_cfg(child, breaknode, continuenode)
-                    nodes = nodes.union(child_cfg.nodes)
 
                     N1 = list(child_cfg.startnode.children)[0] # node after start node
                     N2 = list(child_cfg.endnode.parents)[0]    # node before end node
@@ -349,7 +470,6 @@ class CFGBuilder():
             for branch_node in branch_nodes:
                 # inherits breaknode and continuenode
                 branch_cfg = self.get_cfg(branch_node, breaknode, continuenode)
-                nodes = nodes.union(branch_cfg.nodes)
 
                 N1 = list(branch_cfg.startnode.children)[0] # node after start node
                 N2 = list(branch_cfg.endnode.parents)[0]    # node before end node
@@ -383,7 +503,6 @@ class CFGBuilder():
             body = node.body
             # continue stmts go to branch_cfgnode, break stmts go to join_cfgnode -> endnode
             body_cfg = self.get_cfg(body, join_cfgnode, branch_cfgnode)
-            nodes = nodes.union(body_cfg.nodes)
 
             N1 = list(body_cfg.startnode.children)[0] # node after start node
             N2 = list(body_cfg.endnode.parents)[0]    # node before end node
@@ -420,7 +539,6 @@ class CFGBuilder():
 
             # continue stmts go to branch_cfgnode, break stmts go to join_cfgnode -> endnode
             body_cfg = self.get_cfg(body, join_cfgnode, branch_cfgnode)
-            nodes = nodes.union(body_cfg.nodes)
 
             N1 = list(body_cfg.startnode.children)[0] # node after start node
             N2 = list(body_cfg.endnode.parents)[0]    # node before end node
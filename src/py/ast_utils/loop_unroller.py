@@ -2,44 +2,70 @@ import ast
 from .utils import Block
 from copy import deepcopy
 
+# replaces all names id by a new constant value
 class NameReplacer(ast.NodeTransformer):
-    def __init__(self, id, replace_with):
+    def __init__(self, id, value):
         self.id = id
-        self.replace_with = replace_with
+        self.value = value
     def visit_Name(self, node: ast.Name):
         if node.id == self.id:
-            return deepcopy(self.replace_with)
+            return ast.Constant(value=self.value)
         return self.generic_visit(node)
-    
+
+# Loops over a constant range with more iterations are not unrolled, the loop is kept as summary of its iterations
+# (it is analysed like a loop over an unknown range, the loop variable is defined by the loop instead of replaced by constants).
+MAX_UNROLLED_ITERATIONS = 100
+
 # call after BlockTransformer, before PositionParentAdder
+# loops over range with constant arguments are unrolled completely (if at most max_iterations), other loops over range N times
+# (max_iterations only applies to constant ranges)
 class LoopUnroller(ast.NodeTransformer):
-    def __init__(self, N) -> None:
+    def __init__(self, N, max_iterations: int = MAX_UNROLLED_ITERATIONS) -> None:
         self.N = N
+        self.max_iterations = max_iterations
 
     def visit_Block(self, node: Block):
+        return self.generic_visit(self.unroll(node))
+
+    # replaces the blocks among the children of node by their unrolled blocks before the children are visited (see FusedNodeVisitor),
+    # equivalent to visit_Block as the loops in the unrolled blocks are unrolled when visiting them
+    def transform(self, node: ast.AST):
+        if isinstance(node, Block):
+            for i, stmt in enumerate(node.elts):
+                if isinstance(stmt, Block):
+                    node.elts[i] = self.unroll(stmt)
+        else:
+            for field in ("body", "orelse"):
+                if isinstance(getattr(node, field, None), Block):
+                    setattr(node, field, self.unroll(getattr(node, field)))
+
+    def unroll(self, node: Block) -> Block:
         # print("LoopUnroller Block", node)
         new_block_body = []
         for stmt in node:
             match stmt:
                 case ast.For(target=ast.Name(), iter=ast.Call(func=ast.Name(id=_func_id), args=_args)) if _func_id == 'range':
                     # print("LoopUnroller For:", ast.dump(stmt.target), ast.dump(stmt.iter))
-                    iter_range = range(self.N)
                     match _args:
                         case [ast.Constant(value=value)]:
                             iter_range = range(value)
                         case [ast.Constant(value=value1), ast.Constant(value=value2)]:
                             iter_range = range(value1, value2)
+                        case _:
+                            iter_range = None
+                    if iter_range is None:
+                        iter_range = range(self.N)
+                    elif len(iter_range) > self.max_iterations:
+                        new_block_body.append(stmt)
+                        continue
                     for i in iter_range:
                         unrolled_for_body = deepcopy(stmt.body)
-                        NameReplacer(stmt.target.id, ast.Constant(value=i)).visit(unrolled_for_body)
+                        NameReplacer(stmt.target.id, i).visit(unrolled_for_body)
                         new_block_body.append(unrolled_for_body)
                 case _:
                     new_block_body.append(stmt)
 
-        new_block = Block(new_block_body)
-
-        # print(node)
-        return self.generic_visit(new_block)
+        return Block(new_block_body)
     
 
 # s = """
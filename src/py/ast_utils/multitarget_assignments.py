@@ -7,6 +7,11 @@ import uuid
 # Called before BlockNodeTransformer
 class MultitargetTransformer(ast.NodeVisitor):
     def visit(self, node: ast.AST):
+        self.transform(node)
+        return self.generic_visit(node)
+
+    # rewrites node before its children are visited (see FusedNodeVisitor)
+    def transform(self, node: ast.AST):
         if hasattr(node, "body") and isinstance(node.body, list):
             new_body = []
             for stmt in node.body:
@@ -43,8 +48,6 @@ class MultitargetTransformer(ast.NodeVisitor):
                         for i, name in enumerate(_elts):
                             assign = ast.Assign(targets=[name], value=ast.Subscript(value=tmp_name_load, slice=ast.Constant(value=i), ctx=ast.Load()), **position_args)
                             _body.insert(i, assign)
-            
-        return self.generic_visit(node)
 
 
 # s = """
@@ -1,10 +1,12 @@
 
 import ast
 import ast_scope
+from typing import Optional
 from .utils import Block, IdPrinter
 from .multitarget_assignments import MultitargetTransformer
 from .call_uniquifier import CallUniquifier
-from .loop_unroller import LoopUnroller
+from .call_index import CallIndex
+from .loop_unroller import LoopUnroller, MAX_UNROLLED_ITERATIONS
 
 # returns the indices of source text of node in utf8 source code
 def get_first_last_byte(node: ast.AST, line_offsets: list[int]):
@@ -34,36 +36,23 @@ class BlockNodeTransformer(ast.NodeVisitor):
             return Block(body)
         else:
             raise ValueError("Tried to create Block from empty body.")
-    
-    def visit_Module(self, node: ast.Module):
-        node.body = self.to_block(node.body)
-        return self.generic_visit(node)
-    
-    def visit_FunctionDef(self, node: ast.FunctionDef):
-        node.body = self.to_block(node.body)    
-        return self.generic_visit(node)
-        
-    def visit_If(self, node: ast.If):
-        node.body = self.to_block(node.body)
-        if len(node.orelse) == 0:
-            # node.orelse = None
-            delattr(node, "orelse")
-            node._fields = tuple(field for field in node._fields if field != "orelse")
-        else:
-            node.orelse = self.to_block(node.orelse)    
-        return self.generic_visit(node)
-
-    def visit_For(self, node: ast.For):
-        node.body = self.to_block(node.body)
-        return self.generic_visit(node)
 
-    def visit_While(self, node: ast.While):
-        node.body = self.to_block(node.body)
+    def visit(self, node: ast.AST):
+        self.transform(node)
         return self.generic_visit(node)
 
-    def visit_With(self, node: ast.With):
-        node.body = self.to_block(node.body)
-        return self.generic_visit(node)
+    # rewrites node before its children are visited (see FusedNodeVisitor)
+    def transform(self, node: ast.AST):
+        if isinstance(node, (ast.Module, ast.FunctionDef, ast.For, ast.While, ast.With)):
+            node.body = self.to_block(node.body)
+        elif isinstance(node, ast.If):
+            node.body = self.to_block(node.body)
+            if len(node.orelse) == 0:
+                # node.orelse = None
+                delattr(node, "orelse")
+                node._fields = tuple(field for field in node._fields if field != "orelse")
+            else:
+                node.orelse = self.to_block(node.orelse)
 
 # Add position information to nodes and their parent
 class PositionParentAdder(ast.NodeVisitor):
@@ -73,7 +62,11 @@ class PositionParentAdder(ast.NodeVisitor):
         self.line_offsets = line_offsets
 
     def visit(self, node: ast.AST):
+        self.transform(node)
+        self.generic_visit(node)
 
+    # adds position to node and sets parent of its children (see FusedNodeVisitor)
+    def transform(self, node: ast.AST):
         if has_position_info(node):
             start, end = get_first_last_byte(node, self.line_offsets)
             node.position = start
@@ -107,8 +100,6 @@ class PositionParentAdder(ast.NodeVisitor):
             
         for child in ast.iter_child_nodes(node):
             child.parent = node
-        
-        self.generic_visit(node)
 
         # min_child_position = float("inf")
         # max_child_end_position = -float("inf")
@@ -128,19 +119,38 @@ class PositionParentAdder(ast.NodeVisitor):
         #     node.span = node.end_position - node.position
 
 
-# Confusion (1)
-# if we want to deepcopy a syntaxnode we have to make sure that two syntaxtree instances
-# do not share any object. ast.Store and ast.Load are singletons however
-# I am still not too sure about this
-# There are also other singleton classes (like ast.Add)
-# I do not understand when deepcopying works properly
-# class Unsingletonifier(ast.NodeTransformer):
-#     def visit_Store(self, node: ast.Store):
-#         return ast.Store()
-#     def visit_Load(self, node: ast.Load):
-#         return ast.Load()
-#     def visit_Del(self, node: ast.Del):
-#         return ast.Del()
+# ast.parse shares one instance of each context (ast.Load, ast.Store, ast.Del) and operator (ast.Add, ast.And, ast.Not, ast.Eq, ...)
+# between all nodes of all parsed trees. As we store attributes in nodes (parent, position, ...), every tree needs its own instances.
+# A shared instance is replaced by the same copy everywhere in the tree, such that the tree has the same structure
+# (and the same node ids) as a deepcopy of it, without copying all other nodes.
+# Has to be applied in the traversal that stores attributes (before PositionParentAdder), such that the instances referenced by
+# nodes that are not visited yet have no attributes and deepcopying these nodes does not follow parent to the rest of the tree.
+SINGLETON_FIELDS = {
+    ast.Name: "ctx", ast.Attribute: "ctx", ast.Subscript: "ctx", ast.Starred: "ctx", ast.List: "ctx", ast.Tuple: "ctx",
+    ast.BoolOp: "op", ast.BinOp: "op", ast.AugAssign: "op", ast.UnaryOp: "op"
+}
+class SingletonCopier(ast.NodeVisitor):
+    def __init__(self) -> None:
+        self.copies = {} # instance -> copy, copies map to themselves
+
+    def get_copy(self, instance: ast.AST) -> ast.AST:
+        if instance not in self.copies:
+            copy = type(instance)()
+            self.copies[instance] = copy
+            self.copies[copy] = copy
+        return self.copies[instance]
+
+    def visit(self, node: ast.AST):
+        self.transform(node)
+        self.generic_visit(node)
+
+    # replaces the shared instances among the children of node (see FusedNodeVisitor)
+    def transform(self, node: ast.AST):
+        field = SINGLETON_FIELDS.get(type(node))
+        if field is not None:
+            setattr(node, field, self.get_copy(getattr(node, field)))
+        elif isinstance(node, ast.Compare):
+            node.ops = [self.get_copy(op) for op in node.ops]
 
 class NodeIdAssigner(ast.NodeVisitor):
     def __init__(self) -> None:
@@ -148,40 +158,77 @@ class NodeIdAssigner(ast.NodeVisitor):
         self.id_to_node = {}
 
     def visit(self, node: ast.AST):
+        self.transform(node)
+        self.generic_visit(node)
+
+    # assigns the next id to node, ids are assigned in preorder (see FusedNodeVisitor)
+    def transform(self, node: ast.AST):
         i = f"node_{len(self.node_to_id) + 1}"
         self.node_to_id[node] = i
         self.id_to_node[i] = node
 
+# Applies the transform methods of several visitors in one preorder traversal, a node is transformed by all visitors
+# in the given order before its children are visited (children are taken after the transformations).
+# This gives the same tree as visiting the tree with each visitor in turn, as long as each transformation
+# of a node only depends on the node and its ancestors and only changes the node and its children,
+# and changes elsewhere (e.g. renaming calls in CallUniquifier) do not change the structure of the tree.
+class FusedNodeVisitor(ast.NodeVisitor):
+    def __init__(self, *visitors) -> None:
+        self.transforms = [visitor.transform for visitor in visitors]
+
+    def visit(self, node: ast.AST):
+        for transform in self.transforms:
+            transform(node)
         self.generic_visit(node)
 
 class SyntaxTree:
-    def __init__(self, root_node: ast.AST) -> None:
+    # node_id_assigner has to have visited root_node already if given
+    def __init__(self, root_node: ast.AST, node_id_assigner: Optional[NodeIdAssigner] = None) -> None:
         self.root_node = root_node
 
-        node_id_assigner = NodeIdAssigner()
-        node_id_assigner.visit(self.root_node)
+        if node_id_assigner is None:
+            node_id_assigner = NodeIdAssigner()
+            node_id_assigner.visit(self.root_node)
         self.node_to_id = node_id_assigner.node_to_id
         self.id_to_node = node_id_assigner.id_to_node
+        self.call_index = None
+
+    # Index of all calls by callee name (see CallIndex), built on first use,
+    # which has to be after all preprocessing, as the ppl preprocessing changes calls after construction.
+    def get_call_index(self) -> CallIndex:
+        if self.call_index is None:
+            self.call_index = CallIndex(self.root_node)
+        return self.call_index
 
     def add_node(self, node: ast.AST):
         i = f"node_{len(self.node_to_id) + 1}"
         self.node_to_id[node] = i
         self.id_to_node[i] = node
 
-from copy import deepcopy
+# Transforms syntax_tree in place (syntax_tree has to be a new tree of ast.parse) in at most three traversals:
+# 1. split multi-target assignments, wrap bodies in blocks
+# 2. make calls unique (needs the scopes of the tree after 1., has to finish before loops are unrolled, which copies calls)
+# 3. unroll loops, copy shared instances, add positions and parents, assign node ids
+# Without loop unrolling, 2. and 3. are done in one traversal.
 def preprocess_syntaxtree(syntax_tree: ast.AST, file_content: str, line_offsets: list[int],
-                          n_unroll_loops: int, uniquify_calls: bool = True) -> SyntaxTree:
-    
-    syntax_tree = deepcopy(syntax_tree) # this is a hack to deal with (1), unsingletonifies everything
-    MultitargetTransformer().visit(syntax_tree)
+                          n_unroll_loops: int, uniquify_calls: bool = True,
+                          max_unrolled_iterations: int = MAX_UNROLLED_ITERATIONS) -> SyntaxTree:
+
+    FusedNodeVisitor(MultitargetTransformer(), BlockNodeTransformer()).visit(syntax_tree)
+
+    visitors = []
     if uniquify_calls:
         prelim_scope_info = ast_scope.annotate(syntax_tree)
-        CallUniquifier(syntax_tree, prelim_scope_info).visit(syntax_tree)
-    BlockNodeTransformer().visit(syntax_tree)
+        visitors.append(CallUniquifier(syntax_tree, prelim_scope_info))
     if n_unroll_loops > 0:
+        if len(visitors) > 0:
+            FusedNodeVisitor(*visitors).visit(syntax_tree)
         print("Unroll Loops")
-        LoopUnroller(n_unroll_loops).visit(syntax_tree)
+        visitors = [LoopUnroller(n_unroll_loops, max_unrolled_iterations)]
+
     syntax_tree.parent = None
-    PositionParentAdder(file_content, line_offsets).visit(syntax_tree)
+    node_id_assigner = NodeIdAssigner()
+    visitors += [SingletonCopier(), PositionParentAdder(file_content, line_offsets), node_id_assigner]
+    FusedNodeVisitor(*visitors).visit(syntax_tree)
     # print(ast.unparse(syntax_tree))
-    return SyntaxTree(syntax_tree)
+    return SyntaxTree(syntax_tree, node_id_assigner)
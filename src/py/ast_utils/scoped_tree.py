@@ -1,10 +1,11 @@
 import ast
-from typing import Any, Union
+import threading
+from typing import Any, Union, Optional
 import ast_scope
 from ast_utils.node_finder import NodeFinder
 from ast_utils.node_finders import get_user_defined_functions
 from ast_utils.preprocess import SyntaxTree
-from ast_utils.utils import get_name, is_descendant
+from ast_utils.utils import get_name, number_nodes
 from ast_utils.cfg import *
 
 class Assignment:
@@ -63,17 +64,82 @@ def _identifieres_are_the_same(scope_info, identifier1: ast.AST, identifier2: as
 
     return id1 == id2 and scope1 == scope2
 
+# Symbol table of one scope resolution pass (ast_scope.annotate):
+# every identifier (ast.Name, ast.arg, ast.FunctionDef) with a scope gets an integer symbol id,
+# identifiers with the same name and scope (see _identifieres_are_the_same) have the same symbol id.
+# symbols[symbol_id] is the (name, scope) of the symbol.
+def get_symbol_table(root_node: ast.AST, scope_info) -> tuple[dict[ast.AST, int], list[tuple[str, Any]]]:
+    symbol_ids = dict()
+    symbols = []
+    symbol_to_id = dict()
+    for node in ast.walk(root_node):
+        if isinstance(node, (ast.Name, ast.arg, ast.FunctionDef)) and node in scope_info:
+            symbol = (_get_id_str(node), scope_info[node])
+            symbol_id = symbol_to_id.get(symbol)
+            if symbol_id is None:
+                symbol_id = len(symbols)
+                symbol_to_id[symbol] = symbol_id
+                symbols.append(symbol)
+            symbol_ids[node] = symbol_id
+    return symbol_ids, symbols
+
+# CFGs are built lazily, the CFG of the module and of each function is built on its first query (see get_cfg).
+# Thus, functions that are never analysed (e.g. plotting or data loading code) do not get a CFG.
 class ScopedTree:
-    def __init__(self, syntax_tree: SyntaxTree, scope_info, all_definitions, all_functions, all_user_symbols, cfgs, is_container_variable):
+    def __init__(self, syntax_tree: SyntaxTree, scope_info, symbol_ids, symbols, all_definitions, all_functions, all_user_symbols, container_symbols):
         self.syntax_tree = syntax_tree
         self.root_node = syntax_tree.root_node
         self.scope_info = scope_info
+        self.symbol_ids: dict[ast.AST, int] = symbol_ids # identifier -> symbol id
+        self.symbols: list[tuple[str, Any]] = symbols    # symbol id -> (name, scope)
         self.all_definitions = all_definitions
         self.all_functions = all_functions
+        self.function_for_symbol: dict[int, FunctionDefinition] = dict() # first function definition of symbol
+        for function in all_functions:
+            self.function_for_symbol.setdefault(symbol_ids[function.node], function)
         # print("all_functions:", [f.name for f in self.all_functions])
         self.all_user_symbols = all_user_symbols
-        self.cfgs = cfgs
-        self.is_container_variable = is_container_variable
+        self.cfgs: dict[ast.AST, CFG] = dict() # root node / function definition -> CFG, built on first query
+        self.cfgnode_to_cfg: dict[CFGNode, CFG] = dict()
+        self.syntaxnode_to_cfgnode: dict[ast.AST, Optional[CFGNode]] = dict() # filled on query, see get_cfgnode_for_syntaxnode
+        self.cfg_lock = threading.Lock() # trees are shared by threads, every CFG is built once
+        self.container_symbols: set[int] = container_symbols # symbols x that are somewhere used as x[...]
+        self.control_dependence = dict() # CFG -> ControlDependence, computed on first query (see analysis.control_dependence)
+        self.ssa = dict() # CFG -> SSA, computed on first query (see analysis.ssa)
+        self.analysis_lock = threading.Lock() # every ControlDependence and SSA is computed once
+
+    # the locks are not pickled (see tree_cache)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["cfg_lock"]
+        del state["analysis_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.cfg_lock = threading.Lock()
+        self.analysis_lock = threading.Lock()
+
+    # Returns the CFG of the root node or of a function definition, builds it on first query.
+    # The CFGs of nested function definitions are built separately.
+    def get_cfg(self, node: ast.AST) -> CFG:
+        cfg = self.cfgs.get(node)
+        if cfg is not None:
+            return cfg
+        with self.cfg_lock:
+            if node in self.cfgs:
+                return self.cfgs[node]
+            cfgbuilder = CFGBuilder(self.syntax_tree.node_to_id, build_functions=False)
+            if node is self.root_node:
+                cfg = cfgbuilder.get_cfg(node, None, None)
+            else:
+                cfg = cfgbuilder.get_function_cfg(node)
+            for cfgnode in cfg.nodes | {cfg.startnode, cfg.endnode}:
+                self.cfgnode_to_cfg[cfgnode] = cfg
+            add_syntaxnodes_of_cfg(self.syntaxnode_to_cfgnode, cfg)
+            # published last, a CFG in self.cfgs has all its nodes in the maps
+            self.cfgs[node] = cfg
+            return cfg
 
     def get_node_for_id(self, id: str) -> ast.AST:
         return self.syntax_tree.id_to_node[id]
@@ -83,21 +149,76 @@ class ScopedTree:
     
         
     def identifieres_are_the_same(self, identifier1: ast.AST, identifier2: ast.AST):
+        symbol_ids = self.symbol_ids
+        if identifier1 in symbol_ids and identifier2 in symbol_ids:
+            return symbol_ids[identifier1] == symbol_ids[identifier2]
+        # attributes or identifiers without scope
         return _identifieres_are_the_same(self.scope_info, identifier1, identifier2)
+
+    # symbol id of identifier, raises like _identifieres_are_the_same for identifiers that are no symbol
+    def get_symbol_id(self, identifier: ast.AST) -> int:
+        symbol_id = self.symbol_ids.get(identifier)
+        if symbol_id is None:
+            _get_id_str(identifier) # wrong type
+            raise KeyError(identifier) # no scope
+        return symbol_id
+
+    def is_container_variable(self, identifier: ast.AST) -> bool:
+        return self.symbol_ids.get(identifier) in self.container_symbols
         
+    # returns the CFG node whose syntaxnode contains node
     def get_cfgnode_for_syntaxnode(self, node: ast.AST):
-        for _, cfg in self.cfgs.items():
-            for cfgnode in cfg.nodes:
-                if isinstance(cfgnode, (AssignNode, BranchNode, ReturnNode, ExprNode, LoopIterNode)) and is_descendant(cfgnode.syntaxnode, node):
-                    return cfg, cfgnode
-        raise Exception(f"No CFGNode found for syntaxnode {ast.dump(node)}")
+        cfgnode = self.syntaxnode_to_cfgnode.get(node)
+        if cfgnode is None and node not in self.syntaxnode_to_cfgnode:
+            cfgnode = self._find_cfgnode(node)
+        if cfgnode is None:
+            raise Exception(f"No CFGNode found for syntaxnode {ast.dump(node)}")
+        return self.cfgnode_to_cfg[cfgnode], cfgnode
+
+    # The CFG node of node is the one of the closest node on the parent chain that is the syntaxnode of a CFG node
+    # (None if there is no such node). The CFGs of the root node and of the functions whose body is on the parent chain
+    # are built first, the result is stored for all nodes on the parent chain.
+    # Return nodes that are created from an expression node at the end of a function share the syntaxnode with the expression node,
+    # both give the same dependencies and the expression node is used (see add_syntaxnodes_of_cfg).
+    def _find_cfgnode(self, node: ast.AST) -> Optional[CFGNode]:
+        chain = []
+        current = node
+        while current is not None and current not in self.syntaxnode_to_cfgnode:
+            parent = getattr(current, "parent", None)
+            if current is self.root_node or (isinstance(parent, ast.FunctionDef) and current is parent.body):
+                cfg_root = current if parent is None else parent
+                if cfg_root not in self.cfgs:
+                    self.get_cfg(cfg_root)
+                    # nodes on the chain may be syntaxnodes of the new CFG
+                    chain = []
+                    current = node
+                    continue
+            chain.append(current)
+            current = parent
+        cfgnode = self.syntaxnode_to_cfgnode[current] if current is not None else None
+        with self.cfg_lock:
+            for chain_node in chain:
+                self.syntaxnode_to_cfgnode[chain_node] = cfgnode
+        return cfgnode
     
+    def get_cfg_for_cfgnode(self, cfgnode: CFGNode):
+        return self.cfgnode_to_cfg[cfgnode]
+
     def get_cfg_for_function_syntaxnode(self, node: ast.FunctionDef):
-        if node not in self.cfgs:
+        if not isinstance(node, ast.FunctionDef) or node not in self.syntax_tree.node_to_id:
             raise Exception(f"No CFGNode found for function {node}")
-        return self.cfgs[node]
+        return self.get_cfg(node)
 
 
+# Adds the Assign-, Branch-, Return-, Expr- and LoopIterNodes of cfg to syntaxnode_to_cfgnode by their syntaxnode.
+# Return nodes that are created from an expression node at the end of a function share the syntaxnode with the expression node,
+# the expression node is used.
+def add_syntaxnodes_of_cfg(syntaxnode_to_cfgnode: dict[ast.AST, Optional[CFGNode]], cfg: CFG):
+    for cfgnode in cfg.nodes:
+        if isinstance(cfgnode, (AssignNode, BranchNode, ReturnNode, ExprNode, LoopIterNode)):
+            if cfgnode.syntaxnode not in syntaxnode_to_cfgnode or isinstance(cfgnode, ExprNode):
+                syntaxnode_to_cfgnode[cfgnode.syntaxnode] = cfgnode
+
 def NameFinder():
     return NodeFinder(
         lambda node: isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load),
@@ -120,18 +241,11 @@ def get_scoped_tree(syntax_tree: SyntaxTree):
             all_user_symbols.add(arg.arg) # add parameter name of function
 
     
-    cfgs = get_cfg_representation(node, syntax_tree.node_to_id)
-
-    all_identifiers = NameFinder().visit(node)
-    referenced_identifiers = set(identifier for identifier in all_identifiers if is_referenced_identifier(identifier))
-    is_container_variable = dict()
-    for identifier in all_identifiers:
-        # check if identifier x is somewhere used as x[...]
-        is_container_variable[identifier] = any(
-            _identifieres_are_the_same(scope_info, identifier, ref_identifier)
-            for ref_identifier in referenced_identifiers
-        )
-    # print(sorted(list({(name.id, b) for name,b in is_container_variable.items()})))
+    number_nodes(node)
 
+    symbol_ids, symbols = get_symbol_table(node, scope_info)
+    # symbols x that are somewhere used as x[...]
+    container_symbols = {symbol_ids[identifier] for identifier in NameFinder().visit(node)
+                         if is_referenced_identifier(identifier) and identifier in symbol_ids}
 
-    return ScopedTree(syntax_tree, scope_info, all_definitions, all_functions, all_user_symbols, cfgs, is_container_variable)
+    return ScopedTree(syntax_tree, scope_info, symbol_ids, symbols, all_definitions, all_functions, all_user_symbols, container_symbols)
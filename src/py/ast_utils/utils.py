@@ -92,6 +92,10 @@ class Block(ast.AST):
         new_body = [deepcopy(stmt, memo) for stmt in self]
         return Block(new_body)
 
+    # ast.AST.__reduce__ calls constructor without arguments, restore state instead (for pickle)
+    def __reduce__(self):
+        return (Block.__new__, (Block,), self.__dict__)
+
 def _unparse_Block(self: ast._Unparser, node: Block):
     for item in node:
         self.traverse(item)
@@ -135,8 +139,17 @@ def is_in_different_branch(node: ast.AST, other: ast.AST) -> bool:
 
 
 # We can check if one node is a descendant of another,
-# by traversing up the parent
+# by checking if its interval of depth first search numbers is contained in the interval of the other (see number_nodes),
+# or, for nodes that are not numbered, by traversing up the parent
 def is_descendant(parent: ast.AST, node: ast.AST) -> bool:
+    try:
+        root, entry, exit = node.dfs_interval
+        parent_root, parent_entry, parent_exit = parent.dfs_interval
+    except AttributeError:
+        return _is_descendant_by_parent(parent, node)
+    return root is parent_root and parent_entry <= entry and exit <= parent_exit
+
+def _is_descendant_by_parent(parent: ast.AST, node: ast.AST) -> bool:
     if parent == node:
         return True
     while node.parent is not None:
@@ -145,6 +158,42 @@ def is_descendant(parent: ast.AST, node: ast.AST) -> bool:
             return True
     return False
 
+# Labels every node below root with the interval (root, entry, exit) of the entry and exit number of a depth first search,
+# such that is_descendant is an interval check (one tuple per node, which is faster to read than three attributes).
+# The tree is given by the parent attribute, which is not the same as the tree of ast.iter_child_nodes,
+# since some nodes are shared (e.g. operators and expression contexts), for those the last assigned parent counts.
+# The numbering is invalidated by moving nodes, thus it is done once after all preprocessing (see get_scoped_tree).
+def number_nodes(root: ast.AST) -> None:
+    children: dict[ast.AST, list[ast.AST]] = dict()
+    visited = {root}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        for child in ast.iter_child_nodes(node):
+            if child not in visited:
+                visited.add(child)
+                stack.append(child)
+                if hasattr(child, "dfs_interval"):
+                    del child.dfs_interval # not numbered if not reached from root by the parent attribute
+                parent = getattr(child, "parent", None)
+                if parent is not None:
+                    children.setdefault(parent, []).append(child)
+
+    entry = dict()
+    counter = 0
+    entry[root] = counter
+    stack = [(root, iter(children.get(root, ())))]
+    while stack:
+        node, node_children = stack[-1]
+        child = next(node_children, None)
+        counter += 1
+        if child is None:
+            stack.pop()
+            node.dfs_interval = (root, entry[node], counter)
+        else:
+            entry[child] = counter
+            stack.append((child, iter(children.get(child, ()))))
+
 class IdPrinter(ast.NodeVisitor):
     def visit(self, node: ast.AST):
         print(node)
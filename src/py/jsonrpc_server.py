@@ -24,7 +24,7 @@ def write_transport_layer(writer, response):
     writer.write(response_utf8)
     writer.flush()
 
-from jsonrpc.jsonrpc2 import JSONRPC20Request, JSONRPC20Response
+from jsonrpc.jsonrpc2 import JSONRPC20Request, JSONRPC20Response, JSONRPC20BatchResponse
 import json
 import dataclasses
 
@@ -39,40 +39,250 @@ def jsonrpc_serialize( data):
 
 JSONRPC20Response.serialize = staticmethod(jsonrpc_serialize)
 JSONRPC20Request.serialize = staticmethod(jsonrpc_serialize)
+JSONRPC20BatchResponse.json = property(lambda self: jsonrpc_serialize(self.data))
+
+# message_str may also be a batch (JSON array of requests),
+# which is dispatched in one pass and answered with one JSON array of responses
+def handle_request(message_str, dispatcher):
+    # print('request: ', message_str)
+    response = JSONRPCResponseManager.handle(message_str, dispatcher)
+    # print('response:', response.json)
+    return response.json if response is not None else None # notifications have no response
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from collections import OrderedDict
+from collections import Counter
+from typing import Dict, Tuple, Any, Hashable, Optional, Callable
+from ast_utils.scoped_tree import ScopedTree
+
+class SessionEntry:
+    def __init__(self, key: Hashable, tree: Tuple[Any,ScopedTree], size: int, last_access: float) -> None:
+        self.key = key
+        self.tree = tree
+        self.size = size
+        self.last_access = last_access
+        self.results: Dict[Hashable, Future] = dict() # memoised endpoint results for this tree, pending while computed
+
+# Stores the trees built by build_ast for all clients, trees outlive the connection that built them.
+# A tree is identified by its tree id and by a key (e.g. file path, content hash and build options),
+# such that an unchanged file does not have to be parsed again.
+# Trees are only mutated by CFGs and analyses that are computed on first query under the locks of the ScopedTree,
+# so they can be read by all client threads.
+# Least recently used trees are evicted if there are more than max_trees trees or if their estimated size exceeds max_memory bytes,
+# trees that were not accessed for ttl seconds are evicted as well (None disables the respective limit).
+# Endpoint results can be memoised per tree (see memoize) if memoize_results is set.
+# clock returns the current time in seconds for the ttl (e.g. a fake clock in tests).
+class Session:
+    def __init__(self, max_trees: Optional[int] = None, max_memory: Optional[int] = None, ttl: Optional[float] = None, memoize_results: bool = True,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.lock = threading.Lock()
+        self.clock = clock
+        self.trees: OrderedDict[str, SessionEntry] = OrderedDict() # least recently used first
+        self.keys: Dict[Hashable, str] = dict() # key -> tree id
+        self.memory = 0
+        self.hits = Counter()   # result key[0] (endpoint) -> number of memoised results returned
+        self.misses = Counter() # result key[0] (endpoint) -> number of computed results
+        self.configure(max_trees, max_memory, ttl, memoize_results)
+
+    def configure(self, max_trees: Optional[int] = None, max_memory: Optional[int] = None, ttl: Optional[float] = None, memoize_results: bool = True):
+        with self.lock:
+            self.max_trees = max_trees
+            self.max_memory = max_memory
+            self.ttl = ttl
+            self.memoize_results = memoize_results
+            if not memoize_results:
+                self._invalidate_results()
+            self._evict()
+
+    def _remove(self, tree_id: str):
+        entry = self.trees.pop(tree_id)
+        self.memory -= entry.size
+        if self.keys.get(entry.key) == tree_id:
+            del self.keys[entry.key]
+
+    def _evict(self, keep: Optional[str] = None):
+        if self.ttl is not None:
+            deadline = self.clock() - self.ttl
+            for tree_id, entry in list(self.trees.items()):
+                if entry.last_access >= deadline:
+                    break # trees are ordered by last access
+                if tree_id != keep:
+                    self._remove(tree_id)
+        for tree_id in list(self.trees.keys()):
+            over_count = self.max_trees is not None and len(self.trees) > self.max_trees
+            over_memory = self.max_memory is not None and self.memory > self.max_memory
+            if not (over_count or over_memory):
+                break
+            if tree_id != keep:
+                self._remove(tree_id)
+
+    # returns id of tree stored for key or None
+    def lookup(self, key: Hashable) -> Optional[str]:
+        with self.lock:
+            self._evict()
+            tree_id = self.keys.get(key)
+            if tree_id is not None:
+                self._touch(tree_id)
+            return tree_id
+
+    # stores tree for key and returns its tree id,
+    # if a tree for key was added in the meantime, its id is returned instead
+    def add(self, key: Hashable, tree_id: str, tree: Tuple[Any,ScopedTree], size: int = 0) -> str:
+        with self.lock:
+            if key in self.keys:
+                tree_id = self.keys[key]
+                self._touch(tree_id)
+                return tree_id
+            self.trees[tree_id] = SessionEntry(key, tree, size, self.clock())
+            self.keys[key] = tree_id
+            self.memory += size
+            self._evict(keep=tree_id)
+            return tree_id
+
+    def _touch(self, tree_id: str):
+        self.trees[tree_id].last_access = self.clock()
+        self.trees.move_to_end(tree_id)
+
+    # Returns the memoised result of key (a tuple of endpoint name and the parameters identifying the query) for tree tree_id,
+    # or computes and memoises it. Trees are never mutated, so results stay valid as long as the tree is in the session:
+    # they are dropped if the tree is evicted, and a changed file gets a new tree (and tree id) in build_ast.
+    # Results are shared by all clients and must not be mutated. Their memory is not part of the tree size.
+    # A result is stored as future when its computation starts, concurrent requests of the same result
+    # (e.g. a client query and the precomputation after build_ast) wait for it instead of computing it again.
+    # Exceptions are passed to the waiting requests, but are not memoised.
+    def memoize(self, tree_id: str, key: Tuple, compute: Callable[[], Any]) -> Any:
+        with self.lock:
+            if tree_id not in self.trees:
+                raise KeyError(f"Unknown tree id {tree_id}, the tree may have been evicted. Call build_ast again.")
+            results = self.trees[tree_id].results
+            if self.memoize_results and key in results:
+                self.hits[key[0]] += 1
+                future = results[key]
+                is_computed_here = False
+            else:
+                self.misses[key[0]] += 1
+                future = Future()
+                is_computed_here = True
+                if self.memoize_results:
+                    results[key] = future
+
+        if not is_computed_here:
+            return future.result()
+
+        try:
+            result = compute()
+        except BaseException as e:
+            with self.lock:
+                if results.get(key) is future:
+                    del results[key]
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+
+    def _invalidate_results(self, tree_id: Optional[str] = None):
+        for _tree_id, entry in self.trees.items():
+            if tree_id is None or _tree_id == tree_id:
+                entry.results.clear()
+
+    # drops memoised results of tree_id (all trees if None)
+    def invalidate_results(self, tree_id: Optional[str] = None):
+        with self.lock:
+            self._invalidate_results(tree_id)
+
+    def __setitem__(self, tree_id: str, tree: Tuple[Any,ScopedTree]):
+        self.add(tree_id, tree_id, tree)
+
+    def __getitem__(self, tree_id: str) -> Tuple[Any,ScopedTree]:
+        with self.lock:
+            if tree_id not in self.trees:
+                raise KeyError(f"Unknown tree id {tree_id}, the tree may have been evicted. Call build_ast again.")
+            self._touch(tree_id)
+            return self.trees[tree_id].tree
+    
+    def __contains__(self, tree_id: str) -> bool:
+        return tree_id in self.trees
+    
+    def __len__(self) -> int:
+        return len(self.trees)
+
+    def clear(self):
+        with self.lock:
+            self.trees.clear()
+            self.keys.clear()
+            self.memory = 0
+            self.hits.clear()
+            self.misses.clear()
+
+DEFAULT_MAX_MEMORY = 2**30 # 1GB
+DEFAULT_TTL = 3600. # 1 hour
+_SESSION = Session(max_memory=DEFAULT_MAX_MEMORY, ttl=DEFAULT_TTL)
+
+# Requests of a client are dispatched to the executor as soon as they are read,
+# such that the client can keep many requests in flight on one connection.
+# Every response is written as soon as its request is finished, the client matches it by id.
+def handle_client_pipelined(reader, writer, dispatcher, executor):
+    write_lock = threading.Lock()
+    # futures are discarded from worker threads when done, pending is only accessed under pending_lock
+    pending_lock = threading.Lock()
+    pending = set()
+
+    def _discard(future):
+        with pending_lock:
+            pending.discard(future)
+
+    def _handle_request(message_str):
+        response = handle_request(message_str, dispatcher)
+        if response is not None:
+            with write_lock:
+                write_transport_layer(writer, response)
 
-def handle_client(reader, writer, dispatcher): 
     while True:
         message_str = read_transport_layer(reader)
         if message_str is None:
             break
-        # print('request: ', message_str)
-        response = JSONRPCResponseManager.handle(message_str, dispatcher)
-        # print('response:', response.json)
-        write_transport_layer(writer, response.json)
+        future = executor.submit(_handle_request, message_str)
+        with pending_lock:
+            pending.add(future)
+        future.add_done_callback(_discard)
 
-from typing import Dict, Tuple, Any
-from ast_utils.scoped_tree import ScopedTree
-_SESSION: Dict[str, Tuple[Any,ScopedTree]] = dict()
+    # finish outstanding requests before the connection is closed
+    with pending_lock:
+        outstanding = list(pending)
+    wait(outstanding)
+
+def serve_client(sock, dispatcher, executor):
+    print("Hello", sock)
+    reader = sock.makefile(mode='rb') # binary
+    writer = sock.makefile(mode='wb') # binary
+    try:
+        handle_client_pipelined(reader, writer, dispatcher, executor)
+    except (ConnectionError, OSError) as e:
+        print("Connection error:", e)
+    finally:
+        reader.close()
+        writer.close()
+        sock.close()
+        print("Bye", sock)
 
-def run_server(socket_name, dispatcher):
+# Every client connection is read by its own thread,
+# requests of all clients are processed by a thread pool with max_workers threads.
+def run_server(socket_name, dispatcher, max_workers=None):
     server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
     server.bind(socket_name)
+    server.listen()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="request")
     try:
         while True:
-            server.listen(1)
             sock, addr = server.accept()
-            print("Hello", sock)
-            reader = sock.makefile(mode='rb') # binary
-            writer = sock.makefile(mode='wb') # binary
-            handle_client(reader, writer, dispatcher)
-            reader.close()
-            writer.close()
-            sock.close()
-            _SESSION.clear()
-            print("Bye", sock)
+            client = threading.Thread(target=serve_client, args=(sock, dispatcher, executor), daemon=True)
+            client.start()
     except KeyboardInterrupt:
         print("Interrupt server.")
     finally:
         print("Close server.")
         server.close()
-        os.remove(socket_name)
\ No newline at end of file
+        os.remove(socket_name)
+        executor.shutdown(wait=False, cancel_futures=True)
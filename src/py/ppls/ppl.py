@@ -1,5 +1,5 @@
 import ast
-from typing import Union
+from typing import Union, Optional
 from ast_utils.preprocess import SyntaxTree
 
 class VariableDefinition:
@@ -18,6 +18,11 @@ class PPL:
     def is_random_variable_definition(self, node: ast.AST) -> bool:
         raise NotImplementedError
     
+    # Callee names of the calls in random variable definitions x = f(...) (None if they are not assignments of calls),
+    # random variables are then found in the call index of the syntax tree instead of checking every node.
+    def get_random_variable_call_names(self) -> Optional[set[str]]:
+        return None
+    
     def is_model(self, node: ast.AST) -> bool:
         raise NotImplementedError
     
@@ -68,6 +68,9 @@ class PyMC(PPL):
             case _:
                 return False
         
+    def get_random_variable_call_names(self) -> set[str]:
+        return self.distributions
+    
     def get_random_variable_name(self, variable:VariableDefinition) -> str:
         assert isinstance(variable.node, ast.Assign)
         call_node = variable.node.value
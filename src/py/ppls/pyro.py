@@ -17,6 +17,9 @@ class Pyro(PPL):
                 return True
         return False
     
+    def get_random_variable_call_names(self) -> set[str]:
+        return {"sample"}
+    
     def get_random_variable_name(self, variable: VariableDefinition) -> str:
         assert isinstance(variable.node, ast.Assign)
         call_node = variable.node.value
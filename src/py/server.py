@@ -1,26 +1,83 @@
-from jsonrpc_server import run_server, _SESSION
+from jsonrpc_server import run_server, _SESSION, DEFAULT_MAX_MEMORY, DEFAULT_TTL
 
 import ast
 from ast_utils.scoped_tree import ScopedTree, get_scoped_tree
 from ast_utils.preprocess import preprocess_syntaxtree, SyntaxTree
+import ast_utils.loop_unroller as loop_unroller
 from ast_utils.node_finders import VariableDefinitionCollector, find_model, find_guide
 from ast_utils.utils import *
 
 from analysis.call_graph import compute_call_graph
-from analysis.data_control_flow import data_deps_for_node, control_parents_for_node
+from analysis.data_control_flow import data_deps_for_node, control_parents_for_node, dependency_closure, get_control_subnode, DependencyCache
 import analysis.interval_arithmetic as interval_arithmetic
 import analysis.symbolic as symbolic
 
 from ppls import *
 import server_interface
+from tree_cache import TreeCache
 import uuid
+import hashlib
+import os
+import inspect
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import wraps
+from typing import Optional
+
+# endpoints log their calls, can be disabled if server is used in-process
+LOGGING = True
+
+# Functions are not copied for each call site (uniquify_calls), instead the dependency closures
+# follow calls with function summaries (see analysis.data_control_flow.FunctionSummary), set with --summarize-calls.
+# Limitations: random variables in a function called at several call sites are one random variable for all calls,
+# and the single node queries get_data_dependencies and get_control_dependencies follow parameters to all call sites.
+SUMMARIZE_CALLS = False
+
+# Loops over constant ranges with more iterations are kept instead of unrolled (see ast_utils.loop_unroller),
+# set with --max-unrolled-iterations.
+MAX_UNROLLED_ITERATIONS = loop_unroller.MAX_UNROLLED_ITERATIONS
+
+def log(*args):
+    if LOGGING:
+        print(*args)
+
+# Parameters of a query as hashable key, syntax nodes are identified by their node id.
+def _to_result_key(param):
+    if isinstance(param, dict):
+        if "node_id" in param:
+            return param["node_id"]
+        return tuple((key, _to_result_key(value)) for key, value in sorted(param.items()))
+    if isinstance(param, (list, tuple)):
+        return tuple(_to_result_key(p) for p in param)
+    return param
+
+# Memoises the results of an endpoint with signature (tree_id, ...) in the session, see Session.memoize.
+# The result key is the endpoint name followed by all other parameters (including defaults) in order.
+def memoized(endpoint):
+    signature = inspect.signature(endpoint)
+    @wraps(endpoint)
+    def memoized_endpoint(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = dict(bound.arguments)
+        tree_id = params.pop("tree_id")
+        key = (endpoint.__name__,) + tuple(_to_result_key(param) for param in params.values())
+        return _SESSION.memoize(tree_id, key, lambda: endpoint(*args, **kwargs))
+    return memoized_endpoint
+
+# intermediate results of the dependency analyses are shared by all queries of a tree
+def get_dependency_cache(tree_id: str) -> DependencyCache:
+    return _SESSION.memoize(tree_id, ("DependencyCache",), DependencyCache)
 
 def get_syntax_tree(file_content: str, line_offsets: list[int], n_unroll_loops: int, uniquify_calls: bool) -> SyntaxTree:
     syntax_tree = ast.parse(file_content)
-    syntax_tree = preprocess_syntaxtree(syntax_tree, file_content, line_offsets, n_unroll_loops, uniquify_calls)
+    syntax_tree = preprocess_syntaxtree(syntax_tree, file_content, line_offsets, n_unroll_loops, uniquify_calls, MAX_UNROLLED_ITERATIONS)
     return syntax_tree
 
 def get_variables(syntax_tree: SyntaxTree, ppl: PPL) -> list[VariableDefinition]:
+    call_names = ppl.get_random_variable_call_names()
+    if call_names is not None:
+        assignments = syntax_tree.get_call_index().get_call_assignments(call_names)
+        return [VariableDefinition(node) for node in assignments if ppl.is_random_variable_definition(node)]
     variable_collector = VariableDefinitionCollector(ppl)
     variable_collector.visit(syntax_tree.root_node)
     return variable_collector.result
@@ -30,6 +87,27 @@ def to_syntax_node(syntax_tree: SyntaxTree, node: ast.AST) -> server_interface.S
     node = server_interface.SyntaxNode(syntax_tree.node_to_id[node], start, end, source_text(node))
     return node
 
+def to_control_dependency(syntax_tree: SyntaxTree, dep: ast.AST) -> server_interface.ControlDependency:
+    if isinstance(dep, ast.If):
+        kind = "if"
+        body = [to_syntax_node(syntax_tree, dep.body)]
+        if hasattr(dep, "orelse"):
+            body.append(to_syntax_node(syntax_tree, dep.orelse))
+    elif isinstance(dep, ast.While):
+        kind = "while"
+        body = [to_syntax_node(syntax_tree, dep.body)]
+    elif isinstance(dep, ast.For):
+        kind = "for"
+        body = [to_syntax_node(syntax_tree, dep.body)]
+    control_node = get_control_subnode(dep)
+
+    return server_interface.ControlDependency(
+        to_syntax_node(syntax_tree, dep),
+        kind,
+        to_syntax_node(syntax_tree, control_node),
+        body
+    )
+
 def to_random_variable(syntax_tree: SyntaxTree, variable: VariableDefinition, ppl: PPL, is_observed: bool) -> server_interface.RandomVariable:
     name = ppl.get_random_variable_name(variable)
     address_node = to_syntax_node(syntax_tree, ppl.get_address_node(variable))
@@ -53,23 +131,73 @@ _PPL_DICT: dict[str, PPL] =  {
     "beanmachine": Beanmachine()
 }
 
-def build_ast(file_name: str, ppl: str, n_unroll_loops: int) -> str:
-    print("build_ast")
-    print("FILENAME:", file_name)
+# rough estimate of memory used by a scoped tree (syntax tree, scopes and CFGs),
+# measured at around 1KB per syntax node on the PyMC evaluation programs
+def estimate_tree_size(scoped_tree: ScopedTree) -> int:
+    return 1024 * len(scoped_tree.syntax_tree.node_to_id)
+
+# opt-in on-disk cache of scoped trees, set with --tree-cache or LASAPP_TREE_CACHE
+_TREE_CACHE: Optional[TreeCache] = TreeCache(os.environ["LASAPP_TREE_CACHE"]) if os.environ.get("LASAPP_TREE_CACHE") else None
+
+# CFGs are built on first query (see ScopedTree.get_cfg). With --prebuild-cfgs, build_ast builds the CFGs of model and guide
+# and of the functions reachable from them in the call graph, e.g. such that they are stored in the tree cache.
+# The CFGs of all other functions (and of the module if the model is a function) are still built on first query.
+PREBUILD_CFGS = False
+
+def prebuild_cfgs(scoped_tree: ScopedTree, ppl_obj: PPL):
+    for find in (find_model, find_guide):
+        try:
+            node = find(scoped_tree.root_node, ppl_obj).node
+        except AssertionError:
+            continue # no model or guide definition
+        # CFG that contains a model that is not a function (e.g. with pm.Model())
+        scope = node
+        while not isinstance(scope, ast.FunctionDef) and scope.parent is not None:
+            scope = scope.parent
+        scoped_tree.get_cfg(scope)
+        for function in compute_call_graph(scoped_tree.root_node, scoped_tree.scope_info, node):
+            if isinstance(function, ast.FunctionDef):
+                scoped_tree.get_cfg(function)
+
+def build_scoped_tree(file_name: str, file_content: str, ppl_obj: PPL, n_unroll_loops: int, uniquify_calls: bool) -> ScopedTree:
     line_offsets = get_line_offsets(file_name)
-    file_content = get_file_content(file_name)
-    ppl_obj = _PPL_DICT[ppl]
-    uniquify_calls = ppl != "beanmachine"
     syntax_tree = get_syntax_tree(file_content, line_offsets, n_unroll_loops, uniquify_calls)
     syntax_tree = ppl_obj.preprocess_syntax_tree(syntax_tree)
-
     scoped_tree = get_scoped_tree(syntax_tree)
+    if PREBUILD_CFGS:
+        prebuild_cfgs(scoped_tree, ppl_obj)
+    return scoped_tree
+
+def build_ast(file_name: str, ppl: str, n_unroll_loops: int) -> str:
+    log("build_ast")
+    log("FILENAME:", file_name)
+    file_content = get_file_content(file_name)
+    # trees are shared by all clients, an unchanged file is only parsed once
+    key = (os.path.abspath(file_name), hashlib.sha256(file_content.encode("utf-8")).hexdigest(), ppl, n_unroll_loops, MAX_UNROLLED_ITERATIONS)
+    tree_id = _SESSION.lookup(key)
+    if tree_id is not None:
+        return tree_id
+
+    ppl_obj = _PPL_DICT[ppl]
+    uniquify_calls = ppl != "beanmachine" and not SUMMARIZE_CALLS
+    if _TREE_CACHE is not None:
+        cache_key = _TREE_CACHE.get_key(file_content, ppl, n_unroll_loops, uniquify_calls, MAX_UNROLLED_ITERATIONS)
+        scoped_tree = _TREE_CACHE.load(cache_key)
+        if scoped_tree is None:
+            scoped_tree = build_scoped_tree(file_name, file_content, ppl_obj, n_unroll_loops, uniquify_calls)
+            _TREE_CACHE.store(cache_key, scoped_tree)
+    else:
+        scoped_tree = build_scoped_tree(file_name, file_content, ppl_obj, n_unroll_loops, uniquify_calls)
+
     uuid4 = str(uuid.uuid4())
-    _SESSION[uuid4] = ppl_obj, scoped_tree
-    return uuid4
+    tree_id = _SESSION.add(key, uuid4, (ppl_obj, scoped_tree), estimate_tree_size(scoped_tree))
+    if PRECOMPUTE and tree_id == uuid4:
+        start_precomputation(tree_id)
+    return tree_id
 
+@memoized
 def get_model(tree_id: str) -> server_interface.Model:
-    print("get_model")
+    log("get_model")
     ppl_obj, scoped_tree = _SESSION[tree_id]
 
     model = find_model(scoped_tree.root_node, ppl_obj)
@@ -77,8 +205,9 @@ def get_model(tree_id: str) -> server_interface.Model:
     return server_interface.Model(model.name, to_syntax_node(scoped_tree.syntax_tree, model.node))
 
 
+@memoized
 def get_guide(tree_id: str) -> server_interface.Model:
-    print("get_guide")
+    log("get_guide")
     ppl_obj, scoped_tree = _SESSION[tree_id]
 
     model = find_guide(scoped_tree.root_node, ppl_obj)
@@ -86,8 +215,9 @@ def get_guide(tree_id: str) -> server_interface.Model:
     return server_interface.Model(model.name, to_syntax_node(scoped_tree.syntax_tree, model.node))
 
 
+@memoized
 def get_random_variables(tree_id: str) -> list[server_interface.RandomVariable]:
-    print("get_random_variables")
+    log("get_random_variables")
 
     ppl_obj, scoped_tree = _SESSION[tree_id]
 
@@ -101,51 +231,146 @@ def get_random_variables(tree_id: str) -> list[server_interface.RandomVariable]:
     return response
 
 
+@memoized
 def get_data_dependencies(tree_id: str, node: dict) -> list[server_interface.SyntaxNode]:
-    print("get_data_dependencies")
+    log("get_data_dependencies")
 
     _, scoped_tree = _SESSION[tree_id]
 
     node = scoped_tree.get_node_for_id(node["node_id"])
-    data_deps = data_deps_for_node(scoped_tree, node)
+    data_deps = data_deps_for_node(scoped_tree, node, get_dependency_cache(tree_id))
     response = [to_syntax_node(scoped_tree.syntax_tree, dep) for dep in data_deps]
     return response
 
+@memoized
 def get_control_dependencies(tree_id: str, node: dict) -> list[server_interface.ControlDependency]:
-    print("get_control_dependencies")
+    log("get_control_dependencies")
 
     _, scoped_tree = _SESSION[tree_id]
 
     node = scoped_tree.get_node_for_id(node["node_id"])
-    control_deps = control_parents_for_node(scoped_tree, node)
-    response = []
-    for dep in control_deps:
-        if isinstance(dep, ast.If):
-            kind = "if"
-            control_node = dep.test
-            body = [to_syntax_node(scoped_tree.syntax_tree, dep.body)]
-            if hasattr(dep, "orelse"):
-                body.append(to_syntax_node(scoped_tree.syntax_tree, dep.orelse))
-        elif isinstance(dep, ast.While):
-            kind = "while"
-            control_node = dep.test
-            body = [to_syntax_node(scoped_tree.syntax_tree, dep.body)]
-        elif isinstance(dep, ast.For):
-            kind = "for"
-            control_node = dep.iter
-            body = [to_syntax_node(scoped_tree.syntax_tree, dep.body)]
-            
-        response.append(server_interface.ControlDependency(
-            to_syntax_node(scoped_tree.syntax_tree, dep),
-            kind,
-            to_syntax_node(scoped_tree.syntax_tree, control_node),
-            body
-        ))
+    control_deps = control_parents_for_node(scoped_tree, node, get_dependency_cache(tree_id))
+    response = [to_control_dependency(scoped_tree.syntax_tree, dep) for dep in control_deps]
+    return response
 
+# The bulk variants answer the query for many nodes at once and share
+# intermediate results (cfg node lookup, call sites, reaching definitions, branch points)
+# between the nodes. Response maps node_id to dependencies.
+# Results are memoised per node, shared with get_data_dependencies and get_control_dependencies.
+def get_data_dependencies_bulk(tree_id: str, nodes: list[dict]) -> dict[str, list[server_interface.SyntaxNode]]:
+    log("get_data_dependencies_bulk")
+
+    _, scoped_tree = _SESSION[tree_id]
+
+    cache = get_dependency_cache(tree_id)
+    def compute(node_id):
+        syntaxnode = scoped_tree.get_node_for_id(node_id)
+        data_deps = data_deps_for_node(scoped_tree, syntaxnode, cache)
+        return [to_syntax_node(scoped_tree.syntax_tree, dep) for dep in data_deps]
+
+    response = dict()
+    for node in nodes:
+        node_id = node["node_id"]
+        response[node_id] = _SESSION.memoize(tree_id, ("get_data_dependencies", node_id), lambda: compute(node_id))
+    return response
+
+def get_control_dependencies_bulk(tree_id: str, nodes: list[dict]) -> dict[str, list[server_interface.ControlDependency]]:
+    log("get_control_dependencies_bulk")
+
+    _, scoped_tree = _SESSION[tree_id]
+
+    cache = get_dependency_cache(tree_id)
+    def compute(node_id):
+        syntaxnode = scoped_tree.get_node_for_id(node_id)
+        control_deps = control_parents_for_node(scoped_tree, syntaxnode, cache)
+        return [to_control_dependency(scoped_tree.syntax_tree, dep) for dep in control_deps]
+
+    response = dict()
+    for node in nodes:
+        node_id = node["node_id"]
+        response[node_id] = _SESSION.memoize(tree_id, ("get_control_dependencies", node_id), lambda: compute(node_id))
     return response
 
+# Server-side BFS over data and control dependencies, see analysis.data_control_flow.dependency_closure
+# stop_nodes is a list[tuple[SyntaxNode, Optional[SyntaxNode]]] of stop nodes and the node where the traversal resumes
+@memoized
+def get_dependency_closure(tree_id: str, nodes: list[dict], stop_nodes: list[tuple[dict, dict]], follow_control: bool, is_control: bool) -> server_interface.DependencyClosure:
+    log("get_dependency_closure")
+
+    _, scoped_tree = _SESSION[tree_id]
+
+    start_nodes = [scoped_tree.get_node_for_id(node["node_id"]) for node in nodes]
+    stop = dict()
+    for stop_node, resume_node in stop_nodes:
+        stop_node = scoped_tree.get_node_for_id(stop_node["node_id"])
+        stop[stop_node] = scoped_tree.get_node_for_id(resume_node["node_id"]) if resume_node is not None else None
+
+    reached, control_reached, traversed = dependency_closure(scoped_tree, start_nodes, stop, follow_control, is_control, get_dependency_cache(tree_id), SUMMARIZE_CALLS)
+
+    return server_interface.DependencyClosure(
+        [to_syntax_node(scoped_tree.syntax_tree, node) for node in reached],
+        [to_syntax_node(scoped_tree.syntax_tree, node) for node in control_reached],
+        [to_syntax_node(scoped_tree.syntax_tree, node) for node in traversed]
+    )
+
+def _is_descendant(parent: ast.AST, child: ast.AST):
+    return parent.position <= child.position and child.end_position <= parent.end_position
+
+# Statistical dependencies between the random variables reachable from model (default: model of ppl),
+# plates are given by the for loops that random variables are control dependent on.
+@memoized
+def get_model_graph(tree_id: str, node: Optional[dict] = None) -> server_interface.ModelGraph:
+    log("get_model_graph")
+
+    ppl_obj, scoped_tree = _SESSION[tree_id]
+    syntax_tree = scoped_tree.syntax_tree
+
+    if node is None:
+        model_node = find_model(scoped_tree.root_node, ppl_obj).node
+    else:
+        model_node = scoped_tree.get_node_for_id(node["node_id"])
+
+    call_graph = compute_call_graph(scoped_tree.root_node, scoped_tree.scope_info, model_node)
+    # get all random variables in file that are reachable from model
+    variables = [variable for variable in get_variables(syntax_tree, ppl_obj) if any(_is_descendant(caller, variable.node) for caller in call_graph)]
+
+    # recursively get all data and control dependencies of random variable node,
+    # the recursion does not continue at random variables but at their address node
+    stop_nodes = {variable.node: ppl_obj.get_address_node(variable) for variable in variables}
+    cache = get_dependency_cache(tree_id)
+    edges = []
+    for variable in variables:
+        start_nodes = [ppl_obj.get_address_node(variable), ppl_obj.get_distribution_node(variable)]
+        reached, _, _ = dependency_closure(scoped_tree, start_nodes, stop_nodes, True, True, cache, SUMMARIZE_CALLS)
+        for dep in reached:
+            edges.append((syntax_tree.node_to_id[dep], syntax_tree.node_to_id[variable.node]))
+
+    # compute plates from control parents
+    plates = {"global": server_interface.ModelGraphPlate("global", None, [], [])}
+    for variable in variables:
+        control_deps = control_parents_for_node(scoped_tree, variable.node, cache)
+        # outermost first, a control dependency starts before the ones nested in it
+        control_deps = sorted(control_deps, key=lambda dep: (dep.position, -dep.end_position))
+        current_plate = plates["global"]
+        for dep in control_deps:
+            if isinstance(dep, ast.For):
+                dep_node_id = syntax_tree.node_to_id[dep]
+                if dep_node_id not in plates:
+                    plates[dep_node_id] = server_interface.ModelGraphPlate(dep_node_id, to_control_dependency(syntax_tree, dep), [], [])
+                if dep_node_id not in current_plate.plates:
+                    current_plate.plates.append(dep_node_id)
+                current_plate = plates[dep_node_id]
+        current_plate.members.append(syntax_tree.node_to_id[variable.node])
+
+    return server_interface.ModelGraph(
+        [to_random_variable(syntax_tree, variable, ppl_obj, ppl_obj.is_observed(variable)) for variable in variables],
+        edges,
+        list(plates.values())
+    )
+
+@memoized
 def estimate_value_range(tree_id: str, expr: dict, mask: list[tuple[dict, dict]]) -> server_interface.Interval:
-    print("estimate_value_range")
+    log("estimate_value_range")
 
     _, scoped_tree = _SESSION[tree_id]
 
@@ -163,7 +388,7 @@ def estimate_value_range(tree_id: str, expr: dict, mask: list[tuple[dict, dict]]
             program_variable_symbol = node.name
             valuation[program_variable_symbol] = parsed_interval
         else:
-            print(f"Cannot mask node of type {type(node)} {source_text(node)}.")
+            log(f"Cannot mask node of type {type(node)} {source_text(node)}.")
 
     expr = server_interface.SyntaxNode.from_dict(expr)
     node_to_evaluate = scoped_tree.get_node_for_id(expr.node_id)
@@ -173,8 +398,9 @@ def estimate_value_range(tree_id: str, expr: dict, mask: list[tuple[dict, dict]]
     return server_interface.Interval(str(res.low), str(res.high))
 
 
+@memoized
 def get_call_graph(tree_id: str, node: dict) -> list[server_interface.CallGraphNode]:
-    print("get_call_graph")
+    log("get_call_graph")
 
     _, scoped_tree = _SESSION[tree_id]
 
@@ -192,8 +418,9 @@ def get_call_graph(tree_id: str, node: dict) -> list[server_interface.CallGraphN
     return call_nodes
 
 
+@memoized
 def get_path_conditions(tree_id: str, root: dict, nodes: list[dict], mask: list[tuple[dict, server_interface.SymbolicExpression]]) -> list[server_interface.SymbolicExpression]:
-    print("get_path_conditions")
+    log("get_path_conditions")
     _, scoped_tree = _SESSION[tree_id]
 
     root = scoped_tree.get_node_for_id(root["node_id"])
@@ -204,12 +431,87 @@ def get_path_conditions(tree_id: str, root: dict, nodes: list[dict], mask: list[
     path_conditions = [server_interface.SymbolicExpression(symbolic.path_condition_to_str(result[node])) for node in nodes]
     return path_conditions
 
+# Optional speculative precomputation (--precompute): after build_ast has built a new tree, the results that clients
+# usually query first are computed in the background by the memoised endpoints. A query of such a result returns it
+# if it is finished or waits for it (see Session.memoize). The dependency closures of get_model_graph also build the
+# CFGs and the dataflow facts (reaching definitions, control dependence) that later dependency queries need.
+# Precomputation runs in one background thread, such that it does not take all request threads.
+PRECOMPUTE = False
+_PRECOMPUTE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="precompute")
+
+def _precompute_dependencies(tree_id: str):
+    for variable in get_random_variables(tree_id):
+        node = variable.node.to_dict()
+        get_data_dependencies(tree_id, node)
+        get_control_dependencies(tree_id, node)
+
+def precompute(tree_id: str):
+    steps = [
+        lambda: get_random_variables(tree_id),
+        lambda: get_model(tree_id),
+        lambda: get_guide(tree_id),
+        lambda: get_call_graph(tree_id, get_model(tree_id).node.to_dict()),
+        # with the model node, like the queries of the client (see analysis.model_graph.get_graph)
+        lambda: get_model_graph(tree_id, get_model(tree_id).node.to_dict()),
+        lambda: _precompute_dependencies(tree_id),
+    ]
+    for step in steps:
+        if tree_id not in _SESSION:
+            return # evicted
+        try:
+            step()
+        except Exception as e:
+            # errors are not memoised, the query of the client raises again
+            log("precompute failed:", repr(e))
+
+def start_precomputation(tree_id: str) -> Future:
+    return _PRECOMPUTE_EXECUTOR.submit(precompute, tree_id)
+
 import sys
 from jsonrpc import dispatcher
 import os
 from pathlib import Path
+import argparse
+
+def register_endpoints(dispatcher):
+    dispatcher["build_ast"] = build_ast
+    dispatcher["get_random_variables"] = get_random_variables
+    dispatcher["get_model"] = get_model
+    dispatcher["get_guide"] = get_guide
+    dispatcher["get_data_dependencies"] = get_data_dependencies
+    dispatcher["get_control_dependencies"] = get_control_dependencies
+    dispatcher["get_data_dependencies_bulk"] = get_data_dependencies_bulk
+    dispatcher["get_control_dependencies_bulk"] = get_control_dependencies_bulk
+    dispatcher["get_dependency_closure"] = get_dependency_closure
+    dispatcher["get_model_graph"] = get_model_graph
+    dispatcher["estimate_value_range"] = estimate_value_range
+    dispatcher["get_call_graph"] = get_call_graph
+    dispatcher["get_path_conditions"] = get_path_conditions
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=None, help="number of threads that process requests of all clients (default: ThreadPoolExecutor default)")
+    parser.add_argument("--cache-trees", type=int, default=None, help="maximum number of trees kept in session (default: unlimited)")
+    parser.add_argument("--cache-memory", type=int, default=DEFAULT_MAX_MEMORY // 2**20, help="memory budget of trees kept in session in MB (default: %(default)s)")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL, help="seconds after which an unused tree is evicted from session (default: %(default)s)")
+    parser.add_argument("--no-memoize", action="store_true", help="disable memoisation of endpoint results, e.g. for benchmarking")
+    parser.add_argument("--tree-cache", type=str, default=None, help="directory of on-disk cache of preprocessed trees (default: LASAPP_TREE_CACHE or disabled)")
+    parser.add_argument("--summarize-calls", action="store_true", help="follow calls with function summaries instead of copying functions for each call site")
+    parser.add_argument("--prebuild-cfgs", action="store_true", help="build CFGs of the functions reachable from model and guide in build_ast instead of on first query")
+    parser.add_argument("--max-unrolled-iterations", type=int, default=MAX_UNROLLED_ITERATIONS, help="loops over constant ranges with more iterations are not unrolled (default: %(default)s)")
+    parser.add_argument("--precompute", action="store_true", help="compute random variables, call graph and model graph in the background after build_ast")
+    args = parser.parse_args()
+
+    SUMMARIZE_CALLS = args.summarize_calls
+    MAX_UNROLLED_ITERATIONS = args.max_unrolled_iterations
+    PREBUILD_CFGS = args.prebuild_cfgs
+    PRECOMPUTE = args.precompute and not args.no_memoize
+
+    if args.tree_cache is not None:
+        _TREE_CACHE = TreeCache(args.tree_cache)
+
+    _SESSION.configure(args.cache_trees, args.cache_memory * 2**20, args.cache_ttl, not args.no_memoize)
+
     # socket_name = sys.argv[1]
     Path("./.pipe").mkdir(exist_ok=True)
     socket_name = "./.pipe/python_rpc_socket"
@@ -219,14 +521,7 @@ if __name__ == '__main__':
 
     print("Started Python Language Server", socket_name)
 
-    dispatcher["build_ast"] = build_ast
-    dispatcher["get_random_variables"] = get_random_variables
-    dispatcher["get_model"] = get_model
-    dispatcher["get_guide"] = get_guide
-    dispatcher["get_data_dependencies"] = get_data_dependencies
-    dispatcher["get_control_dependencies"] = get_control_dependencies
-    dispatcher["estimate_value_range"] = estimate_value_range
-    dispatcher["get_call_graph"] = get_call_graph
-    dispatcher["get_path_conditions"] = get_path_conditions
+    register_endpoints(dispatcher)
 
-    run_server(socket_name, dispatcher)
\ No newline at end of file
+    run_server(socket_name, dispatcher, max_workers=args.workers)
+    _PRECOMPUTE_EXECUTOR.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from dataclasses_json import dataclass_json
+from typing import Optional
 
 @dataclass_json
 @dataclass
@@ -62,4 +63,26 @@ class Interval:
 @dataclass_json
 @dataclass
 class SymbolicExpression:
-    expr: str
\ No newline at end of file
+    expr: str
+
+@dataclass_json
+@dataclass
+class DependencyClosure:
+    stop_nodes: list[SyntaxNode]
+    control_stop_nodes: list[SyntaxNode]
+    frontier: list[SyntaxNode]
+
+@dataclass_json
+@dataclass
+class ModelGraphPlate:
+    node_id: str                                        # "global" or node_id of plate's control dependency
+    control_dependency: Optional[ControlDependency]     # None for global plate
+    members: list[str]                                  # node_ids of random variables
+    plates: list[str]                                   # node_ids of nested plates
+
+@dataclass_json
+@dataclass
+class ModelGraph:
+    random_variables: list[RandomVariable]
+    edges: list[tuple[str, str]]                        # node_ids of random variables, dependency -> dependent
+    plates: list[ModelGraphPlate]
\ No newline at end of file
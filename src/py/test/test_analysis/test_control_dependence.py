@@ -0,0 +1,110 @@
+import unittest
+import sys
+sys.path.insert(0, 'src/py') # hack for now
+
+import ast
+from ast_utils.utils import *
+from ast_utils.preprocess import *
+from ast_utils.scoped_tree import get_scoped_tree
+
+from analysis.data_control_flow import control_parents_for_node
+from analysis.control_dependence import get_control_dependence
+
+class TestControlDependence(unittest.TestCase):
+    def _get_scoped_tree(self, source_code):
+        parsed_ast = ast.parse(source_code)
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(parsed_ast, source_code, line_offsets, 0)
+        return syntax_tree, get_scoped_tree(syntax_tree)
+
+    def test_break_and_continue(self):
+        source_code = """
+x = 0
+while x < 10:
+    if x > 5:
+        break
+    y = x
+    if y > 2:
+        continue
+    x = x + 1
+w = 1
+        """
+        syntax_tree, scoped_tree = self._get_scoped_tree(source_code)
+        _, while_stmt, w_ass = syntax_tree.root_node.body
+        if_break, y_ass, if_continue, x_inc = while_stmt.body
+
+        self.assertEqual(control_parents_for_node(scoped_tree, y_ass), {while_stmt, if_break})
+        self.assertEqual(control_parents_for_node(scoped_tree, x_inc), {while_stmt, if_break, if_continue})
+        # loop test is control dependent on itself, continue does not skip the loop test
+        self.assertEqual(control_parents_for_node(scoped_tree, while_stmt.test), {while_stmt, if_break})
+        self.assertEqual(control_parents_for_node(scoped_tree, w_ass), set())
+
+    def test_early_return(self):
+        source_code = """
+def f(a):
+    if a > 0:
+        return 1
+    b = 2
+    if b > a:
+        c = 3
+    return c
+        """
+        syntax_tree, scoped_tree = self._get_scoped_tree(source_code)
+        func = syntax_tree.root_node.body[0]
+        if_return, b_ass, if_stmt, _ = func.body
+        c_ass = if_stmt.body[0]
+
+        self.assertEqual(control_parents_for_node(scoped_tree, b_ass), {if_return})
+        self.assertEqual(control_parents_for_node(scoped_tree, c_ass), {if_return, if_stmt})
+        # return value depends on early return
+        self.assertEqual(control_parents_for_node(scoped_tree, func), {if_return})
+
+    def test_function_ends_with_loop(self):
+        source_code = """
+def f(a):
+    for i in range(a):
+        x = i
+def g(a):
+    if a > 1:
+        return 1
+    while a > 0:
+        for j in range(a):
+            a = a - j
+def h(a):
+    if a:
+        x = 1
+        """
+        syntax_tree, scoped_tree = self._get_scoped_tree(source_code)
+        f, g, h = syntax_tree.root_node.body
+        if_return, while_stmt = g.body
+
+        # like the path search before post-dominator trees, the function depends on the loop that ends it
+        self.assertEqual(control_parents_for_node(scoped_tree, f), {f.body[0]})
+        self.assertEqual(control_parents_for_node(scoped_tree, g), {if_return, while_stmt})
+        self.assertEqual(control_parents_for_node(scoped_tree, h), {h.body[0]})
+
+    def test_post_dominators(self):
+        source_code = """
+x = 1
+if x > 0:
+    y = 1
+else:
+    y = 2
+z = y
+        """
+        syntax_tree, scoped_tree = self._get_scoped_tree(source_code)
+        x_ass, if_stmt, z_ass = syntax_tree.root_node.body
+        _, x_cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(x_ass)
+        _, branch_cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(if_stmt.test)
+        _, y_cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(if_stmt.body[0])
+        control_dependence = get_control_dependence(scoped_tree, x_cfgnode)
+        join_cfgnode = branch_cfgnode.join_node
+
+        # node indices of CompactCFG
+        self.assertEqual(control_dependence.ipdom[x_cfgnode.index], branch_cfgnode.index)
+        self.assertEqual(control_dependence.ipdom[branch_cfgnode.index], join_cfgnode.index)
+        self.assertEqual(control_dependence.dependencies[y_cfgnode.index], {branch_cfgnode.index})
+        self.assertEqual(control_dependence.dependencies[join_cfgnode.index], set())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -329,3 +329,114 @@ test(arg_a, b=arg_b2)
 
         data_deps = data_deps_for_node(scoped_tree, b)
         self.assertTrue({ast.unparse(n) for n in data_deps} == set(['arg_b = 1', 'arg_b2 = 2']))
+
+    def test_shared_cache(self):
+        source_code = """
+def test(a, b=1):
+    if a > 0:
+        c = b
+    else:
+        c = a
+    return c
+
+arg_a = 1
+arg_b = 2
+for i in range(3):
+    x = test(arg_a, arg_b)
+    y = test(x, b=i)
+        """
+        parsed_ast = ast.parse(source_code)
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(parsed_ast, source_code, line_offsets, 0, uniquify_calls=False)
+        scoped_tree = get_scoped_tree(syntax_tree)
+
+        test_f = scoped_tree.root_node.body[0]
+        loop = scoped_tree.root_node.body[3]
+        nodes = [test_f, test_f.args, *test_f.args.args, test_f.body[0].test, *test_f.body[0].body, *loop.body, test_f.body[0].test]
+
+        cache = DependencyCache()
+        for node in nodes:
+            self.assertEqual(data_deps_for_node(scoped_tree, node, cache), data_deps_for_node(scoped_tree, node))
+            self.assertEqual(control_parents_for_node(scoped_tree, node, cache), control_parents_for_node(scoped_tree, node))
+
+    def test_dependency_closure(self):
+        source_code = """
+a = 1
+b = a
+if b > 0:
+    c = 2
+else:
+    c = 3
+d = c
+        """
+        parsed_ast = ast.parse(source_code)
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(parsed_ast, source_code, line_offsets, 0)
+        scoped_tree = get_scoped_tree(syntax_tree)
+
+        a_ass, b_ass, if_stmt, d_ass = syntax_tree.root_node.body
+
+        # stop at b, continue at its value
+        reached, control_reached, traversed = dependency_closure(scoped_tree, [d_ass], {b_ass: b_ass.value})
+        self.assertEqual(reached, [b_ass])
+        self.assertEqual(control_reached, [b_ass])
+        self.assertTrue(a_ass in traversed and if_stmt.test in traversed)
+
+        # b is only reached via control dependency
+        reached, control_reached, _ = dependency_closure(scoped_tree, [d_ass], {b_ass: None}, follow_control=False)
+        self.assertEqual((reached, control_reached), ([], []))
+
+        reached, control_reached, traversed = dependency_closure(scoped_tree, [d_ass], {a_ass: None, b_ass: None}, is_control=True)
+        self.assertEqual((reached, control_reached), ([b_ass], [b_ass]))
+        self.assertFalse(a_ass in traversed)
+
+    def test_dependency_closure_summarize_calls(self):
+        source_code = """
+def f(x):
+    if x > 0:
+        return x
+    return 0
+def g(n, y):
+    if n > 0:
+        return g(n - 1, y)
+    return f(y)
+a = 1
+b = 2
+c = f(a)
+d = f(b)
+e = g(a, b)
+        """
+        parsed_ast = ast.parse(source_code)
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(parsed_ast, source_code, line_offsets, 0, uniquify_calls=False)
+        scoped_tree = get_scoped_tree(syntax_tree)
+
+        _, _, a_ass, b_ass, c_ass, d_ass, e_ass = syntax_tree.root_node.body
+        stop_nodes = {a_ass: None, b_ass: None}
+
+        # without summaries, the parameter x of f depends on the arguments of all calls
+        reached, _, _ = dependency_closure(scoped_tree, [d_ass], stop_nodes)
+        self.assertEqual(set(reached), {a_ass, b_ass})
+
+        # with summaries, only on the argument of the call d = f(b)
+        cache = DependencyCache()
+        reached, control_reached, traversed = dependency_closure(scoped_tree, [d_ass], stop_nodes, cache=cache, summarize_calls=True)
+        self.assertEqual((reached, control_reached), ([b_ass], [b_ass]))
+        self.assertFalse(c_ass in traversed)
+
+        reached, control_reached, _ = dependency_closure(scoped_tree, [c_ass], stop_nodes, cache=cache, summarize_calls=True)
+        self.assertEqual((reached, control_reached), ([a_ass], [a_ass]))
+
+        # recursive call: y flows to f through all recursive calls
+        reached, control_reached, _ = dependency_closure(scoped_tree, [e_ass], stop_nodes, cache=cache, summarize_calls=True)
+        self.assertEqual(set(reached), {a_ass, b_ass})
+        self.assertEqual(set(control_reached), {a_ass, b_ass})
+        reached, control_reached, _ = dependency_closure(scoped_tree, [e_ass], {b_ass: None}, follow_control=False, cache=DependencyCache(), summarize_calls=True)
+        self.assertEqual((reached, control_reached), ([b_ass], []))
+
+        # same result as on the tree with a copy of f for each call
+        syntax_tree = preprocess_syntaxtree(ast.parse(source_code), source_code, line_offsets, 0)
+        scoped_tree = get_scoped_tree(syntax_tree)
+        *_, a_ass, b_ass, c_ass, d_ass, e_ass = syntax_tree.root_node.body
+        reached, control_reached, _ = dependency_closure(scoped_tree, [d_ass], {a_ass: None, b_ass: None})
+        self.assertEqual((reached, control_reached), ([b_ass], [b_ass]))
@@ -0,0 +1,106 @@
+import unittest
+import sys
+sys.path.insert(0, 'src/py') # hack for now
+
+import ast
+from ast_utils.utils import *
+from ast_utils.preprocess import *
+from ast_utils.scoped_tree import get_scoped_tree, NameFinder
+from ast_utils.cfg import *
+
+from analysis.ssa import get_ssa
+
+class TestSSA(unittest.TestCase):
+    def _get_scoped_tree(self, source_code):
+        parsed_ast = ast.parse(source_code)
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(parsed_ast, source_code, line_offsets, 0)
+        return syntax_tree, get_scoped_tree(syntax_tree)
+
+    def _get_read(self, syntaxnode, name):
+        return [identifier for identifier in NameFinder().visit(syntaxnode) if identifier.id == name][0]
+
+    def test_phi_nodes(self):
+        source_code = """
+x = 0
+if x > 1:
+    x = 1
+y = x
+while y < 10:
+    y = y + 1
+z = y
+        """
+        syntax_tree, scoped_tree = self._get_scoped_tree(source_code)
+        x_init, if_stmt, y_init, while_stmt, z_ass = syntax_tree.root_node.body
+        x_ass = if_stmt.body[0]
+        y_inc = while_stmt.body[0]
+        _, y_cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(y_init)
+        _, z_cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(z_ass)
+        _, loop_header = scoped_tree.get_cfgnode_for_syntaxnode(while_stmt.test)
+        ssa = get_ssa(scoped_tree, y_cfgnode)
+
+        # phi at join node of if statement
+        x_value = ssa.get_value(y_cfgnode, self._get_read(y_init, "x"))
+        self.assertTrue(x_value.is_phi)
+        self.assertIsInstance(x_value.cfgnode, JoinNode)
+        self.assertEqual({operand.cfgnode.syntaxnode for operand in x_value.operands}, {x_init, x_ass})
+
+        # phi at loop header
+        y_value = ssa.get_value(loop_header, self._get_read(while_stmt.test, "y"))
+        self.assertTrue(y_value.is_phi)
+        self.assertEqual(y_value.cfgnode, loop_header)
+        self.assertEqual(ssa.get_value(z_cfgnode, self._get_read(z_ass, "y")), y_value)
+        self.assertEqual({rd.syntaxnode for rd in ssa.get(z_cfgnode, self._get_read(z_ass, "y"))}, {y_init, y_inc})
+
+    def test_def_use(self):
+        source_code = """
+x = 1
+if x > 0:
+    y = x
+else:
+    y = 2
+z = y + x
+        """
+        syntax_tree, scoped_tree = self._get_scoped_tree(source_code)
+        x_ass, if_stmt, z_ass = syntax_tree.root_node.body
+        y_ass = if_stmt.body[0]
+        _, x_cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(x_ass)
+        _, y_cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(y_ass)
+        _, z_cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(z_ass)
+        _, branch_cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(if_stmt.test)
+        ssa = get_ssa(scoped_tree, x_cfgnode)
+
+        self.assertEqual(ssa.get_uses(x_cfgnode), {branch_cfgnode, y_cfgnode, z_cfgnode})
+        # through phi node at join
+        self.assertEqual(ssa.get_uses(y_cfgnode), {z_cfgnode})
+
+    def test_break_continue(self):
+        source_code = """
+def f(a):
+    c = [0, 0]
+    c[0] = a
+    for i in range(a):
+        if i > 2:
+            break
+        c[1] = c[0] + i
+        if i > 1:
+            continue
+        c[0] = 1
+    return c[0] + c[1] + i
+        """
+        syntax_tree, scoped_tree = self._get_scoped_tree(source_code)
+        func = syntax_tree.root_node.body[0]
+        c_init, c_0, for_stmt, return_stmt = func.body
+        c_1, c_0_loop = for_stmt.body[1], for_stmt.body[3]
+        _, cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(return_stmt)
+        ssa = get_ssa(scoped_tree, cfgnode)
+
+        c_0_read, c_1_read, i_read = NameFinder().visit(return_stmt.value)
+        get_defs = lambda identifier: {definition.syntaxnode for definition in ssa.get(cfgnode, identifier)}
+        # c[1] = ... does not kill definitions of c[0], definitions in the loop reach after break and continue
+        self.assertEqual(get_defs(c_0_read), {c_0, c_1, c_0_loop})
+        self.assertEqual(get_defs(c_1_read), {c_init, c_0, c_1, c_0_loop})
+        self.assertEqual(get_defs(i_read), {for_stmt.target})
+
+if __name__ == "__main__":
+    unittest.main()
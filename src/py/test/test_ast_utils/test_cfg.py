@@ -0,0 +1,89 @@
+import unittest
+import sys
+sys.path.insert(0, 'src/py') # hack for now
+
+import ast
+from ast_utils.utils import *
+from ast_utils.preprocess import *
+from ast_utils.cfg import *
+
+class TestCFG(unittest.TestCase):
+    def _get_syntax_tree(self, source_code):
+        parsed_ast = ast.parse(source_code)
+        line_offsets = get_line_offsets_for_str(source_code)
+        return preprocess_syntaxtree(parsed_ast, source_code, line_offsets, 0)
+
+    def test_node_arena(self):
+        source_code = """
+x = 1
+def f(a):
+    if a > 0:
+        for i in range(a):
+            a = a + i
+    return a
+while x < 10:
+    x = f(x)
+        """
+        syntax_tree = self._get_syntax_tree(source_code)
+        cfgs = get_cfg_representation(syntax_tree.root_node, syntax_tree.node_to_id)
+        module_cfg = cfgs[syntax_tree.root_node]
+        func_cfg = cfgs[syntax_tree.root_node.body[1]]
+
+        for cfg in (module_cfg, func_cfg):
+            self.assertTrue(verify_cfg(cfg))
+            # all nodes reachable from start node are in the node set of the cfg
+            reachable = set()
+            stack = [cfg.startnode]
+            while stack:
+                for child in stack.pop().children:
+                    if child not in reachable:
+                        reachable.add(child)
+                        stack.append(child)
+            self.assertEqual(reachable - {cfg.endnode}, cfg.nodes)
+
+        # function nodes are not in arena of module
+        self.assertEqual(module_cfg.nodes & func_cfg.nodes, set())
+        self.assertEqual(len([node for node in func_cfg.nodes if isinstance(node, BranchNode)]), 2)
+
+    def test_compact_cfg(self):
+        source_code = """
+x = 1
+while x < 10:
+    if x > 5:
+        break
+    x = x + 1
+y = x
+        """
+        syntax_tree = self._get_syntax_tree(source_code)
+        cfg = get_cfg_representation(syntax_tree.root_node, syntax_tree.node_to_id)[syntax_tree.root_node]
+        compact = get_compact_cfg(cfg)
+        self.assertIs(get_compact_cfg(cfg), compact)
+        self.assertEqual(len(compact), len(cfg.nodes) + 2)
+        self.assertEqual(compact.nodes[compact.start], cfg.startnode)
+
+        for i, node in enumerate(compact.nodes):
+            self.assertEqual(node.index, i)
+            self.assertEqual({compact.nodes[j] for j in compact.get_successors(i)}, node.children)
+            self.assertEqual({compact.nodes[j] for j in compact.get_predecessors(i)}, node.parents)
+
+        _, while_stmt, y_ass = syntax_tree.root_node.body
+        branch = [node for node in cfg.nodes if isinstance(node, BranchNode) and node.syntaxnode == while_stmt.test][0]
+        x_inc = [node for node in cfg.nodes if node.syntaxnode == while_stmt.body[1]][0]
+        # loop body can reach itself
+        self.assertTrue(compact.is_reachable(x_inc.index, x_inc.index))
+        self.assertTrue(is_reachable(x_inc, x_inc))
+        self.assertFalse(compact.is_reachable(x_inc.index, x_inc.index, {branch.index}))
+        self.assertFalse(is_reachable(x_inc, x_inc, {branch}))
+
+    def test_is_supported_expression(self):
+        expr = ast.parse("f(x, [y, 1])").body[0]
+        self.assertTrue(is_supported_expression(expr))
+        self.assertTrue(expr.value.args[1].is_supported_expression)
+
+        expr = ast.parse("f(lambda x: x)").body[0]
+        self.assertFalse(is_supported_expression(expr))
+        self.assertTrue(expr.value.func.is_supported_expression)
+        self.assertFalse(expr.value.args[0].is_supported_expression)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,11 @@ from ast_utils.utils import *
 from ast_utils.preprocess import *
 from ast_utils.node_finder import NodeFinder
 from ast_utils.scoped_tree import *
+from analysis.control_dependence import get_control_dependence
+from analysis.ssa import get_ssa
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 class TestScopedTree(unittest.TestCase):
     def test_1(self):
@@ -53,3 +58,138 @@ a,b,c = 2,3,4
         self.assertEqual(len(scoped_tree.all_definitions), 5)
         self.assertTrue(scoped_tree.all_definitions[1].name.startswith('__TMP__'))
         self.assertEqual([ass.name for ass in scoped_tree.all_definitions], ['x', scoped_tree.all_definitions[1].name, 'a', 'b', 'c'])
+
+    def test_cfgnode_for_syntaxnode(self):
+        source_code = """
+x = 1
+for i in range(x):
+    y = f(x + i)
+def f(a):
+    a + 1
+        """
+        parsed_ast = ast.parse(source_code)
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(parsed_ast, source_code, line_offsets, 0)
+        scoped_tree = get_scoped_tree(syntax_tree)
+        x_ass, for_stmt, f_def = scoped_tree.root_node.body
+        y_ass = for_stmt.body[0]
+
+        cfg, cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(y_ass.value.args[0].right)
+        self.assertEqual(cfg, scoped_tree.cfgs[scoped_tree.root_node])
+        self.assertIsInstance(cfgnode, AssignNode)
+        self.assertEqual(cfgnode.syntaxnode, y_ass)
+        self.assertIsInstance(scoped_tree.get_cfgnode_for_syntaxnode(for_stmt.iter.args[0])[1], BranchNode)
+        self.assertIsInstance(scoped_tree.get_cfgnode_for_syntaxnode(for_stmt.target)[1], LoopIterNode)
+
+        # expression at end of function is also return node, expression node is used
+        cfg, cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(f_def.body[0].value)
+        self.assertEqual(cfg, scoped_tree.cfgs[f_def])
+        self.assertIsInstance(cfgnode, ExprNode)
+
+        # statements with nested blocks have no cfg node
+        with self.assertRaises(Exception):
+            scoped_tree.get_cfgnode_for_syntaxnode(for_stmt)
+
+    def test_lazy_cfgs(self):
+        source_code = """
+def f(a):
+    def g(b):
+        return b
+    return g(a)
+def plot(x):
+    if x:
+        return 1
+y = f(1)
+        """
+        parsed_ast = ast.parse(source_code)
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(parsed_ast, source_code, line_offsets, 0, uniquify_calls=False)
+        scoped_tree = get_scoped_tree(syntax_tree)
+        f_def, plot_def, y_ass = scoped_tree.root_node.body
+        g_def = f_def.body[0]
+        self.assertEqual(scoped_tree.cfgs, dict())
+
+        # CFG of nested function is built on query of a node in its body, without the CFG of f that contains g
+        cfg, cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(g_def.body[0].value)
+        self.assertIsInstance(cfgnode, ReturnNode)
+        self.assertEqual(set(scoped_tree.cfgs.keys()), {g_def})
+        self.assertIs(cfg, scoped_tree.get_cfg_for_function_syntaxnode(g_def))
+        self.assertIs(scoped_tree.get_cfg_for_cfgnode(cfgnode), cfg)
+        scoped_tree.get_cfgnode_for_syntaxnode(f_def.body[1].value)
+        self.assertEqual(set(scoped_tree.cfgs.keys()), {g_def, f_def})
+
+        # the CFG of plot is never built, its parameters are outside of its body and have no CFG node
+        scoped_tree.get_cfgnode_for_syntaxnode(y_ass.value)
+        self.assertEqual(set(scoped_tree.cfgs.keys()), {g_def, f_def, scoped_tree.root_node})
+        with self.assertRaises(Exception):
+            scoped_tree.get_cfgnode_for_syntaxnode(plot_def.args.args[0])
+        self.assertFalse(plot_def in scoped_tree.cfgs)
+
+        # same CFGs as if all are built at once
+        cfgs = get_cfg_representation(syntax_tree.root_node, syntax_tree.node_to_id)
+        scoped_tree.get_cfg_for_function_syntaxnode(plot_def)
+        self.assertEqual(cfgs.keys(), scoped_tree.cfgs.keys())
+        for node, cfg in cfgs.items():
+            get_nodes = lambda cfg: {(type(cfgnode), cfgnode.id, cfgnode.syntaxnode) for cfgnode in cfg.nodes}
+            self.assertEqual(get_nodes(cfg), get_nodes(scoped_tree.cfgs[node]))
+
+    def test_concurrent_queries(self):
+        source_code = "x = 0\n" + "".join(f"""
+for i{k} in range(x):
+    if i{k} > 1:
+        x = x + i{k}
+""" for k in range(50)) + "y = x\n"
+        parsed_ast = ast.parse(source_code)
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(parsed_ast, source_code, line_offsets, 0)
+        scoped_tree = get_scoped_tree(syntax_tree)
+        y_ass = scoped_tree.root_node.body[-1]
+
+        # CFG and analyses are computed once, all threads get the same objects
+        n_threads = 8
+        barrier = threading.Barrier(n_threads)
+        def query(_):
+            barrier.wait()
+            _, cfgnode = scoped_tree.get_cfgnode_for_syntaxnode(y_ass.value)
+            return cfgnode, get_control_dependence(scoped_tree, cfgnode), get_ssa(scoped_tree, cfgnode)
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            results = list(executor.map(query, range(n_threads)))
+        for result in results:
+            for computed, expected in zip(result, results[0]):
+                self.assertIs(computed, expected)
+        self.assertEqual(len(scoped_tree.ssa), 1)
+        self.assertEqual(len(scoped_tree.control_dependence), 1)
+
+    def test_symbol_ids(self):
+        source_code = """
+x = [1, 2]
+def f(x):
+    x = x + 1
+    return x
+x[0] = f(x[1])
+y = x
+        """
+        parsed_ast = ast.parse(source_code)
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(parsed_ast, source_code, line_offsets, 0)
+        scoped_tree = get_scoped_tree(syntax_tree)
+        x_ass, f_def, x_el_ass, y_ass = scoped_tree.root_node.body
+        f_arg = f_def.args.args[0]
+        f_x_ass = f_def.body[0]
+        global_x = x_ass.targets[0]
+        local_x = f_x_ass.targets[0]
+
+        self.assertEqual(scoped_tree.symbols[scoped_tree.get_symbol_id(global_x)], ("x", scoped_tree.scope_info.global_scope))
+        self.assertTrue(scoped_tree.identifieres_are_the_same(global_x, y_ass.value))
+        self.assertTrue(scoped_tree.identifieres_are_the_same(local_x, f_arg))
+        self.assertFalse(scoped_tree.identifieres_are_the_same(global_x, local_x))
+        self.assertTrue(scoped_tree.identifieres_are_the_same(f_def, x_el_ass.value.func))
+        self.assertFalse(scoped_tree.identifieres_are_the_same(f_def, ast.Attribute(value=f_def, attr="f")))
+        self.assertEqual(scoped_tree.function_for_symbol[scoped_tree.get_symbol_id(x_el_ass.value.func)].node, f_def)
+
+        # global x is used as x[...], local x is not
+        self.assertTrue(scoped_tree.is_container_variable(y_ass.value))
+        self.assertFalse(scoped_tree.is_container_variable(f_x_ass.value.left))
+
+        with self.assertRaises(KeyError):
+            scoped_tree.get_symbol_id(ast.Name(id="x"))
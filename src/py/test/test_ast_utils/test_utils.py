@@ -4,6 +4,7 @@ sys.path.insert(0, 'src/py') # hack for now
 
 import ast
 from ast_utils.utils import *
+from ast_utils.utils import _is_descendant_by_parent
 from ast_utils.preprocess import *
 from ast_utils.node_finder import NodeFinder
 
@@ -77,6 +78,111 @@ else:
         self.assertTrue(is_in_different_branch(D,E))
         self.assertTrue(not is_in_different_branch(D,F))
 
+    def test_number_nodes(self):
+        source_code = """
+def f(x):
+    if x > 0:
+        return -x
+    return x
+y = f(1) + f(-1)
+        """
+        parsed_ast = ast.parse(source_code)
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(parsed_ast, source_code, line_offsets, 0)
+        root = syntax_tree.root_node
+        func, y_ass = root.body[0], root.body[-1]
+        self.assertTrue(is_descendant(func, func.body[0].body[0].value) and not is_descendant(y_ass, func.body[0]))
+
+        number_nodes(root)
+        nodes = [node for node in ast.walk(root) if hasattr(node, "parent")]
+        for node in nodes:
+            self.assertTrue(hasattr(node, "dfs_interval"))
+            for other in nodes:
+                self.assertEqual(is_descendant(node, other), _is_descendant_by_parent(node, other))
+
+        # nodes of different trees are never descendants
+        other_tree = preprocess_syntaxtree(ast.parse(source_code), source_code, line_offsets, 0)
+        number_nodes(other_tree.root_node)
+        self.assertFalse(is_descendant(root, other_tree.root_node.body[0]))
+
+    def test_call_index(self):
+        source_code = """
+x = f(f(1), g(2))
+y = m.f(x)
+f(m.f(f(3)))
+z = m.g(f)
+        """
+        syntax_tree = preprocess_syntaxtree(ast.parse(source_code), source_code, get_line_offsets_for_str(source_code), 0, uniquify_calls=False)
+        x_ass, y_ass, f_expr, z_ass = syntax_tree.root_node.body
+        call_index = syntax_tree.get_call_index()
+        self.assertIs(syntax_tree.get_call_index(), call_index)
+
+        f_calls = [x_ass.value, x_ass.value.args[0], y_ass.value, f_expr.value, f_expr.value.args[0], f_expr.value.args[0].args[0]]
+        self.assertEqual(call_index.get_calls("f"), f_calls)
+        self.assertEqual(call_index.get_calls("g"), [x_ass.value.args[1], z_ass.value])
+        self.assertEqual(call_index.get_call_assignments({"f", "g"}), [x_ass, y_ass, z_ass])
+
+        # same result as NodeFinder, which does not visit calls in found calls
+        is_name_call = lambda node: isinstance(node.func, ast.Name)
+        node_finder = NodeFinder(lambda node: isinstance(node, ast.Call) and get_call_name(node) == "f" and is_name_call(node), lambda node: node)
+        self.assertEqual(call_index.find_calls("f", is_name_call), node_finder.visit(syntax_tree.root_node))
+        self.assertEqual(call_index.find_calls("f", is_name_call), [x_ass.value, f_expr.value])
+
+    def test_preprocess_shares_no_nodes(self):
+        source_code = """
+def f(x):
+    a, b = x
+    for i in range(2):
+        a = a + b if not a < b else a - b
+    return a and b
+y = f(1) + f(-1)
+        """
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(ast.parse(source_code), source_code, line_offsets, 2)
+        other_tree = preprocess_syntaxtree(ast.parse(source_code), source_code, line_offsets, 2)
+
+        # contexts and operators of ast.parse are copied, no node is shared between trees
+        self.assertEqual(set(map(id, ast.walk(syntax_tree.root_node))) & set(map(id, ast.walk(other_tree.root_node))), set())
+        # but shared in the tree like in a deepcopy of the tree
+        loads = {id(node) for node in ast.walk(syntax_tree.root_node) if isinstance(node, ast.Load)}
+        self.assertTrue(len(loads) < len([node for node in ast.walk(syntax_tree.root_node) if isinstance(node, ast.Load)]))
+
+        # node ids of the fused traversal are the same as those of a separate traversal
+        node_id_assigner = NodeIdAssigner()
+        node_id_assigner.visit(syntax_tree.root_node)
+        self.assertEqual(node_id_assigner.node_to_id, syntax_tree.node_to_id)
+        self.assertEqual(node_id_assigner.id_to_node, syntax_tree.id_to_node)
+
+    def test_loop_unroller(self):
+        source_code = """
+x = 0
+for i in range(3):
+    x = x + i
+for j in range(1000):
+    x = x + j
+        """
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(ast.parse(source_code), source_code, line_offsets, 2, max_unrolled_iterations=100)
+        _, *unrolled, loop = syntax_tree.root_node.body
+        self.assertTrue(len(unrolled) == 3 and all(isinstance(block, Block) for block in unrolled))
+        self.assertEqual([block[0].value.right.value for block in unrolled], [0, 1, 2])
+        # large loop is kept
+        self.assertTrue(isinstance(loop, ast.For) and isinstance(loop.body[0].value.right, ast.Name))
+
+        syntax_tree = preprocess_syntaxtree(ast.parse(source_code), source_code, line_offsets, 2, max_unrolled_iterations=1000)
+        self.assertEqual(len(syntax_tree.root_node.body), 1 + 3 + 1000)
+
+        # loops over non-constant ranges are unrolled n_unroll_loops times regardless of the limit
+        source_code = """
+n = 5
+x = 0
+for i in range(n):
+    x = x + i
+        """
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(ast.parse(source_code), source_code, line_offsets, 3, max_unrolled_iterations=2)
+        self.assertEqual(len(syntax_tree.root_node.body), 2 + 3)
+
 #     def test_get_subnode_for_range(self):
 #         source_code = """
 # 1
@@ -0,0 +1,144 @@
+import unittest
+import sys
+sys.path.insert(0, 'src/py') # hack for now
+
+import collections
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from jsonrpc import Dispatcher
+from jsonrpc_server import run_server, read_transport_layer, write_transport_layer, _SESSION
+import server_interface
+
+class Client:
+    def __init__(self, socket_name):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_name)
+        self.reader = self.sock.makefile(mode='rb')
+        self.writer = self.sock.makefile(mode='wb')
+        self.n_requests = 0
+
+    def make_request(self, method, **params):
+        self.n_requests += 1
+        return {"jsonrpc": "2.0", "method": method, "params": params, "id": self.n_requests}
+
+    def send(self, method, **params):
+        write_transport_layer(self.writer, json.dumps(self.make_request(method, **params)))
+
+    def send_batch(self, requests):
+        write_transport_layer(self.writer, json.dumps(requests))
+
+    def receive(self):
+        return json.loads(read_transport_layer(self.reader))
+
+    def request(self, method, **params):
+        self.send(method, **params)
+        return self.receive()["result"]
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+        self.sock.close()
+
+def wait_for(predicate, timeout=5.):
+    start = time.time()
+    while not predicate() and time.time() - start < timeout:
+        time.sleep(0.01)
+    return predicate()
+
+class TestJSONRPCServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.socket_name = os.path.join(cls.tmp_dir.name, "rpc_socket")
+        cls.events = collections.defaultdict(threading.Event)
+
+        def build(name):
+            # stores a dummy tree in session
+            _SESSION[name] = (None, name)
+            return name
+        def get(name):
+            return _SESSION[name][1]
+        def block(event):
+            return cls.events[event].wait(5.)
+
+        def syntax_node(node_id):
+            return server_interface.SyntaxNode(node_id, 0, 1, "x")
+
+        dispatcher = Dispatcher()
+        dispatcher["build"] = build
+        dispatcher["get"] = get
+        dispatcher["block"] = block
+        dispatcher["syntax_node"] = syntax_node
+        cls.server = threading.Thread(target=run_server, args=(cls.socket_name, dispatcher), daemon=True)
+        cls.server.start()
+        assert wait_for(lambda: os.path.exists(cls.socket_name))
+
+    @classmethod
+    def tearDownClass(cls):
+        for event in cls.events.values():
+            event.set()
+
+    def test_concurrent_clients(self):
+        # a blocked client does not prevent other clients from being served
+        blocked_client = Client(self.socket_name)
+        blocked_client.send("block", event="concurrent")
+
+        client = Client(self.socket_name)
+        self.assertEqual(client.request("build", name="tree_1"), "tree_1")
+        self.assertEqual(client.request("get", name="tree_1"), "tree_1")
+        client.close()
+
+        self.events["concurrent"].set()
+        self.assertTrue(blocked_client.receive()["result"])
+        blocked_client.close()
+
+    def test_pipelined_requests(self):
+        # requests on one connection are answered as soon as they are finished
+        client = Client(self.socket_name)
+        client.send("block", event="pipelined") # id 1
+        client.send("build", name="tree_2")     # id 2
+        response = client.receive()
+        self.assertEqual(response["id"], 2)
+        self.assertEqual(response["result"], "tree_2")
+
+        self.events["pipelined"].set()
+        response = client.receive()
+        self.assertEqual(response["id"], 1)
+        self.assertTrue(response["result"])
+        client.close()
+
+    def test_session_outlives_client(self):
+        client_1 = Client(self.socket_name)
+        client_2 = Client(self.socket_name)
+        client_1.request("build", name="tree_a")
+        client_2.request("build", name="tree_b")
+
+        # trees are shared between clients
+        self.assertEqual(client_2.request("get", name="tree_a"), "tree_a")
+
+        # disconnecting does not remove trees
+        client_1.close()
+        client_3 = Client(self.socket_name)
+        self.assertEqual(client_3.request("get", name="tree_a"), "tree_a")
+        self.assertEqual(client_2.request("get", name="tree_b"), "tree_b")
+        client_2.close()
+        client_3.close()
+
+    def test_batch_request(self):
+        client = Client(self.socket_name)
+        client.send_batch([
+            client.make_request("syntax_node", node_id="node_1"),
+            client.make_request("unknown_method"),
+            client.make_request("syntax_node", node_id="node_2"),
+        ])
+        responses = client.receive()
+        self.assertEqual(len(responses), 3)
+        responses = {response["id"]: response for response in responses}
+        self.assertEqual(responses[1]["result"], {"node_id": "node_1", "first_byte": 0, "last_byte": 1, "source_text": "x"})
+        self.assertEqual(responses[2]["error"]["code"], -32601) # method not found
+        self.assertEqual(responses[3]["result"]["node_id"], "node_2")
+        client.close()
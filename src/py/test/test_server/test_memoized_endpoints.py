@@ -0,0 +1,89 @@
+import unittest
+import sys
+sys.path.insert(0, 'src/py') # hack for now
+
+import os
+import tempfile
+import server
+from jsonrpc_server import _SESSION
+
+class TestMemoizedEndpoints(unittest.TestCase):
+    def setUp(self):
+        server.LOGGING = False
+        _SESSION.clear()
+        fd, self.path = tempfile.mkstemp(suffix=".py")
+        with os.fdopen(fd, "w") as f:
+            f.write("""
+import pyro
+
+def model():
+    A = pyro.sample("A", dist.Normal(0., 1.))
+    for i in range(3):
+        B = pyro.sample(f"B_{i}", dist.Normal(A, 1.))
+""")
+
+    def tearDown(self):
+        _SESSION.configure(memoize_results=True)
+        _SESSION.clear()
+        os.remove(self.path)
+
+    def test_repeated_queries(self):
+        tree_id = server.build_ast(self.path, "pyro", 0)
+        rvs = server.get_random_variables(tree_id)
+        self.assertIs(server.get_random_variables(tree_id=tree_id), rvs)
+
+        node = rvs[1].node.to_dict()
+        deps = server.get_data_dependencies(tree_id, node)
+        self.assertIs(server.get_data_dependencies(tree_id, node=node), deps)
+        # bulk shares results with single queries
+        bulk = server.get_data_dependencies_bulk(tree_id, [rv.node.to_dict() for rv in rvs])
+        self.assertIs(bulk[node["node_id"]], deps)
+
+        # default parameters are part of the key
+        self.assertIs(server.get_model_graph(tree_id), server.get_model_graph(tree_id, None))
+
+        self.assertEqual(_SESSION.misses["get_random_variables"], 1)
+        self.assertEqual(_SESSION.hits["get_data_dependencies"], 2)
+
+        # unchanged file gets same tree and results
+        self.assertEqual(server.build_ast(self.path, "pyro", 0), tree_id)
+        self.assertIs(server.get_random_variables(tree_id), rvs)
+
+        # changed file gets new tree
+        with open(self.path, "a") as f:
+            f.write("\n")
+        new_tree_id = server.build_ast(self.path, "pyro", 0)
+        self.assertNotEqual(new_tree_id, tree_id)
+        self.assertIsNot(server.get_random_variables(new_tree_id), rvs)
+
+    def test_precompute(self):
+        server.PRECOMPUTE = True
+        try:
+            tree_id = server.build_ast(self.path, "pyro", 0)
+        finally:
+            server.PRECOMPUTE = False
+        # computed once, either by the precomputation or by this query that waits for it
+        rvs = server.get_random_variables(tree_id)
+        self.assertEqual(_SESSION.misses["get_random_variables"], 1)
+
+        server.start_precomputation(tree_id).result()
+        self.assertIs(server.get_random_variables(tree_id), rvs)
+        self.assertEqual(_SESSION.misses["get_model_graph"], 1)
+        # the client passes the model node
+        model_graph = server.get_model_graph(tree_id, server.get_model(tree_id).node.to_dict())
+        self.assertEqual(_SESSION.misses["get_model_graph"], 1)
+        self.assertGreater(_SESSION.hits["get_model_graph"], 0)
+        self.assertEqual(len(model_graph.random_variables), 2)
+        for rv in rvs:
+            server.get_data_dependencies(tree_id, rv.node.to_dict())
+        self.assertEqual(_SESSION.misses["get_data_dependencies"], 2)
+
+    def test_memoization_disabled(self):
+        _SESSION.configure(memoize_results=False)
+        tree_id = server.build_ast(self.path, "pyro", 0)
+        rvs = server.get_random_variables(tree_id)
+        self.assertIsNot(server.get_random_variables(tree_id), rvs)
+        self.assertEqual(server.get_random_variables(tree_id), rvs)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import sys
+sys.path.insert(0, 'src/py') # hack for now
+
+import threading
+from jsonrpc_server import Session
+
+class TestSession(unittest.TestCase):
+    def test_lookup_by_key(self):
+        session = Session()
+        key = ("model.py", "hash", "pyro", 0)
+        self.assertIsNone(session.lookup(key))
+        self.assertEqual(session.add(key, "tree_1", (None, "tree")), "tree_1")
+        self.assertEqual(session.lookup(key), "tree_1")
+        self.assertEqual(session["tree_1"], (None, "tree"))
+
+        # concurrently built tree for same key is discarded
+        self.assertEqual(session.add(key, "tree_2", (None, "other tree")), "tree_1")
+        self.assertNotIn("tree_2", session)
+
+        # changed content or options give a new tree
+        self.assertIsNone(session.lookup(("model.py", "new hash", "pyro", 0)))
+        self.assertIsNone(session.lookup(("model.py", "hash", "pyro", 3)))
+
+    def test_lru_eviction(self):
+        session = Session(max_trees=2)
+        session.add("a", "tree_a", (None, "a"))
+        session.add("b", "tree_b", (None, "b"))
+        session["tree_a"] # tree_b is now least recently used
+        session.add("c", "tree_c", (None, "c"))
+        self.assertIn("tree_a", session)
+        self.assertNotIn("tree_b", session)
+        self.assertIn("tree_c", session)
+        self.assertIsNone(session.lookup("b"))
+        with self.assertRaises(KeyError):
+            session["tree_b"]
+
+    def test_memory_budget(self):
+        session = Session(max_memory=100)
+        session.add("a", "tree_a", (None, "a"), size=40)
+        session.add("b", "tree_b", (None, "b"), size=40)
+        session.add("c", "tree_c", (None, "c"), size=40)
+        self.assertEqual(len(session), 2)
+        self.assertNotIn("tree_a", session)
+        self.assertEqual(session.memory, 80)
+
+        # the newest tree is kept even if it exceeds the budget on its own
+        session.add("d", "tree_d", (None, "d"), size=200)
+        self.assertEqual(len(session), 1)
+        self.assertIn("tree_d", session)
+
+    def test_ttl_eviction(self):
+        now = [0.]
+        session = Session(ttl=5., clock=lambda: now[0])
+        session.add("a", "tree_a", (None, "a"))
+        session.add("b", "tree_b", (None, "b"))
+        now[0] = 3.
+        session["tree_b"]
+        self.assertIn("tree_a", session)
+        now[0] = 6.
+        self.assertIsNone(session.lookup("a"))
+        self.assertNotIn("tree_a", session)
+        self.assertEqual(session.lookup("b"), "tree_b")
+
+    def test_memoize_results(self):
+        session = Session()
+        session.add("a", "tree_a", (None, "a"))
+        calls = []
+        def compute():
+            calls.append(1)
+            return [len(calls)]
+
+        result = session.memoize("tree_a", ("endpoint", "node_1"), compute)
+        self.assertIs(session.memoize("tree_a", ("endpoint", "node_1"), compute), result)
+        self.assertEqual(len(calls), 1)
+        session.memoize("tree_a", ("endpoint", "node_2"), compute)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((session.hits["endpoint"], session.misses["endpoint"]), (1, 2))
+
+        session.invalidate_results("tree_a")
+        self.assertIsNot(session.memoize("tree_a", ("endpoint", "node_1"), compute), result)
+
+        # results are dropped with their tree
+        with self.assertRaises(KeyError):
+            session.memoize("tree_b", ("endpoint", "node_1"), compute)
+
+    def test_memoize_pending_result(self):
+        session = Session()
+        session.add("a", "tree_a", (None, "a"))
+        started, finish = threading.Event(), threading.Event()
+        calls = []
+        def compute():
+            calls.append(1)
+            started.set()
+            finish.wait(5.)
+            return [len(calls)]
+
+        results = []
+        computing = threading.Thread(target=lambda: results.append(session.memoize("tree_a", ("endpoint",), compute)))
+        computing.start()
+        self.assertTrue(started.wait(5.))
+        # concurrent request waits for the pending result
+        waiting = threading.Thread(target=lambda: results.append(session.memoize("tree_a", ("endpoint",), compute)))
+        waiting.start()
+        finish.set()
+        computing.join()
+        waiting.join()
+        self.assertEqual(len(calls), 1)
+        self.assertIs(results[0], results[1])
+        self.assertEqual((session.hits["endpoint"], session.misses["endpoint"]), (1, 1))
+
+        # exceptions are not memoised
+        def fail():
+            calls.append(1)
+            raise ValueError()
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                session.memoize("tree_a", ("failing endpoint",), fail)
+        self.assertEqual(len(calls), 3)
+
+    def test_memoize_disabled(self):
+        session = Session()
+        session.add("a", "tree_a", (None, "a"))
+        session.memoize("tree_a", ("endpoint",), list)
+        session.configure(memoize_results=False)
+        self.assertEqual(len(session.trees["tree_a"].results), 0)
+        result = session.memoize("tree_a", ("endpoint",), list)
+        self.assertIsNot(session.memoize("tree_a", ("endpoint",), list), result)
+        self.assertEqual(session.hits["endpoint"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import sys
+sys.path.insert(0, 'src/py') # hack for now
+
+import ast
+import os
+import tempfile
+from ast_utils.utils import *
+from ast_utils.preprocess import *
+from ast_utils.scoped_tree import get_scoped_tree
+from analysis.data_control_flow import data_deps_for_node, control_parents_for_node
+from tree_cache import TreeCache
+
+class TestTreeCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = TreeCache(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _get_scoped_tree(self, source_code):
+        parsed_ast = ast.parse(source_code)
+        line_offsets = get_line_offsets_for_str(source_code)
+        syntax_tree = preprocess_syntaxtree(parsed_ast, source_code, line_offsets, 0)
+        return get_scoped_tree(syntax_tree)
+
+    def test_store_and_load(self):
+        source_code = """
+def f(a):
+    if a > 0:
+        b = a
+    else:
+        b = -a
+    return b
+
+x = 1
+for i in range(10):
+    x = x + f(i)
+y = x
+        """
+        scoped_tree = self._get_scoped_tree(source_code)
+        key = self.cache.get_key(source_code, "pyro", 0)
+        self.assertIsNone(self.cache.load(key))
+        self.cache.store(key, scoped_tree)
+        loaded_tree = self.cache.load(key)
+        self.assertIsNotNone(loaded_tree)
+
+        self.assertEqual(set(loaded_tree.syntax_tree.id_to_node.keys()), set(scoped_tree.syntax_tree.id_to_node.keys()))
+        self.assertEqual(ast.unparse(loaded_tree.root_node), ast.unparse(scoped_tree.root_node))
+
+        for node_id, node in scoped_tree.syntax_tree.id_to_node.items():
+            if not isinstance(node, ast.Assign):
+                continue
+            loaded_node = loaded_tree.get_node_for_id(node_id)
+            get_ids = lambda tree, nodes: {tree.get_id_for_node(n) for n in nodes}
+            self.assertEqual(
+                get_ids(loaded_tree, data_deps_for_node(loaded_tree, loaded_node)),
+                get_ids(scoped_tree, data_deps_for_node(scoped_tree, node))
+            )
+            self.assertEqual(
+                get_ids(loaded_tree, control_parents_for_node(loaded_tree, loaded_node)),
+                get_ids(scoped_tree, control_parents_for_node(scoped_tree, node))
+            )
+
+    def test_key(self):
+        key = self.cache.get_key("x = 1", "pyro", 0)
+        self.assertEqual(key, self.cache.get_key("x = 1", "pyro", 0))
+        self.assertNotEqual(key, self.cache.get_key("x = 2", "pyro", 0))
+        self.assertNotEqual(key, self.cache.get_key("x = 1", "pymc", 0))
+        self.assertNotEqual(key, self.cache.get_key("x = 1", "pyro", 1))
+        self.assertNotEqual(key, self.cache.get_key("x = 1", "pyro", 0, max_unrolled_iterations=1000))
+
+    def test_corrupted_entry(self):
+        key = self.cache.get_key("x = 1", "pyro", 0)
+        with open(os.path.join(self.tmp_dir.name, key + ".pickle"), "wb") as f:
+            f.write(b"not a pickle")
+        self.assertIsNone(self.cache.load(key))
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import glob
+import pickle
+import hashlib
+import tempfile
+from typing import Optional
+from ast_utils.scoped_tree import ScopedTree
+from ast_utils.loop_unroller import MAX_UNROLLED_ITERATIONS
+
+_SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# There is no release version of lasapp, so the version is a fingerprint of the language server source code.
+# Every code change invalidates the cached trees, which may depend on any part of the preprocessing.
+def get_lasapp_version() -> str:
+    h = hashlib.sha256()
+    for file_name in sorted(glob.glob(os.path.join(_SOURCE_DIR, "**", "*.py"), recursive=True)):
+        if os.path.join(_SOURCE_DIR, "test") in file_name:
+            continue
+        h.update(os.path.relpath(file_name, _SOURCE_DIR).encode("utf-8"))
+        with open(file_name, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+# Opt-in on-disk cache of the scoped trees built by build_ast (preprocessed syntax tree, scope info and CFGs).
+# Trees are stored with pickle in one file per key,
+# the key is computed from the file content, build options, Python version and lasapp version.
+class TreeCache:
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.version = f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}-{get_lasapp_version()}"
+
+    def get_key(self, file_content: str, ppl: str, n_unroll_loops: int, uniquify_calls: bool = True, max_unrolled_iterations: int = MAX_UNROLLED_ITERATIONS) -> str:
+        h = hashlib.sha256()
+        for part in (self.version, ppl, str(n_unroll_loops), str(uniquify_calls), str(max_unrolled_iterations), file_content):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".pickle")
+
+    def load(self, key: str) -> Optional[ScopedTree]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # e.g. truncated file, treat as cache miss
+            print(f"Could not load cached tree {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def store(self, key: str, scoped_tree: ScopedTree):
+        # write to temporary file first, such that concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(scoped_tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            print(f"Could not cache tree: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
@@ -1,6 +1,5 @@
 
 import lasapp
-from collections import deque
 from .utils import is_descendant
 
 def get_random_control_dependencies(
@@ -9,31 +8,9 @@ def get_random_control_dependencies(
         node: lasapp.SyntaxNode,
         is_control: bool = False # flags if node is already considered part of control (is control_node)
     ):
-    rv_control_deps = []
-    marked = set()
-    queue = deque([(node, is_control)])
-
-    while len(queue) > 0:
-        node, is_control = queue.popleft()
-
-        data_deps = program.get_data_dependencies(node)
-
-        for dep in data_deps:
-            if (dep.node_id, is_control) not in marked:
-                marked.add((dep.node_id, is_control))
-                if dep.node_id in random_variables:
-                    dep_rv = random_variables[dep.node_id]
-                    if is_control:
-                        rv_control_deps.append(dep_rv)
-                    queue.append((dep_rv.address_node, is_control))
-                    marked.add((dep_rv.address_node.node_id, is_control))
-                else:
-                    queue.append((dep, is_control))
-        
-        for dep in program.get_control_dependencies(node):
-            if (dep.control_node.node_id, is_control) not in marked:
-                queue.append((dep.control_node, True))
-                marked.add((dep.control_node.node_id, True))
+    stop_nodes = [(rv.node, rv.address_node) for rv in random_variables.values()]
+    closure = program.get_dependency_closure([node], stop_nodes, True, is_control)
+    rv_control_deps = [random_variables[dep.node_id] for dep in closure.control_stop_nodes]
 
     return rv_control_deps
 
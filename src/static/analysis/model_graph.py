@@ -1,5 +1,4 @@
 
-from collections import deque
 import graphviz
 import lasapp
 from .utils import is_descendant
@@ -23,8 +22,21 @@ def get_guide_graph(program: lasapp.ProbabilisticProgram):
     guide = program.get_guide()
     return get_graph(program, guide)
 
-from functools import cmp_to_key
+# build ModelGraph from the response of the get_model_graph endpoint
+def to_model_graph(graph: lasapp.ModelGraph):
+    random_variables = {rv.node.node_id: rv for rv in graph.random_variables}
+    edges = [(random_variables[x], random_variables[y]) for x, y in graph.edges]
+    plates = {plate.node_id: Plate(plate.control_dependency) for plate in graph.plates}
+    for plate in graph.plates:
+        plates[plate.node_id].members.update(plate.members)
+        plates[plate.node_id].members.update(plates[nested] for nested in plate.plates)
+    return ModelGraph(random_variables, plates, edges)
+
 def get_graph(program: lasapp.ProbabilisticProgram, model):
+    if program.supports_model_graph:
+        # whole analysis runs on server
+        return to_model_graph(program.get_model_graph(model))
+
     call_graph = program.get_call_graph(model.node)
     call_graph_nodes = {n.caller for n in call_graph}
 
@@ -35,44 +47,23 @@ def get_graph(program: lasapp.ProbabilisticProgram, model):
     edges = []
     plates = {"global": Plate(None)}
 
-    for _, rv in random_variables.items():
-        marked = set()
-        # we recursively get all data and control dependencies of random variable node
-        queue = deque([rv.address_node, rv.distribution.node])
-
-        while len(queue) > 0:
-            # get next node, FIFO
-            node = queue.popleft()
-
-            # get all data dependencies
-            data_deps = program.get_data_dependencies(node)
-
-            for dep in data_deps:
-                # check if we have already processed node
-                if dep.node_id not in marked:
-                    if dep.node_id in random_variables:
-                        # if node is random variable, we do not continue recursion and add edge to graph
-                        dep_rv = random_variables[dep.node_id]
-                        edges.append((dep_rv, rv))
-
-                        queue.append(dep_rv.address_node)
-                        marked.add(dep_rv.address_node.node_id)
-                    else:
-                        queue.append(dep)
-                    marked.add(dep.node_id)
-            
-            # get all control dependencies, this are loop / if nodes
-            for dep in program.get_control_dependencies(node):
-                # get data dependencies of condition / loop variable (control subnode) of control node
-                if dep.control_node.node_id not in marked:
-                    queue.append(dep.control_node)
-                    marked.add(dep.control_node.node_id)
-                    
+    # we recursively get all data and control dependencies of random variable node,
+    # the recursion does not continue at random variables but at their address node
+    stop_nodes = [(rv.node, rv.address_node) for rv in random_variables.values()]
+    with program.batch() as batch:
+        # is_control=True: a node is visited once regardless of how it was reached
+        closures = {rv_id: batch.get_dependency_closure([rv.address_node, rv.distribution.node], stop_nodes, True, True) for rv_id, rv in random_variables.items()}
+    for rv_id, rv in random_variables.items():
+        for dep in closures[rv_id].result().stop_nodes:
+            dep_rv = random_variables[dep.node_id]
+            edges.append((dep_rv, rv))
 
     # compute plates from control_parents
+    rv_control_deps = program.get_control_dependencies_bulk([rv.node for rv in random_variables.values()])
     for _, rv in random_variables.items():
-        control_deps = program.get_control_dependencies(rv.node)
-        control_deps = sorted(control_deps, key=cmp_to_key(lambda c1, c2: is_descendant(c1.node, c2.node)))
+        control_deps = rv_control_deps[rv.node.node_id]
+        # outermost first, a control dependency starts before the ones nested in it
+        control_deps = sorted(control_deps, key=lambda dep: (dep.node.first_byte, -dep.node.last_byte))
         current_plate = plates["global"]
         for dep in control_deps:
             if dep.kind == "for":
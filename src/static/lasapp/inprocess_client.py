@@ -0,0 +1,104 @@
+import os
+import sys
+import dataclasses
+import importlib
+import threading
+from concurrent.futures import Future
+
+from . import server_interface
+from .jsonrpc_client import _Method
+
+_SERVER_PATH = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "py"))
+_IMPORT_LOCK = threading.Lock()
+_DISPATCHER = None
+
+def _is_analysis_module(name):
+    return name == "analysis" or name.startswith("analysis.")
+
+# Imports server.py from src/py and returns its endpoints.
+# src/py and src/static both have a top-level analysis package,
+# so the analysis modules of the front end are restored after the import.
+def _import_server():
+    global _DISPATCHER
+    with _IMPORT_LOCK:
+        if _DISPATCHER is None:
+            shadowed = {name: module for name, module in sys.modules.items() if _is_analysis_module(name)}
+            for name in shadowed:
+                del sys.modules[name]
+            sys.path.insert(0, _SERVER_PATH)
+            try:
+                server = importlib.import_module("server")
+            finally:
+                sys.path.remove(_SERVER_PATH)
+                for name in [name for name in sys.modules if _is_analysis_module(name)]:
+                    del sys.modules[name]
+                sys.modules.update(shadowed)
+
+            server.LOGGING = False
+            dispatcher = dict()
+            server.register_endpoints(dispatcher)
+            _DISPATCHER = dispatcher
+    return _DISPATCHER
+
+# front end passes dataclasses, endpoints expect parsed json
+def _to_params(obj):
+    if dataclasses.is_dataclass(obj):
+        return {field.name: _to_params(getattr(obj, field.name)) for field in dataclasses.fields(obj)}
+    if isinstance(obj, (list, tuple)):
+        return [_to_params(el) for el in obj]
+    if isinstance(obj, dict):
+        return {key: _to_params(value) for key, value in obj.items()}
+    return obj
+
+# endpoints return dataclasses of src/py/server_interface.py, which are converted to the front end classes of the same name
+def _to_front_end(obj):
+    if dataclasses.is_dataclass(obj):
+        cls = getattr(server_interface, type(obj).__name__)
+        return cls(**{field.name: _to_front_end(getattr(obj, field.name)) for field in dataclasses.fields(obj)})
+    if isinstance(obj, list):
+        return [_to_front_end(el) for el in obj]
+    if isinstance(obj, tuple):
+        return tuple(_to_front_end(el) for el in obj)
+    if isinstance(obj, dict):
+        return {key: _to_front_end(value) for key, value in obj.items()}
+    return obj
+
+# Calls the endpoints of the Python language server directly in this process,
+# with the same interface as JSONRPC_Client but without socket and serialisation.
+# Requests are executed immediately, returned futures are already done.
+class InProcessClient():
+    def __init__(self):
+        self.dispatcher = _import_server()
+
+    def _call(self, method, params):
+        return self.dispatcher[method](**_to_params(params))
+
+    def submit_request(self, method, params, object_hook=None) -> Future:
+        future = Future()
+        try:
+            result = _to_front_end(self._call(method, params))
+            # like JSONRPC_Client, return whole response if there is no object_hook
+            future.set_result(result if object_hook is not None else {"result": result})
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def send_request(self, method, params, object_hook=None):
+        return self.submit_request(method, params, object_hook).result()
+
+    # requests are executed on submit, so a batch is the client itself
+    def batch(self):
+        return self
+
+    def send(self):
+        pass
+
+    # trees stay in the session of the server module and are evicted there
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return _Method(self.submit_request, name)
+
+def get_inprocess_client():
+    return InProcessClient()
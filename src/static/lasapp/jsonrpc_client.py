@@ -38,6 +38,8 @@ JSONRPC20Request.serialize = staticmethod(jsonrpc_serialize)
 
 import uuid
 import socket
+import threading
+from concurrent.futures import Future
 
 class _Method():
     def __init__(self, func, name):
@@ -45,57 +47,151 @@ class _Method():
         self.name = name
     
     def __call__(self, **kwargs):
+        return self.submit(**kwargs).result()
+    
+    # sends request without waiting for the response,
+    # returns future that resolves to the result of the request
+    def submit(self, **kwargs) -> Future:
         # print(self.name, kwargs)
         object_hook = kwargs.pop("object_hook", None)
-        response = self.func(self.name, kwargs)
-        if object_hook is not None:
-            if isinstance(response["result"], list):
-                return [object_hook(el) for el in response["result"]]
-            else:
-                return object_hook(response["result"])
-        return response
+        return self.func(self.name, kwargs, object_hook)
         
 
+def _process_response(response, object_hook):
+    if "error" in response:
+        raise Exception(response["error"]["message"] + ": " + str(response["error"]["data"]))
+    if object_hook is not None:
+        if isinstance(response["result"], list):
+            return [object_hook(el) for el in response["result"]]
+        else:
+            return object_hook(response["result"])
+    return response
+
+# Collects requests that are sent together as one JSON-RPC batch.
+# Futures of the requests are resolved after the batch was sent.
+class _Batch():
+    def __init__(self, client):
+        self.client = client
+        self.requests = []
+
+    def submit_request(self, method, params, object_hook=None) -> Future:
+        request = JSONRPC20Request(
+            method=method,
+            params=params,
+            _id=str(uuid.uuid4()),
+            is_notification=False
+        )
+        future = Future()
+        self.requests.append((request, future, object_hook))
+        return future
+    
+    def send(self):
+        requests, self.requests = self.requests, []
+        self.client.send_batch(requests)
+
+    def __getattr__(self, name):
+        return _Method(self.submit_request, name)
+
+# Requests are pipelined: they are written to the socket as soon as they are submitted,
+# and a receiver thread resolves the future of each request when its response (matched by id) arrives.
+# If the server does not support batch requests, requests of a batch are sent one by one.
 class JSONRPC_Client:
-    def __init__(self, sock, reader, writer):
+    def __init__(self, sock, reader, writer, supports_batch=True):
         self.sock = sock
         self.reader = reader
         self.writer = writer
+        self.supports_batch = supports_batch
+        self.write_lock = threading.Lock()
+        # pending and closed are guarded by pending_lock, such that no future is registered after the receiver has failed all pending ones
+        self.pending_lock = threading.Lock()
+        self.pending: dict[str, tuple[Future, callable]] = dict() # id -> (future, object_hook)
+        self.closed = False
+        self.receiver = threading.Thread(target=self._receive, daemon=True)
+        self.receiver.start()
 
     def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass # already disconnected
+        self.receiver.join()
         self.reader.close()
         self.writer.close()
-        # self.sock.shutdown()
         self.sock.close()
         # await self.writer.wait_closed()
 
-    def send_request(self, method, params):
+    def _receive(self):
+        try:
+            while True:
+                response = read_transport_layer(self.reader)
+                if response is None:
+                    break
+                response = JSONRPC20Response.deserialize(response)
+                responses = response if isinstance(response, list) else [response] # batch
+                for response in responses:
+                    with self.pending_lock:
+                        future, object_hook = self.pending.pop(response["id"])
+                    try:
+                        future.set_result(_process_response(response, object_hook))
+                    except Exception as e:
+                        future.set_exception(e)
+        except (OSError, ValueError):
+            pass # connection closed
+        finally:
+            with self.pending_lock:
+                self.closed = True
+                pending, self.pending = self.pending, dict()
+            for future, _ in pending.values():
+                future.set_exception(ConnectionError("Connection to language server closed."))
+
+    # registers the futures of requests before they are written, raises if the connection is closed
+    def _register(self, requests):
+        with self.pending_lock:
+            if self.closed:
+                raise ConnectionError("Connection to language server closed.")
+            for request, future, object_hook in requests:
+                self.pending[request._id] = (future, object_hook)
+
+    def submit_request(self, method, params, object_hook=None) -> Future:
         request = JSONRPC20Request(
             method=method,
             params=params,
             _id=str(uuid.uuid4()),
             is_notification=False
         )
-
-        write_transport_layer(self.writer, request.json)
-
-        response = read_transport_layer(self.reader)
-        response = JSONRPC20Response.deserialize(response)
-        if "error" in response:
-            raise Exception(response["error"]["message"] + ": " + str(response["error"]["data"]))
-        return response
+        future = Future()
+        self._register([(request, future, object_hook)])
+        with self.write_lock:
+            write_transport_layer(self.writer, request.json)
+        return future
+
+    def send_request(self, method, params, object_hook=None):
+        return self.submit_request(method, params, object_hook).result()
+    
+    def batch(self) -> _Batch:
+        return _Batch(self)
+
+    def send_batch(self, requests):
+        if len(requests) == 0:
+            return # empty batch is not a valid request
+        self._register(requests)
+        with self.write_lock:
+            if self.supports_batch:
+                write_transport_layer(self.writer, jsonrpc_serialize([request.data for request, _, _ in requests]))
+            else:
+                for request, _, _ in requests:
+                    write_transport_layer(self.writer, request.json)
     
     def __getattr__(self, name):
-        return _Method(self.send_request, name)
+        return _Method(self.submit_request, name)
 
 
 
-def get_jsonrpc_client(socket_name):
+def get_jsonrpc_client(socket_name, supports_batch=True):
     sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
     sock.connect(socket_name)
     reader = sock.makefile(mode='rb') # binary
     writer = sock.makefile(mode='wb') # binary
 
-    return JSONRPC_Client(sock, reader, writer)
+    return JSONRPC_Client(sock, reader, writer, supports_batch)
 
-            
\ No newline at end of file
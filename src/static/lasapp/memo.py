@@ -0,0 +1,80 @@
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Hashable
+
+@dataclass
+class MemoStatistics:
+    hits: int
+    misses: int
+
+# Memoises query results of a ProbabilisticProgram by (tree_id, node_id, method).
+# Futures are stored, such that concurrent requests for the same key are sent only once.
+# Failed requests are not memoised. Results are shared between callers and must not be mutated.
+# If not enabled, every lookup is a miss and nothing is stored.
+class QueryMemo:
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.results: dict[tuple, Future] = dict()
+        self.hits = Counter()   # method -> number of hits
+        self.misses = Counter() # method -> number of misses
+
+    # returns the memoised future for key or a new placeholder future that the caller has to complete,
+    # the placeholder is stored under the same lock, such that concurrent callers that miss on key wait on it
+    def reserve(self, key: tuple) -> tuple[Future, bool]:
+        _, _, method = key
+        with self.lock:
+            future = self.results.get(key) if self.enabled else None
+            if future is not None:
+                self.hits[method] += 1
+                return future, False
+            self.misses[method] += 1
+            future = Future()
+            if self.enabled:
+                self.results[key] = future
+        future.add_done_callback(lambda f: self._discard_failed(key, f))
+        return future, True
+
+    def _discard_failed(self, key: tuple, future: Future):
+        if future.cancelled() or future.exception() is not None:
+            with self.lock:
+                if self.results.get(key) is future:
+                    del self.results[key]
+
+    def get_or_submit(self, tree_id: str, node_id: Hashable, method: Hashable, submit: Callable[[], Future]) -> Future:
+        future, is_reserved = self.reserve((tree_id, node_id, method))
+        if is_reserved:
+            try:
+                submitted = submit()
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            submitted.add_done_callback(lambda f: _chain(f, future))
+        return future
+
+    # removes results of tree_id (all if None) and, if given, only for node_id
+    def invalidate(self, tree_id: str = None, node_id: Hashable = None):
+        with self.lock:
+            for key in list(self.results.keys()):
+                if (tree_id is None or key[0] == tree_id) and (node_id is None or key[1] == node_id):
+                    del self.results[key]
+
+    def statistics(self) -> dict[Hashable, MemoStatistics]:
+        with self.lock:
+            return {method: MemoStatistics(self.hits[method], self.misses[method]) for method in self.hits.keys() | self.misses.keys()}
+
+    def reset_statistics(self):
+        with self.lock:
+            self.hits.clear()
+            self.misses.clear()
+
+# completes future with the outcome of done
+def _chain(done: Future, future: Future):
+    if done.cancelled():
+        future.cancel()
+    elif done.exception() is not None:
+        future.set_exception(done.exception())
+    else:
+        future.set_result(done.result())
@@ -1,12 +1,71 @@
 import os
+import copy
+import threading
+from concurrent.futures import Future
+from collections import deque
+from typing import Optional
+from contextlib import contextmanager
 
 from .server_interface import *
 from .jsonrpc_client import get_jsonrpc_client
+from .inprocess_client import get_inprocess_client
+from .memo import QueryMemo, MemoStatistics
 
 
+# Queries on a batch return futures instead of results.
+# All queries are sent in one JSON-RPC batch request when the batch context is left, e.g.
+# with program.batch() as batch:
+#     deps = [batch.get_data_dependencies(node) for node in nodes]
+# deps = [d.result() for d in deps]
+class ProgramBatch:
+    def __init__(self, program, client_batch):
+        self._program = copy.copy(program)
+        self._program.client = client_batch
+
+    def __getattr__(self, name):
+        if not hasattr(self._program, name + "_async"):
+            raise AttributeError(f"{name} is not supported in batch.")
+        return getattr(self._program, name + "_async")
+
+# Resolves to dict key -> result once all futures are done.
+def gather_futures(futures: dict) -> Future:
+    gathered = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            is_last = remaining[0] == 0
+        if is_last:
+            try:
+                gathered.set_result({key: future.result() for key, future in futures.items()})
+            except Exception as e:
+                gathered.set_exception(e)
+
+    if len(futures) == 0:
+        gathered.set_result(dict())
+    for future in futures.values():
+        future.add_done_callback(on_done)
+    return gathered
+
+def bulk_object_hook(object_hook):
+    return lambda result: {node_id: [object_hook(d) for d in deps] for node_id, deps in result.items()}
+
+# LASAPP_IN_PROCESS=1 runs the Python language server in-process for all programs that do not set in_process
+def in_process_default() -> bool:
+    return os.environ.get("LASAPP_IN_PROCESS", "0").lower() in ("1", "true", "yes")
+
 class ProbabilisticProgram:
-    def __init__(self, file_name: str, n_unroll_loops: int = 0, ppl=None) -> None:
+    # in_process: call endpoints of Python language server directly instead of connecting to the server process (only .py files)
+    # memoize: reuse results of queries for the same nodes, see QueryMemo
+    def __init__(self, file_name: str, n_unroll_loops: int = 0, ppl=None, in_process: Optional[bool] = None, memoize: bool = True) -> None:
         _, ext = os.path.splitext(file_name)
+        if in_process is None:
+            in_process = in_process_default() and ext == '.py'
+        if in_process and ext != '.py':
+            raise ValueError(f"In-process language server is only available for Python programs, got {ext}")
+
         if ext == '.py':
             socket_name = "./.pipe/python_rpc_socket"
         elif ext == '.jl':
@@ -31,9 +90,19 @@ class ProbabilisticProgram:
             else:
                 raise ValueError("No probabilistic framework found.")
 
-        self.client = get_jsonrpc_client(socket_name)
+        if in_process:
+            self.client = get_inprocess_client()
+        else:
+            # the JSONRPC.jl endpoint of the Julia server does not support batch requests
+            self.client = get_jsonrpc_client(socket_name, supports_batch=(ext == '.py'))
+        # bulk endpoints are only implemented by the Python server
+        self.supports_bulk = ext == '.py'
+        self.supports_model_graph = ext == '.py'
+        # the program that sends requests immediately, also for the copy of a ProgramBatch (see _get_dependency_closure_from_client)
+        self.unbatched = self
         self.file_name = file_name
         self.ppl = ppl
+        self.memo = QueryMemo(memoize)
 
 
         response = self.client.build_ast(file_name=file_name, ppl=ppl, n_unroll_loops=n_unroll_loops)
@@ -43,31 +112,203 @@ class ProbabilisticProgram:
     def close(self):
         self.client.close()
 
+    @contextmanager
+    def batch(self):
+        client_batch = self.client.batch()
+        try:
+            yield ProgramBatch(self, client_batch)
+        finally:
+            # always send, memoised futures of the batch have to be resolved
+            client_batch.send()
+
+    # hits and misses of memoised queries per method
+    def memo_statistics(self) -> dict[str, MemoStatistics]:
+        return self.memo.statistics()
+
+    # removes memoised results for node (all if None), e.g. if file was modified and tree was rebuilt
+    def invalidate(self, node: Optional[SyntaxNode] = None):
+        self.memo.invalidate(self.tree_id, node.node_id if node is not None else None)
+
+    def _memoized(self, node_id, method, submit) -> Future:
+        return self.memo.get_or_submit(self.tree_id, node_id, method, submit)
+
+    # memoises result of bulk query per node, only nodes without memoised result are requested
+    def _memoized_bulk(self, method, nodes: list[SyntaxNode], submit_bulk) -> Future:
+        futures = dict()
+        missing = dict()
+        for node in nodes:
+            if node.node_id in futures:
+                continue
+            future, is_reserved = self.memo.reserve((self.tree_id, node.node_id, method))
+            if is_reserved:
+                missing[node.node_id] = (node, future)
+            futures[node.node_id] = future
+
+        if len(missing) > 0:
+            def distribute(bulk_future):
+                for node_id, (_, future) in missing.items():
+                    try:
+                        future.set_result(bulk_future.result()[node_id])
+                    except Exception as e:
+                        future.set_exception(e)
+            try:
+                bulk_future = submit_bulk([node for node, _ in missing.values()])
+            except BaseException as e:
+                for _, future in missing.values():
+                    future.set_exception(e)
+                raise
+            bulk_future.add_done_callback(distribute)
+
+        return gather_futures(futures)
+
     def get_model(self) -> Model:
-        return self.client.get_model(
+        return self._memoized(None, "get_model", lambda: self.client.get_model.submit(
             tree_id=self.tree_id, object_hook=Model.from_dict
-        )
+        )).result()
     
     def get_guide(self) -> Model:
-        return self.client.get_guide(
+        return self._memoized(None, "get_guide", lambda: self.client.get_guide.submit(
             tree_id=self.tree_id, object_hook=Model.from_dict
-        )
+        )).result()
 
     def get_random_variables(self) -> list[RandomVariable]:
-        return self.client.get_random_variables(
+        return self._memoized(None, "get_random_variables", lambda: self.client.get_random_variables.submit(
             tree_id=self.tree_id, object_hook=RandomVariable.from_dict
-        )
+        )).result()
         
     def get_data_dependencies(self, node: SyntaxNode) -> list[SyntaxNode]:
-        return self.client.get_data_dependencies(
-            node=node, tree_id=self.tree_id, object_hook=SyntaxNode.from_dict
-        )
+        return self.get_data_dependencies_async(node).result()
 
     def get_control_dependencies(self, node: SyntaxNode) -> list[ControlDependency]:
-        return self.client.get_control_dependencies(
+        return self.get_control_dependencies_async(node).result()
+    
+    # The async versions return immediately, such that many requests can be in flight at the same time.
+    def get_data_dependencies_async(self, node: SyntaxNode) -> Future: # Future[list[SyntaxNode]]
+        return self._memoized(node.node_id, "get_data_dependencies", lambda: self.client.get_data_dependencies.submit(
+            node=node, tree_id=self.tree_id, object_hook=SyntaxNode.from_dict
+        ))
+
+    def get_control_dependencies_async(self, node: SyntaxNode) -> Future: # Future[list[ControlDependency]]
+        return self._memoized(node.node_id, "get_control_dependencies", lambda: self.client.get_control_dependencies.submit(
             node=node, tree_id=self.tree_id, object_hook=ControlDependency.from_dict
-        )
+        ))
     
+    # Dependencies of many nodes in one request, mapping node_id to dependencies.
+    def get_data_dependencies_bulk(self, nodes: list[SyntaxNode]) -> dict[str, list[SyntaxNode]]:
+        return self.get_data_dependencies_bulk_async(nodes).result()
+
+    def get_control_dependencies_bulk(self, nodes: list[SyntaxNode]) -> dict[str, list[ControlDependency]]:
+        return self.get_control_dependencies_bulk_async(nodes).result()
+
+    # memoised per node, shared with get_data_dependencies
+    def get_data_dependencies_bulk_async(self, nodes: list[SyntaxNode]) -> Future: # Future[dict[str, list[SyntaxNode]]]
+        def submit_bulk(nodes):
+            if not self.supports_bulk:
+                return gather_futures({node.node_id: self.client.get_data_dependencies.submit(
+                    node=node, tree_id=self.tree_id, object_hook=SyntaxNode.from_dict
+                ) for node in nodes})
+            return self.client.get_data_dependencies_bulk.submit(
+                nodes=nodes, tree_id=self.tree_id, object_hook=bulk_object_hook(SyntaxNode.from_dict)
+            )
+        return self._memoized_bulk("get_data_dependencies", nodes, submit_bulk)
+
+    # memoised per node, shared with get_control_dependencies
+    def get_control_dependencies_bulk_async(self, nodes: list[SyntaxNode]) -> Future: # Future[dict[str, list[ControlDependency]]]
+        def submit_bulk(nodes):
+            if not self.supports_bulk:
+                return gather_futures({node.node_id: self.client.get_control_dependencies.submit(
+                    node=node, tree_id=self.tree_id, object_hook=ControlDependency.from_dict
+                ) for node in nodes})
+            return self.client.get_control_dependencies_bulk.submit(
+                nodes=nodes, tree_id=self.tree_id, object_hook=bulk_object_hook(ControlDependency.from_dict)
+            )
+        return self._memoized_bulk("get_control_dependencies", nodes, submit_bulk)
+
+    # Transitive data and control dependencies of nodes, computed by the server in one request.
+    # Reaching a node of stop_nodes continues the traversal at the paired node (or not at all if it is None).
+    # Nodes are visited with a control flag that is set after following a control dependency (or from the start if is_control),
+    # control_stop_nodes holds the stop nodes that were reached with this flag set.
+    def get_dependency_closure(self, nodes: list[SyntaxNode], stop_nodes: list[tuple[SyntaxNode, Optional[SyntaxNode]]],
+                               follow_control: bool = True, is_control: bool = False) -> DependencyClosure:
+        return self.get_dependency_closure_async(nodes, stop_nodes, follow_control, is_control).result()
+
+    def get_dependency_closure_async(self, nodes: list[SyntaxNode], stop_nodes: list[tuple[SyntaxNode, Optional[SyntaxNode]]],
+                                     follow_control: bool = True, is_control: bool = False) -> Future: # Future[DependencyClosure]
+        def submit():
+            if not self.supports_bulk:
+                future = Future()
+                future.set_result(self._get_dependency_closure_from_client(nodes, stop_nodes, follow_control, is_control))
+                return future
+            return self.client.get_dependency_closure.submit(
+                tree_id=self.tree_id, nodes=nodes, stop_nodes=stop_nodes,
+                follow_control=follow_control, is_control=is_control,
+                object_hook=DependencyClosure.from_dict
+            )
+        # memoised by start nodes and all other arguments
+        key = (
+            tuple(node.node_id for node in nodes),
+            tuple((stop_node.node_id, resume_node.node_id if resume_node is not None else None) for stop_node, resume_node in stop_nodes),
+            follow_control, is_control
+        )
+        return self._memoized(key, "get_dependency_closure", submit)
+
+    # same traversal as the server, one bulk request per BFS level.
+    # Each level needs the results of the previous one, so the traversal runs on the unbatched program,
+    # a batch only sends its requests when its context is left.
+    def _get_dependency_closure_from_client(self, nodes, stop_nodes, follow_control, is_control) -> DependencyClosure:
+        stop = {stop_node.node_id: resume_node for stop_node, resume_node in stop_nodes}
+        reached = dict()
+        control_reached = []
+        traversed = dict()
+        marked = set()
+        queue = deque((node, is_control) for node in nodes)
+
+        while len(queue) > 0:
+            frontier = list(queue)
+            queue.clear()
+            with self.unbatched.batch() as batch:
+                data_deps = batch.get_data_dependencies_bulk([node for node, _ in frontier])
+                if follow_control:
+                    control_deps = batch.get_control_dependencies_bulk([node for node, _ in frontier])
+            data_deps = data_deps.result()
+            control_deps = control_deps.result() if follow_control else dict()
+
+            for node, is_control in frontier:
+                traversed.setdefault(node.node_id, node)
+
+                for dep in data_deps[node.node_id]:
+                    if (dep.node_id, is_control) not in marked:
+                        marked.add((dep.node_id, is_control))
+                        if dep.node_id in stop:
+                            reached.setdefault(dep.node_id, dep)
+                            if is_control:
+                                control_reached.append(dep)
+                            resume_node = stop[dep.node_id]
+                            if resume_node is not None:
+                                queue.append((resume_node, is_control))
+                                marked.add((resume_node.node_id, is_control))
+                        else:
+                            queue.append((dep, is_control))
+
+                for dep in control_deps.get(node.node_id, []):
+                    if (dep.control_node.node_id, is_control) not in marked:
+                        queue.append((dep.control_node, True))
+                        marked.add((dep.control_node.node_id, True))
+
+        return DependencyClosure(list(reached.values()), control_reached, list(traversed.values()))
+
+    # Random variables, their statistical dependencies and plates computed in one request.
+    # model defaults to the model of the program, pass the guide to get the guide graph.
+    def get_model_graph(self, model: Optional[Model] = None) -> ModelGraph:
+        if not self.supports_model_graph:
+            raise NotImplementedError("get_model_graph is only supported by the Python server.")
+        node = model.node if model is not None else None
+        return self._memoized(node.node_id if node is not None else None, "get_model_graph", lambda: self.client.get_model_graph.submit(
+            tree_id=self.tree_id,
+            node=node,
+            object_hook=ModelGraph.from_dict
+        )).result()
+
     def estimate_value_range(self, expr: SyntaxNode, mask: dict[SyntaxNode,Interval]) -> Interval: 
         mask = list(mask.items())
         return self.client.estimate_value_range(
@@ -78,11 +319,11 @@ class ProbabilisticProgram:
         )
     
     def get_call_graph(self, node: SyntaxNode) -> list[CallGraphNode]:
-        return self.client.get_call_graph(
+        return self._memoized(node.node_id, "get_call_graph", lambda: self.client.get_call_graph.submit(
             tree_id=self.tree_id,
             node=node,
             object_hook=CallGraphNode.from_dict
-        )
+        )).result()
     
     def get_path_condition(self, node: SyntaxNode, root: SyntaxNode, mask: dict[SyntaxNode, SymbolicExpression]) -> SymbolicExpression:
         mask = list(mask.items())
@@ -0,0 +1,129 @@
+import unittest
+import sys
+sys.path.insert(0, 'src/static') # hack for now
+from lasapp import ProbabilisticProgram
+import lasapp
+
+import os
+import threading
+from lasapp.inprocess_client import InProcessClient
+from lasapp.jsonrpc_client import _Batch
+
+from base_test_case import BaseTestCase
+from analysis.model_graph import *
+from analysis.hmc_assumptions_checker import *
+
+# Like the client of the Julia server: requests of a batch are only sent when the batch is sent,
+# and there are no bulk, dependency closure and model graph endpoints.
+class ClientWithoutBatch(InProcessClient):
+    def _call(self, method, params):
+        if method.endswith("_bulk") or method in ("get_dependency_closure", "get_model_graph"):
+            raise Exception(f"Method {method} not found")
+        return super()._call(method, params)
+
+    def batch(self):
+        return _Batch(self)
+
+    def send_batch(self, requests):
+        for request, future, object_hook in requests:
+            try:
+                future.set_result(self.send_request(request.method, request.params, object_hook))
+            except Exception as e:
+                future.set_exception(e)
+
+class TestInProcess(BaseTestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+
+    def test_in_process_pyro(self):
+        program_text = """
+import pyro
+
+def model():
+    A = pyro.sample("A", dist.Normal(0., 1.))
+    if A > 0:
+        B = pyro.sample("B", dist.Normal(A, 1.))
+    else:
+        B = 0.
+    for i in range(3):
+        C = pyro.sample(f"C_{i}", dist.Normal(A + B, 1.))
+"""
+        path = self.write_program(program_text, "python")
+        program = ProbabilisticProgram(path, in_process=True)
+
+        random_variables = program.get_random_variables()
+        self.assertTrue(all(isinstance(rv, lasapp.RandomVariable) for rv in random_variables))
+        self.assertEqual([rv.name for rv in random_variables], ["'A'", "'B'", "f'C_{i}'"])
+
+        rv_C = random_variables[2]
+        with program.batch() as batch:
+            data_deps = batch.get_data_dependencies(rv_C.node)
+            control_deps = batch.get_control_dependencies(rv_C.node)
+        self.assertTrue(all(isinstance(dep, lasapp.SyntaxNode) for dep in data_deps.result()))
+        self.assertEqual([dep.kind for dep in control_deps.result()], ["for"])
+
+        model_graph = get_model_graph(program)
+        edges = [(x.name, y.name) for x, y in model_graph.edges]
+        self.assertEqual(set(edges), {("'A'", "'B'"), ("'A'", "f'C_{i}'"), ("'B'", "f'C_{i}'")})
+        self.assertEqual(len(model_graph.plates), 2)
+
+        warnings = check_hmc_assumptions(program)
+        self.assertTrue(any(isinstance(w, RandomControlDependentWarning) for w in warnings))
+
+        with self.assertRaises(Exception):
+            program.get_guide()
+
+        program.close()
+        os.remove(path)
+
+    def test_model_graph_without_batch(self):
+        program_text = """
+import pyro
+
+def model():
+    A = pyro.sample("A", dist.Normal(0., 1.))
+    for i in range(3):
+        B = pyro.sample(f"B_{i}", dist.Normal(A, 1.))
+        C = pyro.sample(f"C_{i}", dist.Normal(A + B, 1.))
+"""
+        path = self.write_program(program_text, "python")
+        program = ProbabilisticProgram(path, in_process=True)
+        model_graph = get_model_graph(program)
+
+        program_without_batch = ProbabilisticProgram(path, in_process=True)
+        program_without_batch.client = ClientWithoutBatch()
+        program_without_batch.supports_bulk = False
+        program_without_batch.supports_model_graph = False
+        # the dependency closures are computed by the client, run in a thread to fail instead of hanging
+        result = []
+        thread = threading.Thread(target=lambda: result.append(get_model_graph(program_without_batch)), daemon=True)
+        thread.start()
+        thread.join(timeout=10)
+        self.assertEqual(len(result), 1)
+        model_graph_without_batch = result[0]
+
+        get_edges = lambda model_graph: {(x.node.node_id, y.node.node_id) for x, y in model_graph.edges}
+        self.assertEqual(model_graph.random_variables.keys(), model_graph_without_batch.random_variables.keys())
+        self.assertEqual(get_edges(model_graph), get_edges(model_graph_without_batch))
+        self.assertEqual(len(get_edges(model_graph)), 3)
+        self.assertEqual(len(model_graph_without_batch.plates), 2)
+
+        program.close()
+        program_without_batch.close()
+        os.remove(path)
+
+    def test_in_process_julia(self):
+        program_text = """
+using Turing
+
+@model function model()
+    A ~ Normal(0., 1.)
+end
+        """
+        path = self.write_program(program_text, "julia")
+        with self.assertRaises(ValueError):
+            ProbabilisticProgram(path, in_process=True)
+        os.remove(path)
+
+if __name__ == "__main__":
+    unittest.main()
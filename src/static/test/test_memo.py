@@ -0,0 +1,128 @@
+import unittest
+import sys
+sys.path.insert(0, 'src/static') # hack for now
+from lasapp import ProbabilisticProgram
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from lasapp.memo import QueryMemo
+
+from base_test_case import BaseTestCase
+from analysis.model_graph import *
+from analysis.hmc_assumptions_checker import *
+from analysis.constraint_verification import *
+
+class TestMemo(BaseTestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+
+    program_text = """
+import pyro
+
+def model():
+    A = pyro.sample("A", dist.Normal(0., 1.))
+    if A > 0:
+        B = pyro.sample("B", dist.Normal(A, 1.))
+    else:
+        B = 0.
+    for i in range(3):
+        C = pyro.sample(f"C_{i}", dist.Normal(A + B, 1.))
+"""
+
+    def test_memo_hits(self):
+        path = self.write_program(self.program_text, "python")
+        program = ProbabilisticProgram(path, in_process=True)
+
+        rvs_1 = program.get_random_variables()
+        rvs_2 = program.get_random_variables()
+        self.assertIs(rvs_1, rvs_2)
+
+        rv_C = rvs_1[2]
+        deps = program.get_data_dependencies(rv_C.node)
+        with program.batch() as batch:
+            deps_future = batch.get_data_dependencies(rv_C.node)
+        self.assertIs(deps_future.result(), deps)
+
+        # bulk query shares results with single queries
+        bulk = program.get_data_dependencies_bulk([rv.node for rv in rvs_1])
+        self.assertIs(bulk[rv_C.node.node_id], deps)
+
+        stats = program.memo_statistics()
+        self.assertEqual((stats["get_random_variables"].hits, stats["get_random_variables"].misses), (1, 1))
+        self.assertEqual((stats["get_data_dependencies"].hits, stats["get_data_dependencies"].misses), (2, 3))
+
+        program.invalidate(rv_C.node)
+        self.assertIsNot(program.get_data_dependencies(rv_C.node), deps)
+        self.assertIs(program.get_random_variables(), rvs_1)
+
+        program.invalidate()
+        self.assertIsNot(program.get_random_variables(), rvs_1)
+
+        program.close()
+        os.remove(path)
+
+    def test_memo_shared_between_analyses(self):
+        path = self.write_program(self.program_text, "python")
+        program = ProbabilisticProgram(path, in_process=True)
+        program_no_memo = ProbabilisticProgram(path, in_process=True, memoize=False)
+
+        model_graph = get_model_graph(program)
+        warnings = check_hmc_assumptions(program)
+        violations = validate_distribution_arg_constraints(program)
+        stats = program.memo_statistics()
+        self.assertGreater(stats["get_random_variables"].hits, 0)
+
+        # results with and without memoisation agree
+        model_graph_no_memo = get_model_graph(program_no_memo)
+        self.assertEqual(
+            {(x.name, y.name) for x, y in model_graph.edges},
+            {(x.name, y.name) for x, y in model_graph_no_memo.edges}
+        )
+        self.assertEqual(len(warnings), len(check_hmc_assumptions(program_no_memo)))
+        self.assertEqual(len(violations), len(validate_distribution_arg_constraints(program_no_memo)))
+        self.assertTrue(all(s.hits == 0 for s in program_no_memo.memo_statistics().values()))
+
+        program.close()
+        program_no_memo.close()
+        os.remove(path)
+
+    def test_memo_concurrent_misses(self):
+        memo = QueryMemo()
+        submitted = []
+        released = threading.Event()
+
+        def submit():
+            submitted.append(None)
+            future = Future()
+            threading.Thread(target=lambda: (released.wait(), future.set_result([1, 2]))).start()
+            return future
+
+        # all callers miss on the same key before the first submitted request is finished
+        n_callers = 8
+        barrier = threading.Barrier(n_callers)
+        def get():
+            barrier.wait()
+            return memo.get_or_submit("tree", "node", "get_data_dependencies", submit)
+        with ThreadPoolExecutor(max_workers=n_callers) as executor:
+            futures = list(executor.map(lambda _: get(), range(n_callers)))
+        released.set()
+
+        self.assertEqual(len(submitted), 1)
+        self.assertTrue(all(future is futures[0] for future in futures))
+        self.assertEqual(futures[0].result(), [1, 2])
+        stats = memo.statistics()["get_data_dependencies"]
+        self.assertEqual((stats.hits, stats.misses), (n_callers - 1, 1))
+
+        # failed requests are not memoised and submitted again
+        def submit_failing():
+            future = Future()
+            future.set_exception(ValueError())
+            return future
+        with self.assertRaises(ValueError):
+            memo.get_or_submit("tree", "other", "get_data_dependencies", submit_failing).result()
+        self.assertEqual(memo.get_or_submit("tree", "other", "get_data_dependencies", submit).result(), [1, 2])
+        self.assertEqual(len(submitted), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -267,5 +267,93 @@ def model():
         variables = {"A": "'A'", "B": "'B'", "C": "'C'"}
         # self._test_5(program_text, "python", variables) # TODO?
 
+    # the model graph endpoint of the Python server gives the same graph as the dependency queries of get_graph
+    def _test_model_graph_endpoint(self, program_text, get_model):
+        path = self.write_program(program_text, "python")
+        program = ProbabilisticProgram(path)
+        self.assertTrue(program.supports_model_graph)
+        model = get_model(program)
+        model_graph = get_graph(program, model)
+        program.supports_model_graph = False
+        model_graph_no_endpoint = get_graph(program, model)
+
+        program.close()
+        os.remove(path)
+
+        def get_plate_nesting(plate):
+            control_node_id = plate.control_dep.node.node_id if plate.control_dep is not None else None
+            members = frozenset(get_plate_nesting(m) if isinstance(m, Plate) else m for m in plate.members)
+            return (control_node_id, members)
+
+        self.assertEqual(model_graph.random_variables.keys(), model_graph_no_endpoint.random_variables.keys())
+        self.assertEqual(
+            {(x.node.node_id, y.node.node_id) for x, y in model_graph.edges},
+            {(x.node.node_id, y.node.node_id) for x, y in model_graph_no_endpoint.edges}
+        )
+        self.assertEqual(get_plate_nesting(model_graph.plates["global"]), get_plate_nesting(model_graph_no_endpoint.plates["global"]))
+        return model_graph
+
+    def test_model_graph_endpoint_pyro(self):
+        program_text = """
+import pyro
+import pyro.distributions as dist
+
+def model(data):
+    A = pyro.sample("A", dist.Normal(0., 1.))
+    for i in range(3):
+        B = pyro.sample(f"B_{i}", dist.Normal(A, 1.))
+        for j in range(len(data)):
+            pyro.sample(f"C_{i}_{j}", dist.Normal(A + B, 1.), obs=data[j])
+
+def guide(data):
+    mu = pyro.param("mu", 0.)
+    A = pyro.sample("A", dist.Normal(mu, 1.))
+    for i in range(3):
+        pyro.sample(f"B_{i}", dist.Normal(A, 1.))
+"""
+        model_graph = self._test_model_graph_endpoint(program_text, lambda program: program.get_model())
+        self.assertEqual(len(model_graph.random_variables), 3)
+        self.assertEqual(len(model_graph.plates), 3)
+        guide_graph = self._test_model_graph_endpoint(program_text, lambda program: program.get_guide())
+        self.assertEqual(len(guide_graph.random_variables), 2)
+        self.assertEqual(len(guide_graph.edges), 1)
+
+    def test_model_graph_endpoint_nested_plates(self):
+        program_text = """
+import pyro
+import pyro.distributions as dist
+
+def model():
+    A = pyro.sample("A", dist.Normal(0., 1.))
+    for i in range(2):
+        for j in range(3):
+            B = pyro.sample(f"B_{i}_{j}", dist.Normal(A, 1.))
+            for k in range(4):
+                for l in range(5):
+                    pyro.sample(f"C_{i}_{j}_{k}_{l}", dist.Normal(B, 1.))
+"""
+        model_graph = self._test_model_graph_endpoint(program_text, lambda program: program.get_model())
+        # plates are nested in the order of the loops
+        plate = model_graph.plates["global"]
+        loop_variables = []
+        while any(isinstance(m, Plate) for m in plate.members):
+            plate = [m for m in plate.members if isinstance(m, Plate)][0]
+            loop_variables.append(plate.control_dep.node.source_text.split()[1])
+        self.assertEqual(loop_variables, ["i", "j", "k", "l"])
+        self.assertEqual(len(model_graph.plates), 5)
+
+    def test_model_graph_endpoint_pymc(self):
+        program_text = """
+import pymc as pm
+
+with pm.Model() as model:
+    A = pm.Normal("A", 0., 1.)
+    B = pm.Normal("B", A, 1.)
+    C = pm.Normal("C", A + B, 1., observed=1.)
+"""
+        model_graph = self._test_model_graph_endpoint(program_text, lambda program: program.get_model())
+        self.assertEqual(len(model_graph.random_variables), 3)
+        self.assertEqual(len(model_graph.edges), 3)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,14 @@
+
+using Turing
+
+@model function submodel()
+    A ~ Normal(0., 1.)
+    B ~ Normal(A, 1.)
+    return B
+end
+
+@model function model()
+    B = @submodel submodel()
+    C ~ Normal(B, 1.)
+end
+        
\ No newline at end of file